@@ -0,0 +1,26 @@
+from typing import Optional
+from fastapi import Header, HTTPException, status
+from app.core.admission import admission_limiters
+from app.core.config import settings
+from app.core.namespaces import validate_namespace
+
+async def get_namespace(x_namespace: Optional[str] = Header(None)) -> str:
+    """Namespace a request is scoped to, from the X-Namespace header."""
+    try:
+        return validate_namespace(x_namespace or settings.DEFAULT_NAMESPACE)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def admission(route: str):
+    """
+    Dependency admitting requests to an expensive route through its limiter.
+
+    The request holds a slot until it is handled, under a deadline that
+    X-Request-Timeout (seconds) can shorten.
+    """
+    limiter = admission_limiters[route]
+
+    async def admit(x_request_timeout: Optional[float] = Header(None, gt=0)):
+        async with limiter.admit(x_request_timeout):
+            yield
+    return admit
@@ -0,0 +1,19 @@
+from fastapi import Request
+from app.core.admission import RequestShed
+from app.core.usage import TokenBudgetExceeded
+from app.core.responses import ORJSONResponse
+
+async def request_shed_handler(request: Request, exc: RequestShed) -> ORJSONResponse:
+    """Answer a shed request with its status and when to retry."""
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+async def token_budget_exceeded_handler(request: Request, exc: TokenBudgetExceeded) -> ORJSONResponse:
+    """Answer a generation for a session over its token budget with 429."""
+    return ORJSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "token_budget": exc.budget, "used_tokens": exc.used}
+    )
@@ -1,8 +1,11 @@
 from fastapi import APIRouter
-from app.api.routes import documents, embedding, search, chat
+from app.api.routes import documents, embedding, search, chat, system, snapshots, jobs
 
 router = APIRouter()
 router.include_router(documents.router, prefix="/documents", tags=["documents"])
 router.include_router(embedding.router, prefix="/embedding", tags=["embedding"])
 router.include_router(search.router, prefix="/search", tags=["search"])
-router.include_router(chat.router, prefix="/chat", tags=["chat"])
\ No newline at end of file
+router.include_router(chat.router, prefix="/chat", tags=["chat"])
+router.include_router(system.router, prefix="/system", tags=["system"])
+router.include_router(snapshots.router, prefix="/snapshots", tags=["snapshots"])
+router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
\ No newline at end of file
@@ -1,97 +1,133 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional, Literal
+from app.api.dependencies import admission, get_namespace
+from app.core.namespaces import validate_namespace
 from app.schemas.chat import (
-    ChatSessionCreate, ChatSessionResponse, 
-    ChatRequest, ChatResponse, ChatMessageResponse
+    ChatSessionCreate, ChatSessionResponse, ChatSessionList,
+    ChatRequest, ChatResponse, ChatMessageResponse, RetrievalOptions
 )
-from app.services.generation_service import GenerationService
-from app.core.database import db
-from bson import ObjectId
+from app.schemas.usage import SessionUsage
+from app.core.responses import NDJSONResponse
+from app.services.generation_service import GenerationService, MESSAGE_SORT
+from app.services.usage_service import UsageService
 
 router = APIRouter()
 
 @router.post("/sessions", response_model=ChatSessionResponse, status_code=status.HTTP_201_CREATED)
-async def create_chat_session(session: ChatSessionCreate):
+async def create_chat_session(session: ChatSessionCreate, namespace: str = Depends(get_namespace)):
     """Create a new chat session."""
-    generation_service = GenerationService()
-    created_session = await generation_service.create_chat_session(session.title)
+    generation_service = GenerationService(namespace)
+    created_session = await generation_service.create_chat_session(session.title, session.token_budget)
     return created_session
 
-@router.get("/sessions", response_model=List[ChatSessionResponse])
-async def get_chat_sessions():
-    """Get all chat sessions."""
-    cursor = db.db.chat_sessions.find().sort("updated_at", -1)
-    sessions = []
+@router.get("/sessions", response_model=List[ChatSessionResponse], deprecated=True)
+async def get_chat_sessions(
+    limit: Optional[int] = Query(None, ge=1),
+    namespace: str = Depends(get_namespace)
+):
+    """Get chat sessions, most recently active first (use /sessions/paged to page through them)."""
+    generation_service = GenerationService(namespace)
+    return await generation_service.get_recent_chat_sessions(limit)
+
+@router.get("/sessions/paged", response_model=ChatSessionList)
+async def get_chat_session_page(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: Literal["exact", "estimated", "none"] = "none",
+    namespace: str = Depends(get_namespace)
+):
+    """Get chat sessions, newest first, paginated by cursor."""
+    generation_service = GenerationService(namespace)
     
-    async for session in cursor:
-        session['_id'] = str(session['_id'])
-        sessions.append(session)
-        
-    return sessions
+    try:
+        sessions, next_cursor = await generation_service.get_chat_sessions(limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    total = await generation_service.count_chat_sessions(mode=count)
+    
+    # Returned as a plain envelope so the response model validates it only once
+    return {
+        "sessions": sessions,
+        "total": total,
+        "size": limit,
+        "next_cursor": next_cursor
+    }
 
 @router.get("/sessions/{session_id}/messages", response_model=List[ChatMessageResponse])
-async def get_session_messages(session_id: str):
+async def get_session_messages(session_id: str, namespace: str = Depends(get_namespace)):
     """Get all messages for a specific chat session."""
-    generation_service = GenerationService()
-    messages = await generation_service.get_session_messages(session_id)
+    generation_service = GenerationService(namespace)
     
-    # Convert message objects to response model format
-    response_messages = []
-    for msg in messages:
-        msg_dict = {
-            "_id": str(msg.id),
-            "role": msg.role,
-            "content": msg.content,
-            "session_id": msg.session_id,
-            "metadata": msg.metadata,
-            "references": msg.references,
-            "created_at": msg.created_at
-        }
-        response_messages.append(msg_dict)
-        
-    return response_messages
+    # Message objects are validated straight into the response model
+    return await generation_service.get_session_messages(session_id)
 
-@router.post("/generate", response_model=ChatResponse)
-async def generate_chat_response(request: ChatRequest):
+@router.get("/sessions/{session_id}/messages/export")
+async def export_session_messages(
+    session_id: str,
+    cursor: Optional[str] = None,
+    role: Optional[Literal["user", "assistant", "system"]] = None,
+    namespace: str = Depends(get_namespace)
+):
+    """Stream all messages of a session as NDJSON; resume with the cursor of the last row received."""
+    generation_service = GenerationService(namespace)
+    
+    try:
+        rows = await generation_service.export_session_messages(session_id, cursor, role)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return NDJSONResponse(rows, MESSAGE_SORT)
+
+@router.get("/sessions/{session_id}/usage", response_model=SessionUsage)
+async def get_session_usage(
+    session_id: str,
+    days: int = Query(30, ge=1, le=366),
+    namespace: str = Depends(get_namespace)
+):
+    """Get a session's token usage against its budget, broken down by day and model."""
+    usage_service = UsageService(namespace)
+    usage = await usage_service.get_session_usage(session_id, days)
+    
+    if not usage:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat session with ID {session_id} not found"
+        )
+    
+    return usage
+
+@router.post("/generate", response_model=ChatResponse, dependencies=[Depends(admission("chat"))])
+async def generate_chat_response(request: ChatRequest, namespace: str = Depends(get_namespace)):
     """Generate a response using RAG."""
-    generation_service = GenerationService()
+    # Retrieval options are checked as the search route checks them
+    retrieval_options = request.retrieval_options or RetrievalOptions()
+    try:
+        namespaces = [validate_namespace(name) for name in retrieval_options.namespaces or []]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    generation_service = GenerationService(namespace)
     response = await generation_service.generate_response(
         session_id=request.session_id,
         user_message=request.message,
         system_prompt=request.system_prompt,
-        retrieval_options=request.retrieval_options,
+        retrieval_options={**retrieval_options.model_dump(), "namespaces": namespaces},
         model=request.model,
         temperature=request.temperature,
         max_tokens=request.max_tokens
     )
     
-    # Convert response to expected format
-    message_dict = {
-        "_id": str(response["message"].id),
-        "role": response["message"].role,
-        "content": response["message"].content,
-        "session_id": response["message"].session_id,
-        "metadata": response["message"].metadata,
-        "references": response["message"].references,
-        "created_at": response["message"].created_at
-    }
-    
-    return ChatResponse(
-        session_id=response["session_id"],
-        message=message_dict,
-        references=response["references"]
-    )
+    # The assistant message object is converted directly by the response model
+    return response
 
 @router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_chat_session(session_id: str):
+async def delete_chat_session(session_id: str, namespace: str = Depends(get_namespace)):
     """Delete a chat session and all associated messages."""
-    # Delete all messages in the session
-    await db.db.chat_messages.delete_many({"session_id": session_id})
-    
-    # Delete the session
-    result = await db.db.chat_sessions.delete_one({"_id": ObjectId(session_id)})
+    generation_service = GenerationService(namespace)
+    deleted = await generation_service.delete_chat_session(session_id)
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Chat session with ID {session_id} not found"
@@ -1,48 +1,196 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List, Optional, Dict, Any
-from app.schemas.document import DocumentCreate, DocumentResponse, DocumentList
-from app.services.document_service import DocumentService
+import re
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, Literal, Tuple
+from app.api.dependencies import admission, get_namespace
+from app.schemas.document import DocumentCreate, DocumentResponse, DocumentList, BulkDeleteRequest
+from app.schemas.jobs import JobResponse
+from app.core.responses import NDJSONResponse
+from app.services.document_service import DocumentService, SUMMARY_FIELDS, DOCUMENT_SORT
+from app.utils.title_search import title_filter
 
 router = APIRouter()
 
-@router.post("/", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
-async def create_document(document: DocumentCreate, process_embeddings: bool = True):
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def parse_range(header: str, size: int) -> Tuple[int, int]:
+    """
+    Resolve a single-range Range header to inclusive byte offsets.
+    
+    Raises:
+        ValueError: If the range is malformed or not satisfiable
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or not any(match.groups()):
+        raise ValueError("Only a single bytes range is supported")
+    
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+def parse_summary_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated list of summary fields, rejecting unknown ones."""
+    if not fields:
+        return None
+    
+    selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected_fields if field not in SUMMARY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(SUMMARY_FIELDS)}"
+        )
+    return selected_fields
+
+@router.post("/", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(admission("ingest"))])
+async def create_document(
+    document: DocumentCreate,
+    process_embeddings: bool = True,
+    namespace: str = Depends(get_namespace)
+):
     """Create a new document and optionally process it for embeddings."""
-    document_service = DocumentService()
+    document_service = DocumentService(namespace)
     created_document = await document_service.create_document(document, process_embeddings)
     return created_document
 
-@router.get("/", response_model=DocumentList)
+@router.get("/", response_model=DocumentList, response_model_exclude_unset=True)
 async def read_documents(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    title: Optional[str] = None
+    title: Optional[str] = None,
+    title_match: Literal["prefix", "token", "fuzzy"] = "prefix",
+    order: Literal["newest", "relevance"] = "newest",
+    cursor: Optional[str] = None,
+    count: Literal["exact", "estimated", "none"] = "estimated",
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = Query(None, description="Comma-separated summary fields; implies view=summary"),
+    namespace: str = Depends(get_namespace)
 ):
-    """Get all documents with pagination and optional filtering."""
-    document_service = DocumentService()
+    """
+    Get documents with pagination and optional filtering.
     
-    # Build filters
-    filters = {}
-    if title:
-        filters["title"] = {"$regex": title, "$options": "i"}  # Case-insensitive search
+    Pass the returned next_cursor to fetch the following page; skip is only
+    used when no cursor is given. The summary view returns title, metadata,
+    size, chunk count and timestamps without content; full content is always
+    available from GET /documents/{document_id}.
+    
+    Titles are matched through indexes: "prefix" matches titles with words
+    starting with each query word, "token" requires whole words and "fuzzy"
+    tolerates misspellings. Fuzzy matches, and order=relevance, are ranked by
+    similarity to the query.
+    """
+    document_service = DocumentService(namespace)
+    
+    selected_fields = parse_summary_fields(fields)
+    if selected_fields:
+        view = "summary"
+    
+    # Fuzzy matches only make sense ranked by how close they are
+    if title and (order == "relevance" or title_match == "fuzzy"):
+        if cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Relevance-ordered results are paginated with skip, not cursor"
+            )
+        try:
+            documents = await document_service.search_by_title(
+                title, title_match, skip, limit, selected_fields, summary=view == "summary"
+            )
+            total = await document_service.count_title_matches(title, title_match, count_mode=count)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        
+        return {
+            "documents": documents,
+            "total": total,
+            "page": (skip // limit) + 1,
+            "size": limit,
+            "next_cursor": None
+        }
     
     # Get documents
-    documents = await document_service.get_documents(skip, limit, filters)
+    try:
+        # Title matches are index lookups on the maintained title search fields
+        filters = title_filter(title, title_match) if title else {}
+        
+        if view == "summary":
+            documents, next_cursor = await document_service.get_document_summaries(
+                skip, limit, filters, cursor, selected_fields
+            )
+        else:
+            documents, next_cursor = await document_service.get_documents(skip, limit, filters, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     # Count total
-    total = await document_service.count_documents(filters)
+    total = await document_service.count_documents(filters, mode=count)
     
-    return DocumentList(
-        documents=documents,
-        total=total,
-        page=(skip // limit) + 1,
-        size=limit
-    )
+    # Returned as a plain envelope so the response model validates it only once
+    return {
+        "documents": documents,
+        "total": total,
+        "page": None if cursor else (skip // limit) + 1,
+        "size": limit,
+        "next_cursor": next_cursor
+    }
+
+@router.get("/export")
+async def export_documents(
+    title: Optional[str] = None,
+    title_match: Literal["prefix", "token"] = "prefix",
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = Query(None, description="Comma-separated summary fields; implies view=summary"),
+    namespace: str = Depends(get_namespace)
+):
+    """
+    Stream all matching documents, newest first, as NDJSON.
+    
+    Rows are written as they are read, so exports of any size use constant
+    memory. Every row carries a cursor; pass the last one received to resume
+    an interrupted export.
+    """
+    document_service = DocumentService(namespace)
+    selected_fields = parse_summary_fields(fields)
+    
+    try:
+        filters = title_filter(title, title_match) if title else {}
+        rows = document_service.export_documents(
+            filters, cursor, selected_fields, summary=view == "summary" or bool(selected_fields)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return NDJSONResponse(rows, DOCUMENT_SORT)
+
+@router.post("/bulk-delete", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def bulk_delete_documents(
+    request: BulkDeleteRequest,
+    namespace: str = Depends(get_namespace)
+):
+    """
+    Delete all documents matching a metadata filter, with their chunks and vectors.
+    
+    Runs in the background; follow progress at GET /jobs/{job_id}.
+    """
+    document_service = DocumentService(namespace)
+    try:
+        return await document_service.start_bulk_delete(request.metadata)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get("/{document_id}", response_model=DocumentResponse)
-async def read_document(document_id: str):
+async def read_document(document_id: str, namespace: str = Depends(get_namespace)):
     """Get a specific document by ID."""
-    document_service = DocumentService()
+    document_service = DocumentService(namespace)
     document = await document_service.get_document(document_id)
     
     if not document:
@@ -53,10 +201,60 @@ async def read_document(document_id: str):
         
     return document
 
-@router.put("/{document_id}", response_model=DocumentResponse)
-async def update_document(document_id: str, document: DocumentCreate, reprocess_embeddings: bool = True):
+@router.get("/{document_id}/content")
+async def read_document_content(
+    document_id: str,
+    range: Optional[str] = Header(None),
+    namespace: str = Depends(get_namespace)
+):
+    """
+    Stream a document's body as UTF-8 text.
+    
+    Supports a single bytes Range (206 Partial Content), so large bodies can be
+    read in pieces; they are streamed from the blob store, never loaded whole.
+    """
+    document_service = DocumentService(namespace)
+    body = await document_service.get_document_body(document_id)
+    
+    if not body:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document with ID {document_id} not found"
+        )
+    
+    size = body["size"]
+    headers = {"Accept-Ranges": "bytes"}
+    status_code = status.HTTP_200_OK
+    start, end = 0, size - 1
+    if range:
+        try:
+            start, end = parse_range(range, size)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail=str(e),
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+    
+    return StreamingResponse(
+        document_service.read_document_body(body, start, end),
+        status_code=status_code,
+        media_type="text/plain; charset=utf-8",
+        headers=headers
+    )
+
+@router.put("/{document_id}", response_model=DocumentResponse, dependencies=[Depends(admission("ingest"))])
+async def update_document(
+    document_id: str,
+    document: DocumentCreate,
+    reprocess_embeddings: bool = True,
+    namespace: str = Depends(get_namespace)
+):
     """Update a document and optionally reprocess embeddings."""
-    document_service = DocumentService()
+    document_service = DocumentService(namespace)
     updated_document = await document_service.update_document(
         document_id, document, reprocess_embeddings
     )
@@ -70,9 +268,9 @@ async def update_document(document_id: str, document: DocumentCreate, reprocess_
     return updated_document
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_document(document_id: str):
+async def delete_document(document_id: str, namespace: str = Depends(get_namespace)):
     """Delete a document and its associated chunks and vectors."""
-    document_service = DocumentService()
+    document_service = DocumentService(namespace)
     deleted = await document_service.delete_document(document_id)
     
     if not deleted:
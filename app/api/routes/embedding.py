@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional, Literal
+from app.api.dependencies import get_namespace
 from app.schemas.embedding import DocumentChunkResponse, ChunkList
-from app.services.embedding_service import EmbeddingService
+from app.core.responses import NDJSONResponse
+from app.services.embedding_service import EmbeddingService, CHUNK_SORT
 
 router = APIRouter()
 
@@ -9,20 +11,42 @@ router = APIRouter()
 async def get_document_chunks(
     document_id: str,
     skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: Literal["exact", "estimated", "none"] = "exact",
+    namespace: str = Depends(get_namespace)
 ):
-    """Get all chunks for a specific document."""
-    embedding_service = EmbeddingService()
-    chunks = await embedding_service.get_chunks_by_document(document_id)
+    """Get the chunks of a specific document, paginated by offset or cursor."""
+    embedding_service = EmbeddingService(namespace)
     
-    # Apply pagination manually since we're getting all chunks first
-    # (In a real app, you'd modify the service to handle pagination directly)
-    total = len(chunks)
-    paginated_chunks = chunks[skip:skip+limit]
+    try:
+        chunks, next_cursor = await embedding_service.get_chunks_page(document_id, limit, skip, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    return ChunkList(
-        chunks=paginated_chunks,
-        total=total,
-        page=(skip // limit) + 1,
-        size=limit
-    )
\ No newline at end of file
+    total = await embedding_service.count_chunks(document_id, mode=count)
+    
+    # Returned as a plain envelope so the response model validates it only once
+    return {
+        "chunks": chunks,
+        "total": total,
+        "page": None if cursor else (skip // limit) + 1,
+        "size": limit,
+        "next_cursor": next_cursor
+    }
+
+@router.get("/chunks/{document_id}/export")
+async def export_document_chunks(
+    document_id: str,
+    cursor: Optional[str] = None,
+    namespace: str = Depends(get_namespace)
+):
+    """Stream all chunks of a document as NDJSON; resume with the cursor of the last row received."""
+    embedding_service = EmbeddingService(namespace)
+    
+    try:
+        rows = embedding_service.export_chunks(document_id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return NDJSONResponse(rows, CHUNK_SORT)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from app.core.readiness import readiness
+from app.core.responses import ORJSONResponse
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz():
+    """Readiness probe: MongoDB and Chroma are reachable and warm-up has completed."""
+    ready = await readiness.probe()
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "checks": readiness.checks,
+            "startup": readiness.startup_report()
+        }
+    )
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, HTTPException, status, Query
+from typing import List, Optional
+from app.core.active_collection import active, get_active_collection_state
+from app.core.chroma_client import chroma
+from app.core.embeddings import UnsupportedEmbeddingModel
+from app.core.jobs import jobs
+from app.schemas.jobs import JobResponse, ReindexRequest
+from app.services.reindex_service import ReindexService
+
+router = APIRouter()
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(kind: Optional[str] = None, limit: int = Query(20, ge=1, le=100)):
+    """List background jobs, newest first."""
+    return await jobs.list(kind, limit)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get a background job with its progress."""
+    job = await jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_job(job_id: str):
+    """Cancel a job; a running job stops at its next checkpoint."""
+    if not await jobs.cancel(job_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or already finished")
+    return None
+
+@router.post("/reindex", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_reindex(request: ReindexRequest):
+    """
+    Re-embed all chunks into a new collection in the background, then switch searches to it.
+    
+    Searches keep using the current collection until the new one has caught up.
+    """
+    reindex_service = ReindexService()
+    try:
+        return await reindex_service.start_reindex(**request.model_dump())
+    except UnsupportedEmbeddingModel as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.post("/reindex/{job_id}/resume", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def resume_reindex(job_id: str):
+    """Resume an interrupted or failed re-index job from its last checkpoint."""
+    reindex_service = ReindexService()
+    try:
+        return await reindex_service.resume_reindex(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/reindex/active")
+async def get_active_collection():
+    """Get the vector collection searches are served from, with its embedding model."""
+    state = await get_active_collection_state()
+    if state:
+        state.pop("_id", None)
+        return state
+    return {
+        "name": chroma.collection.name,
+        "embedding_model": active.embedding_model,
+        "index_dimensions": active.index_dimensions,
+        "activated_at": None
+    }
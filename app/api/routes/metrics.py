@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from app.core.admission import admission_limiters
+from app.core.rate_limiter import openrouter_limiter
+from app.core.write_behind import write_behind
+from app.utils.singleflight import singleflight_stats
+
+router = APIRouter()
+
+class RuntimeStatsCollector:
+    """Expose limiter, admission, singleflight and write-behind state as Prometheus gauges."""
+
+    def collect(self):
+        limiter_stats = openrouter_limiter.stats()
+        concurrency = GaugeMetricFamily(
+            "rag_openrouter_concurrency_limit", "Current AIMD concurrency limit for OpenRouter calls"
+        )
+        concurrency.add_metric([], limiter_stats["concurrency_limit"])
+        yield concurrency
+
+        queue_depth = GaugeMetricFamily(
+            "rag_openrouter_queue_depth", "OpenRouter calls waiting for a slot", labels=["priority"]
+        )
+        max_wait = GaugeMetricFamily(
+            "rag_openrouter_max_wait_seconds", "Longest wait for an OpenRouter slot", labels=["priority"]
+        )
+        for name, stats in limiter_stats["classes"].items():
+            queue_depth.add_metric([name], stats["queue_depth"])
+            max_wait.add_metric([name], stats["max_wait_seconds"])
+        yield queue_depth
+        yield max_wait
+
+        admission_in_flight = GaugeMetricFamily(
+            "rag_admission_in_flight", "Requests being handled by an admission-controlled route", labels=["route"]
+        )
+        admission_queue = GaugeMetricFamily(
+            "rag_admission_queue_depth", "Requests queued for an admission-controlled route", labels=["route"]
+        )
+        admission_latency = GaugeMetricFamily(
+            "rag_admission_expected_latency_seconds", "Moving average handling time of a route", labels=["route"]
+        )
+        for route, limiter in admission_limiters.items():
+            stats = limiter.stats()
+            admission_in_flight.add_metric([route], stats["in_flight"])
+            admission_queue.add_metric([route], stats["queue_depth"])
+            admission_latency.add_metric([route], stats["expected_latency_seconds"])
+        yield admission_in_flight
+        yield admission_queue
+        yield admission_latency
+
+        collapsed = GaugeMetricFamily(
+            "rag_singleflight_collapsed", "Calls served by an identical in-flight call", labels=["group"]
+        )
+        for group, stats in singleflight_stats().items():
+            collapsed.add_metric([group], stats["collapsed"])
+        yield collapsed
+
+        buffer_stats = write_behind.stats()
+        pending = GaugeMetricFamily(
+            "rag_write_behind_pending", "Chat writes waiting to be flushed", labels=["kind"]
+        )
+        pending.add_metric(["messages"], buffer_stats["pending_messages"])
+        pending.add_metric(["sessions"], buffer_stats["pending_sessions"])
+        yield pending
+
+REGISTRY.register(RuntimeStatsCollector())
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose metrics in the Prometheus text format."""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,17 +1,32 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.api.dependencies import admission, get_namespace
+from app.core.namespaces import validate_namespace
 from app.schemas.search import SearchQuery, SearchResponse
 from app.services.retrieval_service import RetrievalService
 
 router = APIRouter()
 
-@router.post("/", response_model=SearchResponse)
-async def search_documents(query: SearchQuery):
-    """Search for relevant document chunks based on query."""
-    retrieval_service = RetrievalService()
+@router.post("/", response_model=SearchResponse, dependencies=[Depends(admission("search"))])
+async def search_documents(query: SearchQuery, namespace: str = Depends(get_namespace)):
+    """
+    Search for relevant document chunks based on query.
+    
+    Searches the request's namespace, or every namespace listed in the query,
+    each in parallel with the results merged by score.
+    """
+    try:
+        namespaces = [validate_namespace(name) for name in query.namespaces or []]
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    retrieval_service = RetrievalService(namespace)
     results = await retrieval_service.search(
         query=query.query,
         top_k=query.top_k,
-        filter_metadata=query.filter_metadata
+        filter_metadata=query.filter_metadata,
+        namespaces=namespaces,
+        candidate_factor=query.candidate_factor,
+        neighbors=query.neighbors
     )
     
     return SearchResponse(
@@ -0,0 +1,44 @@
+import os
+import uuid
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.services.snapshot_service import SnapshotService
+from app.utils.snapshot import SnapshotError
+
+router = APIRouter()
+
+@router.get("/export")
+async def export_snapshot(dtype: Optional[Literal["float32", "float16"]] = None):
+    """Stream all documents, chunks and vectors as a binary corpus snapshot."""
+    snapshot_service = SnapshotService()
+    return StreamingResponse(
+        snapshot_service.export_snapshot(dtype=dtype),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="corpus.snap"'}
+    )
+
+@router.post("/import")
+async def import_snapshot(request: Request, force: bool = False):
+    """
+    Load a snapshot sent as the raw request body, without re-embedding anything.
+    
+    The upload is staged in SNAPSHOT_DIR so its vector blocks can be memory-mapped.
+    Set force to import vectors embedded with a different model than the configured one.
+    """
+    os.makedirs(settings.SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(settings.SNAPSHOT_DIR, f"upload-{uuid.uuid4().hex}.snap")
+    
+    try:
+        with open(path, "wb") as f:
+            async for data in request.stream():
+                f.write(data)
+        
+        snapshot_service = SnapshotService()
+        return await snapshot_service.import_snapshot(path, force=force)
+    except SnapshotError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import Literal, Optional
+from app.core.config import settings
+from app.core.namespaces import list_namespaces
+from app.core.rate_limiter import openrouter_limiter
+from app.core.write_behind import write_behind
+from app.schemas.usage import TopConsumers
+from app.services.usage_service import UsageService
+from app.utils.singleflight import singleflight_stats
+
+router = APIRouter()
+
+@router.get("/openrouter")
+async def get_openrouter_stats():
+    """Get OpenRouter limiter state with per-priority queue depth and wait times."""
+    return openrouter_limiter.stats()
+
+@router.get("/singleflight")
+async def get_singleflight_stats():
+    """Get call, execution and collapse counters for deduplicated calls."""
+    return singleflight_stats()
+
+@router.get("/write-behind")
+async def get_write_behind_stats():
+    """Get chat write-behind buffer depth and flush counters."""
+    return write_behind.stats()
+
+@router.get("/namespaces")
+async def get_namespaces():
+    """List the namespaces in use (select one per request with the X-Namespace header)."""
+    return {"default": settings.DEFAULT_NAMESPACE, "namespaces": await list_namespaces()}
+
+@router.get("/usage/top", response_model=TopConsumers)
+async def get_top_consumers(
+    by: Literal["session", "document", "model", "namespace", "day"] = "session",
+    metric: Literal["requests", "prompt_tokens", "completion_tokens", "total_tokens", "cost", "latency_seconds"] = "total_tokens",
+    days: int = Query(7, ge=1, le=366),
+    limit: int = Query(10, ge=1, le=100),
+    namespace: Optional[str] = None,
+    kind: Optional[Literal["completion", "embedding", "query_embedding", "reindex"]] = None
+):
+    """Rank sessions, documents, models, namespaces or days by token usage over the last days."""
+    usage_service = UsageService()
+    
+    try:
+        consumers = await usage_service.top_consumers(by, metric, days, limit, namespace, kind)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {"by": by, "metric": metric, "since": usage_service.since(days), "consumers": consumers}
\ No newline at end of file
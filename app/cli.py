@@ -0,0 +1,106 @@
+"""
+Maintenance commands that run against the configured MongoDB and ChromaDB.
+
+    python -m app.cli export-snapshot corpus.snap --dtype float16
+    python -m app.cli import-snapshot corpus.snap
+    python -m app.cli reindex --embedding-model openai/text-embedding-3-large
+    python -m app.cli reindex --resume <job_id>
+    python -m app.cli backfill-title-index
+"""
+import argparse
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from app.core.database import connect_to_mongodb, create_indexes, close_mongodb_connection
+from app.core.chroma_client import initialize_chroma, close_chroma_connection
+from app.core.active_collection import apply_collection_state, get_active_collection_state
+
+@asynccontextmanager
+async def connected():
+    """Connect to MongoDB and ChromaDB for the duration of a command."""
+    await connect_to_mongodb()
+    await create_indexes()
+    await initialize_chroma()
+    state = await get_active_collection_state()
+    if state:
+        apply_collection_state(state)
+    try:
+        yield
+    finally:
+        await close_mongodb_connection()
+        await close_chroma_connection()
+
+async def export_snapshot(args):
+    from app.services.snapshot_service import SnapshotService
+
+    async with connected():
+        with open(args.path, "wb") as f:
+            async for data in SnapshotService().export_snapshot(dtype=args.dtype, batch_size=args.batch_size):
+                f.write(data)
+
+async def import_snapshot(args):
+    from app.services.snapshot_service import SnapshotService
+
+    async with connected():
+        totals = await SnapshotService().import_snapshot(args.path, force=args.force)
+    print(json.dumps(totals, indent=2))
+
+async def reindex(args):
+    from app.core.jobs import jobs
+    from app.services.reindex_service import ReindexService
+
+    async with connected():
+        reindex_service = ReindexService()
+        if args.resume:
+            job_id = args.resume
+        else:
+            job = await reindex_service.create_job(
+                args.embedding_model, args.index_dimensions, args.rate, args.batch_size, args.drop_previous
+            )
+            job_id = job["_id"]
+        print(f"Re-index job {job_id}")
+        await jobs.run(job_id, reindex_service.run)
+        job = await jobs.get(job_id)
+    print(json.dumps({key: job[key] for key in ("status", "result", "error")}, indent=2, default=str))
+
+async def backfill_title_index(args):
+    from app.services.document_service import DocumentService
+
+    async with connected():
+        updated = await DocumentService().backfill_title_search()
+    print(f"Indexed titles of {updated} documents")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export-snapshot", help="Write the corpus to a binary snapshot")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--dtype", choices=["float32", "float16"], default=None)
+    export_parser.add_argument("--batch-size", type=int, default=None, help="Rows per row group")
+    export_parser.set_defaults(handler=export_snapshot)
+
+    import_parser = commands.add_parser("import-snapshot", help="Load a snapshot without re-embedding")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--force", action="store_true", help="Allow a different embedding model")
+    import_parser.set_defaults(handler=import_snapshot)
+
+    reindex_parser = commands.add_parser("reindex", help="Re-embed all chunks into a new collection and switch to it")
+    reindex_parser.add_argument("--embedding-model", default=None)
+    reindex_parser.add_argument("--index-dimensions", type=int, default=None)
+    reindex_parser.add_argument("--rate", type=float, default=None, help="Chunks per second")
+    reindex_parser.add_argument("--batch-size", type=int, default=None)
+    reindex_parser.add_argument("--drop-previous", action="store_true", help="Delete the old collection afterwards")
+    reindex_parser.add_argument("--resume", default=None, metavar="JOB_ID", help="Resume an interrupted job")
+    reindex_parser.set_defaults(handler=reindex)
+
+    backfill_parser = commands.add_parser("backfill-title-index", help="Index titles of documents created before title search")
+    backfill_parser.set_defaults(handler=backfill_title_index)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.database import db
+from app.core.chroma_client import chroma
+
+# The vector collection being served, with the model and index size its vectors were built with
+STATE_ID = "active_collection"
+
+class ActiveCollection:
+    """
+    The embedding model and index size of the vectors being served.
+
+    They follow the active collection's state after a re-index cut-over, and
+    the EMBEDDING_MODEL and EMBEDDING_INDEX_DIMENSIONS settings until then. The
+    settings themselves are never changed, so they keep naming the model that
+    new re-index jobs default to.
+    """
+
+    def __init__(self):
+        self.name: Optional[str] = None
+        self._embedding_model: Optional[str] = None
+        self._index_dimensions: Optional[int] = None
+
+    @property
+    def embedding_model(self) -> str:
+        return self._embedding_model or settings.EMBEDDING_MODEL
+
+    @property
+    def index_dimensions(self) -> int:
+        return settings.EMBEDDING_INDEX_DIMENSIONS if self._index_dimensions is None else self._index_dimensions
+
+    def snapshot(self) -> Tuple[str, str, int]:
+        """The served collection's name, embedding model and index size, read together."""
+        return chroma.collection.name, self.embedding_model, self.index_dimensions
+
+    def update(self, state: Dict[str, Any]):
+        # Reassigned together, so no request sees the model of one collection with the size of another
+        self.name, self._embedding_model, self._index_dimensions = (
+            state["name"], state["embedding_model"], state["index_dimensions"]
+        )
+
+active = ActiveCollection()
+
+async def get_active_collection_state() -> Optional[Dict[str, Any]]:
+    return await db.db.system_state.find_one({"_id": STATE_ID})
+
+def apply_collection_state(state: Dict[str, Any]):
+    """Serve from the given collection, embedding queries with the model it was built with."""
+    if chroma.collection is None or chroma.collection.name != state["name"]:
+        # A single attribute swap: in-flight queries finish on the old collection
+        chroma.collection = chroma.client.get_collection(name=state["name"])
+        logging.info(f"Serving vectors from collection '{state['name']}'")
+    active.update(state)
+
+async def activate_collection(name: str, embedding_model: str, index_dimensions: int) -> Dict[str, Any]:
+    """Persist a collection as the active one and switch this process over to it."""
+    state = {
+        "name": name,
+        "embedding_model": embedding_model,
+        "index_dimensions": index_dimensions,
+        "activated_at": datetime.utcnow()
+    }
+    await db.db.system_state.replace_one({"_id": STATE_ID}, state, upsert=True)
+    apply_collection_state(state)
+    return state
+
+class CollectionWatcher:
+    """
+    Keep this process serving from the active collection.
+
+    On startup the persisted state overrides CHROMADB_COLLECTION and
+    EMBEDDING_MODEL, so a re-index cut-over survives restarts; afterwards the
+    state is polled so every worker follows a cut-over made by any of them.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        state = await get_active_collection_state()
+        if state:
+            if state["embedding_model"] != settings.EMBEDDING_MODEL:
+                logging.warning(
+                    f"Collection '{state['name']}' was embedded with {state['embedding_model']}, "
+                    f"ignoring EMBEDDING_MODEL={settings.EMBEDDING_MODEL} until it is re-indexed"
+                )
+            apply_collection_state(state)
+        self._task = asyncio.ensure_future(self._poll())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(settings.ACTIVE_COLLECTION_POLL_INTERVAL)
+            try:
+                state = await get_active_collection_state()
+                if state:
+                    apply_collection_state(state)
+            except Exception as e:
+                logging.error(f"Error checking the active vector collection: {str(e)}")
+
+collection_watcher = CollectionWatcher()
@@ -0,0 +1,230 @@
+import asyncio
+import contextvars
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+from fastapi import status
+from app.core.config import settings
+from app.core.metrics import ADMISSION_REJECTIONS, DEADLINE_EXCEEDED, expected_stage_latency
+from app.utils.singleflight import SingleFlight
+
+# Weight of the latest request in a route's moving average latency
+LATENCY_SMOOTHING = 0.2
+
+# Latency samples are capped to this fraction of the route deadline, so one request that
+# overran it cannot push the estimate past the deadline and shed every request after it
+LATENCY_SAMPLE_CAP = 0.9
+
+# Monotonic time by which the current request must be answered, if it is admission controlled
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+class RequestShed(Exception):
+    """A request turned away to protect the service, answered with status_code and Retry-After."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the current request's deadline (None without a deadline)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def check_budget(*stages: str):
+    """
+    Fail fast when the request's remaining budget cannot cover the usual latency of stages run in turn.
+
+    Raises:
+        RequestShed: With 503, rather than starting work the client will have given up on
+    """
+    remaining = remaining_budget()
+    if remaining is None:
+        return
+
+    expected = 0.0
+    for stage in stages:
+        expected += expected_stage_latency(stage)
+        if remaining < expected:
+            DEADLINE_EXCEEDED.labels(stage).inc()
+            raise RequestShed(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                f"Request deadline cannot cover the {stage} stage",
+                retry_after=expected
+            )
+
+@contextmanager
+def deadline_suspended():
+    """Run the block without the current request's deadline, for work that must finish once started."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def budget_timeout(timeout: float) -> float:
+    """Cap a timeout to the current request's remaining budget."""
+    remaining = remaining_budget()
+    if remaining is None:
+        return timeout
+    return max(0.0, min(timeout, remaining))
+
+async def shared_call(flight: SingleFlight, key: Hashable, fn: Callable[[], Awaitable[Any]], *stages: str) -> Any:
+    """
+    Run fn through a singleflight group, with the deadline applied to each caller.
+
+    A caller whose budget cannot cover the stages is shed up front, and one whose
+    deadline passes stops waiting. The shared call itself runs without a deadline,
+    so the request that happened to start it cannot shed or cut it short for the others.
+
+    Raises:
+        RequestShed: With 503 if the deadline cannot cover the stages, or passes while waiting
+    """
+    check_budget(*stages)
+    call = flight.do(key, lambda: _without_deadline(fn))
+    remaining = remaining_budget()
+    if remaining is None:
+        return await call
+
+    try:
+        return await asyncio.wait_for(call, max(0.0, remaining))
+    except asyncio.TimeoutError:
+        DEADLINE_EXCEEDED.labels(stages[-1]).inc()
+        raise RequestShed(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            f"Request deadline passed during the {stages[-1]} stage",
+            retry_after=sum(expected_stage_latency(stage) for stage in stages)
+        )
+
+def _without_deadline(fn: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+    """Start fn in a task that does not inherit the current request's deadline."""
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    # Tasks copy the context current when they are created
+    return context.run(lambda: asyncio.ensure_future(fn()))
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded wait queue for one group of expensive routes.
+
+    Requests beyond the limit wait in FIFO order. A full queue sheds new requests
+    with 429, and requests whose deadline cannot cover the expected wait plus
+    the route's usual latency are shed with 503 before doing any work. When
+    nothing is in flight a request is always admitted, as a probe that keeps
+    the latency estimate up to date.
+    """
+
+    def __init__(self, route: str, limit: int, max_queue: int, deadline: float):
+        self.route = route
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.deadline = deadline
+        self.latency = 0.0  # Moving average of admitted requests' handling time
+
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._admitted = 0
+
+    def expected_wait(self) -> float:
+        """Time a request arriving now is expected to queue for."""
+        if self._in_flight < self.limit:
+            return 0.0
+        return (len(self._waiters) + 1) / self.limit * self.latency
+
+    def retry_after(self) -> float:
+        """Time for the current backlog to drain."""
+        return (self._in_flight + len(self._waiters)) / self.limit * self.latency
+
+    @asynccontextmanager
+    async def admit(self, timeout: Optional[float] = None):
+        """
+        Hold a slot for the duration of the block, under a deadline of timeout
+        seconds (capped to the route's deadline), which later stages can check.
+
+        Raises:
+            RequestShed: With 429 if the queue is full, or 503 if the deadline cannot be met
+        """
+        budget = min(timeout, self.deadline) if timeout else self.deadline
+        deadline = time.monotonic() + budget
+
+        if self._in_flight >= self.limit and len(self._waiters) >= self.max_queue:
+            self._shed("queue_full", status.HTTP_429_TOO_MANY_REQUESTS, f"Too many {self.route} requests queued")
+        idle = self._in_flight == 0 and not self._waiters
+        if not idle and self.expected_wait() + self.latency > budget:
+            self._shed("deadline", status.HTTP_503_SERVICE_UNAVAILABLE,
+                       f"Deadline of {budget:g}s cannot cover the expected {self.route} latency")
+
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+        else:
+            await self._wait(deadline)
+
+        self._admitted += 1
+        started = time.monotonic()
+        _deadline.set(deadline)
+        try:
+            yield
+        finally:
+            _deadline.set(None)
+            elapsed = min(time.monotonic() - started, self.deadline * LATENCY_SAMPLE_CAP)
+            self.latency = elapsed if not self.latency else self.latency + LATENCY_SMOOTHING * (elapsed - self.latency)
+            self._release()
+
+    async def _wait(self, deadline: float):
+        """Queue for a slot, giving up once the rest of the budget could not cover the route's latency."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, max(0.0, deadline - time.monotonic() - self.latency))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # The slot may have been handed over just as the wait ended
+            if future.done() and not future.cancelled():
+                self._release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                self._shed("deadline", status.HTTP_503_SERVICE_UNAVAILABLE,
+                           f"Deadline expired while queued for {self.route}")
+            raise
+
+    def _release(self):
+        """Hand the slot straight to the next waiter, or free it."""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _shed(self, reason: str, status_code: int, detail: str):
+        ADMISSION_REJECTIONS.labels(self.route, reason).inc()
+        raise RequestShed(status_code, detail, retry_after=self.retry_after())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the limit, current load and latency estimate."""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queue_depth": sum(1 for future in self._waiters if not future.done()),
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "expected_latency_seconds": self.latency
+        }
+
+admission_limiters = {
+    "chat": AdmissionLimiter(
+        "chat", settings.CHAT_MAX_CONCURRENCY, settings.CHAT_MAX_QUEUE, settings.CHAT_DEADLINE
+    ),
+    "search": AdmissionLimiter(
+        "search", settings.SEARCH_MAX_CONCURRENCY, settings.SEARCH_MAX_QUEUE, settings.SEARCH_DEADLINE
+    ),
+    "ingest": AdmissionLimiter(
+        "ingest", settings.INGEST_MAX_CONCURRENCY, settings.INGEST_MAX_QUEUE, settings.INGEST_DEADLINE
+    )
+}
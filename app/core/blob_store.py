@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import db
+
+# Bodies are read and streamed in pieces of this size
+READ_CHUNK_SIZE = 256 * 1024
+
+# A blob deletion not finished within this long (its process died) is taken over by a new reference
+DELETE_LEASE = timedelta(seconds=60)
+
+class LocalBlobStore:
+    """Content-addressed blobs in a directory tree (<root>/<ab>/<cd>/<sha256>)."""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    async def put(self, key: str, data: bytes):
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+
+        def write():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a blob is never visible half-written
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        await asyncio.get_running_loop().run_in_executor(None, write)
+
+    async def read(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield bytes start..end (inclusive, to the end of the blob by default)."""
+        loop = asyncio.get_running_loop()
+        f = await loop.run_in_executor(None, open, self._path(key), "rb")
+        try:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining)
+                data = await loop.run_in_executor(None, f.read, size)
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+        finally:
+            f.close()
+
+    async def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+class GridFSBlobStore:
+    """Content-addressed blobs in a GridFS bucket, named by their SHA-256."""
+
+    name = "gridfs"
+
+    def __init__(self, bucket_name: str = "document_bodies"):
+        self.bucket_name = bucket_name
+
+    @property
+    def bucket(self):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+        return AsyncIOMotorGridFSBucket(db.db, bucket_name=self.bucket_name)
+
+    async def _file_id(self, key: str):
+        file = await db.db[f"{self.bucket_name}.files"].find_one({"filename": key}, {"_id": 1})
+        return file["_id"] if file else None
+
+    async def put(self, key: str, data: bytes):
+        if await self._file_id(key) is None:
+            await self.bucket.upload_from_stream(key, data)
+
+    async def read(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Yield bytes start..end (inclusive, to the end of the blob by default)."""
+        file_id = await self._file_id(key)
+        if file_id is None:
+            raise FileNotFoundError(key)
+
+        stream = await self.bucket.open_download_stream(file_id)
+        stream.seek(start)
+        remaining = (stream.length if end is None else end + 1) - start
+        while remaining > 0:
+            data = await stream.read(min(READ_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+    async def delete(self, key: str):
+        file_id = await self._file_id(key)
+        if file_id is not None:
+            await self.bucket.delete(file_id)
+
+_stores: Dict[str, Any] = {}
+
+def get_blob_store(name: Optional[str] = None):
+    """The blob store for new bodies (CONTENT_STORE), or the one a stored body names."""
+    name = name or settings.CONTENT_STORE
+    if name not in _stores:
+        if name == "local":
+            _stores[name] = LocalBlobStore(settings.CONTENT_STORE_PATH)
+        elif name == "gridfs":
+            _stores[name] = GridFSBlobStore()
+        else:
+            raise ValueError(f"Unknown content store: {name}")
+    return _stores[name]
+
+async def store_body(content: str) -> Optional[Dict[str, Any]]:
+    """
+    Store a document body out-of-line if it is over CONTENT_INLINE_THRESHOLD bytes.
+
+    Returns:
+        A reference to the stored body, or None if it should be kept inline
+    """
+    data = content.encode("utf-8")
+    if len(data) <= settings.CONTENT_INLINE_THRESHOLD:
+        return None
+
+    # hashlib releases the GIL on large inputs, so a thread keeps the event loop free
+    key = await asyncio.get_running_loop().run_in_executor(None, lambda: hashlib.sha256(data).hexdigest())
+    store = get_blob_store()
+    # The reference is counted before the write, so the blob cannot be released in between
+    await _acquire(store.name, key)
+    await store.put(key, data)
+    return {"store": store.name, "key": key, "size": len(data)}
+
+async def _acquire(store_name: str, key: str):
+    """Count one more reference to a blob, waiting for a deletion of it in progress to finish."""
+    while True:
+        try:
+            await db.db.blob_refs.update_one(
+                {"_id": key, "deleting_at": None},
+                {"$inc": {"refs": 1}, "$setOnInsert": {"store": store_name}},
+                upsert=True
+            )
+            return
+        except DuplicateKeyError:
+            # Being deleted: take over a deletion that stalled, otherwise wait for it to finish
+            result = await db.db.blob_refs.update_one(
+                {"_id": key, "deleting_at": {"$lt": datetime.utcnow() - DELETE_LEASE}},
+                {"$set": {"refs": 1, "deleting_at": None}}
+            )
+            if result.modified_count:
+                return
+            await asyncio.sleep(0.05)
+
+async def load_body(ref: Dict[str, Any]) -> str:
+    """Read a whole out-of-line body."""
+    parts = [data async for data in get_blob_store(ref["store"]).read(ref["key"])]
+    return b"".join(parts).decode("utf-8")
+
+def read_body(ref: Dict[str, Any], start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Stream a byte range of an out-of-line body."""
+    return get_blob_store(ref["store"]).read(ref["key"], start, end)
+
+async def release_body(ref: Optional[Dict[str, Any]]):
+    """
+    Drop a document's reference to a body, deleting the body once nothing references it.
+
+    References are counted in blob_refs with atomic updates. The last release
+    marks the count as deleting, which holds off new references (see
+    store_body) until the blob is gone, so a body stored concurrently is
+    never deleted from under its document.
+    """
+    if not ref:
+        return
+    key = ref["key"]
+    claimed_at = datetime.utcnow()
+
+    counted = await db.db.blob_refs.find_one_and_update(
+        {"_id": key}, {"$inc": {"refs": -1}}, return_document=ReturnDocument.AFTER
+    )
+    if counted is None:
+        # Stored before references were counted: claim the blob for deletion directly
+        try:
+            await db.db.blob_refs.insert_one({"_id": key, "store": ref["store"], "refs": 0, "deleting_at": claimed_at})
+        except DuplicateKeyError:
+            return
+    elif counted["refs"] > 0:
+        return
+    else:
+        claimed = await db.db.blob_refs.update_one(
+            {"_id": key, "refs": {"$lte": 0}, "deleting_at": None}, {"$set": {"deleting_at": claimed_at}}
+        )
+        if not claimed.modified_count:
+            return
+
+    # Documents stored before references were counted still hold uncounted ones
+    uncounted = await db.db.documents.count_documents({"content_ref.key": key})
+    if uncounted:
+        await db.db.blob_refs.update_one(
+            {"_id": key, "deleting_at": claimed_at}, {"$set": {"refs": uncounted, "deleting_at": None}}
+        )
+        return
+
+    await get_blob_store(ref["store"]).delete(key)
+    await db.db.blob_refs.delete_one({"_id": key, "deleting_at": claimed_at})
@@ -1,6 +1,4 @@
 import logging
-import chromadb
-from chromadb.config import Settings as ChromaSettings
 from app.core.config import settings
 
 class ChromaClient:
@@ -11,6 +9,10 @@ chroma = ChromaClient()
 
 async def initialize_chroma():
     """Initialize ChromaDB client."""
+    # chromadb is by far the heaviest import, so it is only loaded on startup
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    
     logging.info("Initializing ChromaDB client...")
     
     # For HTTP client (when using ChromaDB as a service)
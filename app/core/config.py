@@ -20,6 +20,12 @@ class Settings(BaseModel):
     # MongoDB settings
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     MONGODB_DB_NAME: str = os.getenv("MONGODB_DB_NAME", "rag_db")
+    COUNT_CACHE_TTL: float = float(os.getenv("COUNT_CACHE_TTL", "30"))  # Seconds to cache filtered counts
+    
+    # Chat persistence settings ("sync" writes on the request path, "buffered" uses write-behind)
+    CHAT_DURABILITY_MODE: str = os.getenv("CHAT_DURABILITY_MODE", "sync")
+    WRITE_BEHIND_FLUSH_INTERVAL: float = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))  # Seconds
+    WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
     
     # ChromaDB settings
     CHROMADB_HOST: str = os.getenv("CHROMADB_HOST", "localhost")
@@ -32,6 +38,95 @@ class Settings(BaseModel):
     DEFAULT_LLM_MODEL: str = os.getenv("DEFAULT_LLM_MODEL", "anthropic/claude-3-opus-20240229")
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "openai/text-embedding-3-small")
     
+    # Embedding provider: "openrouter", or "local" to embed in-process with the sentence-transformers
+    # model at EMBEDDING_LOCAL_MODEL_PATH ("torch" or "onnx" backend). A local model needs its own name
+    # in EMBEDDING_LOCAL_MODEL, and is only served for a collection embedded with that model
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "openrouter")
+    EMBEDDING_LOCAL_MODEL: str = os.getenv("EMBEDDING_LOCAL_MODEL", "")
+    EMBEDDING_LOCAL_MODEL_PATH: str = os.getenv("EMBEDDING_LOCAL_MODEL_PATH", "")
+    EMBEDDING_LOCAL_BACKEND: str = os.getenv("EMBEDDING_LOCAL_BACKEND", "torch")
+    EMBEDDING_LOCAL_BATCH_SIZE: int = int(os.getenv("EMBEDDING_LOCAL_BATCH_SIZE", "32"))  # Texts per forward pass
+    EMBEDDING_LOCAL_THREADS: int = int(os.getenv("EMBEDDING_LOCAL_THREADS", "2"))  # Batches encoded at once
+    
+    # Compact vector storage: truncate the vectors indexed in Chroma (0 keeps full size) and
+    # optionally keep a full-size copy ("none", "float32", "float16" or "int8") to rescore candidates
+    EMBEDDING_INDEX_DIMENSIONS: int = int(os.getenv("EMBEDDING_INDEX_DIMENSIONS", "0"))
+    EMBEDDING_RESCORE_DTYPE: str = os.getenv("EMBEDDING_RESCORE_DTYPE", "none")
+    RESCORE_CANDIDATE_FACTOR: int = int(os.getenv("RESCORE_CANDIDATE_FACTOR", "4"))  # Candidates fetched per result (overridable per search)
+    
+    # OpenRouter rate limiting and retry settings
+    OPENROUTER_RATE_LIMIT: float = float(os.getenv("OPENROUTER_RATE_LIMIT", "10"))  # Requests per second
+    OPENROUTER_BURST: int = int(os.getenv("OPENROUTER_BURST", "20"))
+    OPENROUTER_MIN_CONCURRENCY: int = int(os.getenv("OPENROUTER_MIN_CONCURRENCY", "1"))
+    OPENROUTER_MAX_CONCURRENCY: int = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "16"))
+    OPENROUTER_MAX_RETRIES: int = int(os.getenv("OPENROUTER_MAX_RETRIES", "5"))
+    OPENROUTER_BACKOFF_BASE: float = float(os.getenv("OPENROUTER_BACKOFF_BASE", "0.5"))  # Seconds
+    OPENROUTER_BACKOFF_MAX: float = float(os.getenv("OPENROUTER_BACKOFF_MAX", "30"))  # Seconds
+    
+    # Response compression ("none", "gzip" or "brotli", which falls back to gzip if unavailable)
+    RESPONSE_COMPRESSION: str = os.getenv("RESPONSE_COMPRESSION", "gzip")
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))  # Bytes
+    
+    # On-demand profiling (the middleware is only installed when enabled)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "False") == "True"
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")  # Value of the X-Profile header that triggers a profile
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # Fraction of requests to profile
+    PROFILING_INTERVAL: float = float(os.getenv("PROFILING_INTERVAL", "0.001"))  # Sampling interval in seconds
+    PROFILING_OUTPUT_DIR: str = os.getenv("PROFILING_OUTPUT_DIR", "./profiles")
+    
+    # Background jobs and blue/green re-indexing
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))  # A job not heard from for this long can be resumed
+    REINDEX_RATE: float = float(os.getenv("REINDEX_RATE", "50"))  # Chunks re-embedded per second
+    BULK_DELETE_BATCH_SIZE: int = int(os.getenv("BULK_DELETE_BATCH_SIZE", "200"))  # Documents per delete batch
+    REINDEX_BATCH_SIZE: int = int(os.getenv("REINDEX_BATCH_SIZE", "64"))  # Chunks per embedding call
+    ACTIVE_COLLECTION_POLL_INTERVAL: float = float(os.getenv("ACTIVE_COLLECTION_POLL_INTERVAL", "5"))  # Seconds
+    # Seconds a re-index waits after the cut-over before its final catch-up, so workers still on the old
+    # collection can switch over and finish their ingests (never less than the poll interval plus INGEST_DEADLINE)
+    REINDEX_CUTOVER_GRACE: float = float(os.getenv("REINDEX_CUTOVER_GRACE", "0"))
+    
+    # Tokens a chat session may use before generation is refused (0 for no limit; sessions can set their own)
+    SESSION_TOKEN_BUDGET: int = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))
+    
+    # Namespace of requests without an X-Namespace header (and of records written before namespaces)
+    DEFAULT_NAMESPACE: str = os.getenv("DEFAULT_NAMESPACE", "default")
+    
+    # NDJSON exports read Mongo cursors in batches of this many rows
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+    
+    # Document bodies over the threshold are kept out-of-line in a content-addressed
+    # blob store ("gridfs" or "local", a directory tree under CONTENT_STORE_PATH)
+    CONTENT_INLINE_THRESHOLD: int = int(os.getenv("CONTENT_INLINE_THRESHOLD", "65536"))  # Bytes of UTF-8
+    CONTENT_STORE: str = os.getenv("CONTENT_STORE", "gridfs")
+    CONTENT_STORE_PATH: str = os.getenv("CONTENT_STORE_PATH", "./blobs")
+    
+    # CPU-bound text processing (normalization and chunking) of bodies over the threshold runs in
+    # a pool of worker processes instead of on the event loop (0 workers processes everything inline)
+    TEXT_PROCESS_WORKERS: int = int(os.getenv("TEXT_PROCESS_WORKERS", "2"))
+    TEXT_PROCESS_THRESHOLD: int = int(os.getenv("TEXT_PROCESS_THRESHOLD", "262144"))  # Characters
+    
+    # Corpus snapshots ("float16" halves the vector size at a small precision cost)
+    SNAPSHOT_DIR: str = os.getenv("SNAPSHOT_DIR", "./snapshots")  # Where uploaded snapshots are staged
+    SNAPSHOT_BATCH_SIZE: int = int(os.getenv("SNAPSHOT_BATCH_SIZE", "1000"))  # Rows per row group
+    SNAPSHOT_VECTOR_DTYPE: str = os.getenv("SNAPSHOT_VECTOR_DTYPE", "float32")
+    
+    # Admission control for expensive routes: requests handled at once, requests queued beyond
+    # that, and the default deadline in seconds (clients can shorten it with X-Request-Timeout)
+    CHAT_MAX_CONCURRENCY: int = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+    CHAT_MAX_QUEUE: int = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+    CHAT_DEADLINE: float = float(os.getenv("CHAT_DEADLINE", "60"))
+    SEARCH_MAX_CONCURRENCY: int = int(os.getenv("SEARCH_MAX_CONCURRENCY", "32"))
+    SEARCH_MAX_QUEUE: int = int(os.getenv("SEARCH_MAX_QUEUE", "64"))
+    SEARCH_DEADLINE: float = float(os.getenv("SEARCH_DEADLINE", "10"))
+    INGEST_MAX_CONCURRENCY: int = int(os.getenv("INGEST_MAX_CONCURRENCY", "4"))
+    INGEST_MAX_QUEUE: int = int(os.getenv("INGEST_MAX_QUEUE", "16"))
+    INGEST_DEADLINE: float = float(os.getenv("INGEST_DEADLINE", "120"))
+    
+    # Startup and readiness (/readyz only succeeds once MongoDB and Chroma respond)
+    STARTUP_BUDGET_SECONDS: float = float(os.getenv("STARTUP_BUDGET_SECONDS", "10"))  # Warn when startup takes longer
+    READINESS_WARMUP: bool = os.getenv("READINESS_WARMUP", "False") == "True"  # Run a warm-up embedding and query
+    READINESS_CHECK_TIMEOUT: float = float(os.getenv("READINESS_CHECK_TIMEOUT", "5"))  # Seconds per check
+    READINESS_RECHECK_INTERVAL: float = float(os.getenv("READINESS_RECHECK_INTERVAL", "10"))  # Seconds
+    
     # CORS settings
     ALLOWED_HOSTS: List[str] = ["*"]
 
@@ -1,22 +1,55 @@
 import logging
-from motor.motor_asyncio import AsyncIOMotorClient
+from typing import TYPE_CHECKING
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
 class Database:
-    client: AsyncIOMotorClient = None
+    client: "AsyncIOMotorClient" = None
     db = None
 
 db = Database()
 
 async def connect_to_mongodb():
     """Create database connection."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    
     logging.info("Connecting to MongoDB...")
     db.client = AsyncIOMotorClient(settings.MONGODB_URL)
     db.db = db.client[settings.MONGODB_DB_NAME]
     logging.info("Connected to MongoDB!")
 
+async def create_indexes():
+    """Create the indexes backing list, pagination and lookup queries."""
+    logging.info("Ensuring MongoDB indexes...")
+    # Every document and session query is scoped to a namespace, so indexes lead with it
+    await db.db.documents.create_index([("namespace", 1), ("created_at", -1), ("_id", -1)])
+    await db.db.documents.create_index([("namespace", 1), ("title_prefixes", 1), ("created_at", -1), ("_id", -1)])
+    await db.db.documents.create_index([("namespace", 1), ("title_tokens", 1), ("created_at", -1), ("_id", -1)])
+    await db.db.documents.create_index([("namespace", 1), ("title_trigrams", 1)])
+    await db.db.documents.create_index("content_ref.key", sparse=True)
+    await db.db.document_bodies.files.create_index("filename")
+    await db.db.document_chunks.create_index([("document_id", 1), ("chunk_index", 1)])
+    await db.db.document_chunks.create_index("vector_id")
+    await db.db.chat_sessions.create_index([("namespace", 1), ("created_at", -1), ("_id", -1)])
+    await db.db.chat_sessions.create_index([("namespace", 1), ("updated_at", -1), ("_id", -1)])
+    await db.db.chat_messages.create_index([("session_id", 1), ("created_at", 1)])
+    await db.db.jobs.create_index([("kind", 1), ("created_at", -1)])
+    await db.db.usage_rollups.create_index(
+        [("day", 1), ("namespace", 1), ("kind", 1), ("model", 1), ("session_id", 1), ("document_id", 1)],
+        unique=True
+    )
+    logging.info("MongoDB indexes ready!")
+
 async def close_mongodb_connection():
     """Close database connection."""
+    # Imported here because the write-behind buffer itself depends on this module
+    from app.core.write_behind import write_behind
+    
+    # Persist buffered chat writes before the client goes away
+    await write_behind.drain()
+    
     logging.info("Closing connection to MongoDB...")
     if db.client:
         db.client.close()
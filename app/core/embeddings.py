@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.core.admission import check_budget
+from app.core.config import settings
+from app.core.metrics import track_stage
+from app.core.openrouter import OpenRouterClient
+from app.core.rate_limiter import Priority
+
+class UnsupportedEmbeddingModel(ValueError):
+    """The configured embedding provider cannot produce the requested model."""
+
+class LocalEmbeddingProvider:
+    """
+    In-process embeddings from a sentence-transformers model loaded from a local path.
+
+    Inference runs on a small thread pool (the model releases the GIL while
+    computing). Concurrent calls are coalesced into batches of up to batch_size
+    texts, so a burst of single-query embeddings costs a few forward passes
+    instead of one each. Responses have the same shape as OpenRouter's.
+    """
+
+    def __init__(self, model_name: str, model_path: str, backend: str = "torch",
+                 batch_size: int = 32, threads: int = 2):
+        self.model_name = model_name
+        self.model_path = model_path
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.threads = max(1, threads)
+
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="embedding")
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._active_batches = 0
+        # The event loop only keeps weak references to tasks, so batch runners are held here
+        self._batch_tasks: Set[asyncio.Task] = set()
+
+    def check_model(self, model: Optional[str]):
+        """
+        Check that this provider can embed with model.
+
+        Raises:
+            UnsupportedEmbeddingModel: If model is not the one this provider serves
+        """
+        if model and model != self.model_name:
+            raise UnsupportedEmbeddingModel(f"The local embedding provider serves {self.model_name}, not {model}")
+
+    async def generate_embeddings(self, texts, model=None, priority=Priority.INTERACTIVE) -> Dict[str, Any]:
+        """Embed texts with the local model (priority is accepted for interface compatibility)."""
+        if not isinstance(texts, list):
+            texts = [texts]
+        self.check_model(model)
+
+        check_budget("embedding")
+        with track_stage("embedding"):
+            future = asyncio.get_running_loop().create_future()
+            self._pending.append((texts, future))
+            if self._active_batches < self.threads:
+                self._active_batches += 1
+                task = asyncio.ensure_future(self._run_batches())
+                self._batch_tasks.add(task)
+                task.add_done_callback(self._batch_tasks.discard)
+            vectors = await future
+
+        return {
+            "model": self.model_name,
+            "data": [{"index": i, "embedding": vector} for i, vector in enumerate(vectors)]
+        }
+
+    async def _run_batches(self):
+        """Encode pending requests batch by batch until none are left."""
+        loop = asyncio.get_running_loop()
+        try:
+            while self._pending:
+                # Whole requests are taken until the batch is full, so each is encoded in one pass
+                batch = [self._pending.pop(0)]
+                size = len(batch[0][0])
+                while self._pending and size + len(self._pending[0][0]) <= self.batch_size:
+                    size += len(self._pending[0][0])
+                    batch.append(self._pending.pop(0))
+
+                texts = [text for request_texts, _ in batch for text in request_texts]
+                try:
+                    vectors = await loop.run_in_executor(self._executor, self._encode, texts)
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                offset = 0
+                for request_texts, future in batch:
+                    if not future.done():
+                        future.set_result(vectors[offset:offset + len(request_texts)])
+                    offset += len(request_texts)
+        finally:
+            self._active_batches -= 1
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._get_model().encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.tolist()
+
+    def _get_model(self):
+        with self._load_lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise RuntimeError(
+                        "EMBEDDING_PROVIDER=local requires sentence-transformers (pip install sentence-transformers)"
+                    )
+                kwargs = {"backend": self.backend} if self.backend != "torch" else {}
+                logging.info(f"Loading local embedding model from {self.model_path} ({self.backend})")
+                self._model = SentenceTransformer(self.model_path, device="cpu", **kwargs)
+            return self._model
+
+_local_provider: Optional[LocalEmbeddingProvider] = None
+
+def get_embedding_provider():
+    """
+    Get the configured embedding provider.
+
+    Both providers offer generate_embeddings(texts, model=None, priority=...)
+    returning OpenRouter-shaped responses, and check_model(model) to reject a
+    model they cannot produce before any work is started.
+    """
+    global _local_provider
+    if settings.EMBEDDING_PROVIDER != "local":
+        return OpenRouterClient()
+
+    if _local_provider is None:
+        if not settings.EMBEDDING_LOCAL_MODEL or not settings.EMBEDDING_LOCAL_MODEL_PATH:
+            raise RuntimeError("EMBEDDING_PROVIDER=local requires EMBEDDING_LOCAL_MODEL and EMBEDDING_LOCAL_MODEL_PATH")
+        _local_provider = LocalEmbeddingProvider(
+            model_name=settings.EMBEDDING_LOCAL_MODEL,
+            model_path=settings.EMBEDDING_LOCAL_MODEL_PATH,
+            backend=settings.EMBEDDING_LOCAL_BACKEND,
+            batch_size=settings.EMBEDDING_LOCAL_BATCH_SIZE,
+            threads=settings.EMBEDDING_LOCAL_THREADS
+        )
+    return _local_provider
+
+def default_embedding_model() -> str:
+    """The model new collections are embedded with: the local model's name, or EMBEDDING_MODEL."""
+    if settings.EMBEDDING_PROVIDER == "local":
+        return settings.EMBEDDING_LOCAL_MODEL
+    return settings.EMBEDDING_MODEL
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.core.database import db
+
+# Job statuses; interrupted and failed jobs can be resumed from their last checkpoint
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested."""
+
+class JobManager:
+    """
+    Long-running background jobs with progress and checkpoints persisted in Mongo.
+
+    A running job holds a lease that it renews whenever it reports progress.
+    If the process dies, the lease expires and the job can be resumed from
+    its last checkpoint by any process.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def create(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": PENDING,
+            "params": params,
+            "progress": {},
+            "checkpoint": None,
+            "result": None,
+            "error": None,
+            "cancel_requested": False,
+            "lease_until": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        await db.db.jobs.insert_one(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await db.db.jobs.find_one({"_id": job_id})
+
+    async def list(self, kind: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        query = {"kind": kind} if kind else {}
+        cursor = db.db.jobs.find(query).sort("created_at", -1).limit(limit)
+        return [job async for job in cursor]
+
+    async def claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Take ownership of a job that is not finished and not held by a live lease."""
+        now = datetime.utcnow()
+        return await db.db.jobs.find_one_and_update(
+            {
+                "_id": job_id,
+                "status": {"$in": [PENDING, RUNNING, INTERRUPTED, FAILED]},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            {"$set": {
+                "status": RUNNING,
+                "error": None,
+                "lease_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                "updated_at": now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def checkpoint(self, job_id: str, progress: Dict[str, Any], checkpoint: Any = None):
+        """
+        Record progress (and optionally a resume point) and renew the lease.
+
+        Raises:
+            JobCancelled: If cancellation was requested for the job
+        """
+        now = datetime.utcnow()
+        update = {
+            "progress": progress,
+            "lease_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            "updated_at": now
+        }
+        if checkpoint is not None:
+            update["checkpoint"] = checkpoint
+        job = await db.db.jobs.find_one_and_update(
+            {"_id": job_id}, {"$set": update}, projection={"cancel_requested": 1}
+        )
+        if job and job.get("cancel_requested"):
+            raise JobCancelled()
+
+    async def cancel(self, job_id: str) -> bool:
+        """Request cancellation; the owning process stops at its next checkpoint."""
+        job = await db.db.jobs.find_one_and_update(
+            {"_id": job_id, "status": {"$in": [PENDING, RUNNING, INTERRUPTED, FAILED]}},
+            {"$set": {"cancel_requested": True, "updated_at": datetime.utcnow()}}
+        )
+        if job is None:
+            return False
+
+        # Jobs that are not running have nobody to notice the request
+        if job["status"] != RUNNING:
+            await db.db.jobs.update_one({"_id": job_id}, {"$set": {"status": CANCELLED}})
+
+        task = self._tasks.get(job_id)
+        if task:
+            task.cancel()
+        return True
+
+    async def run(self, job_id: str, fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+        """Claim a job and run it in the current task, recording its outcome."""
+        await self._execute(await self._claim_or_raise(job_id), fn)
+
+    async def spawn(self, job_id: str, fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Claim a job and run it in the background of this process."""
+        job = await self._claim_or_raise(job_id)
+        task = asyncio.ensure_future(self._execute(job, fn))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return job
+
+    async def _claim_or_raise(self, job_id: str) -> Dict[str, Any]:
+        job = await self.claim(job_id)
+        if job is None:
+            raise ValueError(f"Job {job_id} does not exist, is finished or is owned by another process")
+        return job
+
+    async def _execute(self, job: Dict[str, Any], fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+        job_id = job["_id"]
+        status, result, error = COMPLETED, None, None
+        try:
+            result = await fn(job)
+        except (JobCancelled, asyncio.CancelledError):
+            # A shutdown interrupts the job; an explicit request cancels it
+            current = await self.get(job_id)
+            status = CANCELLED if current and current.get("cancel_requested") else INTERRUPTED
+        except Exception as e:
+            logging.exception(f"Job {job_id} ({job['kind']}) failed")
+            status, error = FAILED, str(e)
+
+        await db.db.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {
+                "status": status,
+                "result": result,
+                "error": error,
+                "lease_until": None,
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        logging.info(f"Job {job_id} ({job['kind']}) {status}")
+
+    async def shutdown(self):
+        """Interrupt jobs running in this process; they can be resumed later."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+jobs = JobManager()
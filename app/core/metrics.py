@@ -0,0 +1,135 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from prometheus_client import Counter, Histogram
+
+# Buckets from 1ms to 60s, covering both Mongo lookups and LLM completions
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "Latency of individual request processing stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    "rag_stage_errors_total",
+    "Stages that raised an exception",
+    ["stage"]
+)
+REQUEST_LATENCY = Histogram(
+    "rag_http_request_duration_seconds",
+    "End-to-end HTTP request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTIONS = Counter(
+    "rag_admission_rejected_total",
+    "Requests shed by admission control",
+    ["route", "reason"]
+)
+DEADLINE_EXCEEDED = Counter(
+    "rag_deadline_exceeded_total",
+    "Requests failed before a stage their remaining deadline could not cover",
+    ["stage"]
+)
+OPENROUTER_TOKENS = Counter(
+    "rag_openrouter_tokens_total",
+    "Tokens reported by OpenRouter usage blocks",
+    ["operation", "model", "kind"]
+)
+
+# Weight of the latest observation in each stage's moving average latency
+STAGE_LATENCY_SMOOTHING = 0.2
+
+# Per-request stage timings, collected for the Server-Timing header
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+# Moving average latency of each stage that completed, for deadline checks
+_expected_latency: Dict[str, float] = {}
+
+@contextmanager
+def track_stage(stage: str):
+    """Time a processing stage into the stage histogram and the current request's timings."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.labels(stage).observe(elapsed)
+        if not failed:
+            previous = _expected_latency.get(stage)
+            _expected_latency[stage] = elapsed if previous is None else previous + STAGE_LATENCY_SMOOTHING * (elapsed - previous)
+
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+def expected_stage_latency(stage: str) -> float:
+    """Moving average latency of a stage in seconds (0 until it has completed once)."""
+    return _expected_latency.get(stage, 0.0)
+
+def record_usage(operation: str, model: str, usage: Optional[Dict[str, Any]]):
+    """Record the token counts from an OpenRouter usage block."""
+    if not usage:
+        return
+
+    for kind in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = usage.get(kind)
+        if value:
+            OPENROUTER_TOKENS.labels(operation, model or "unknown", kind).inc(value)
+
+def format_server_timing(timings: Dict[str, float], total: float) -> str:
+    """Format stage timings (in seconds) as a Server-Timing header value."""
+    entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency and adding a Server-Timing header.
+
+    Stage timings recorded with track_stage while handling the request are
+    reported individually in the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _stage_timings.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header = format_server_timing(timings, time.perf_counter() - started)
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _stage_timings.reset(token)
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                getattr(route, "path", "<unmatched>"),
+                str(status_code)
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,88 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from app.core.config import settings
+from app.core.database import db
+from app.core.chroma_client import chroma
+
+# Short enough that "<collection>--<namespace>" stays within Chroma's 63 character limit
+NAMESPACE_PATTERN = re.compile(r"^[a-z0-9](?:[a-z0-9_-]{0,22}[a-z0-9])?$")
+
+# Separates the active collection's name from the namespace in per-namespace collection names
+COLLECTION_SEPARATOR = "--"
+
+# Namespaces known to have been written to, so lookups of unknown ones never create collections
+_known_namespaces: Set[str] = set()
+_collections: Dict[str, Any] = {}
+
+def validate_namespace(namespace: str) -> str:
+    """
+    Check a namespace name.
+
+    Raises:
+        ValueError: If it is not 1-24 lowercase letters, digits, "-" or "_"
+    """
+    if not NAMESPACE_PATTERN.match(namespace or ""):
+        raise ValueError(
+            f"Invalid namespace {namespace!r}: use 1-24 lowercase letters, digits, '-' or '_'"
+        )
+    return namespace
+
+def namespace_filter(namespace: str) -> Dict[str, Any]:
+    """Mongo filter for records in a namespace (records written before namespaces are in the default one)."""
+    if namespace == settings.DEFAULT_NAMESPACE:
+        return {"namespace": {"$in": [None, namespace]}}
+    return {"namespace": namespace}
+
+def record_namespace(record: Dict[str, Any]) -> str:
+    return record.get("namespace") or settings.DEFAULT_NAMESPACE
+
+def collection_name(base: str, namespace: str) -> str:
+    """Name of a namespace's vector collection; the default namespace uses the base collection itself."""
+    if namespace == settings.DEFAULT_NAMESPACE:
+        return base
+    return f"{base}{COLLECTION_SEPARATOR}{namespace}"
+
+async def register_namespace(namespace: str):
+    """Record that a namespace is in use."""
+    if namespace in _known_namespaces:
+        return
+    await db.db.namespaces.update_one(
+        {"_id": namespace}, {"$setOnInsert": {"created_at": datetime.utcnow()}}, upsert=True
+    )
+    _known_namespaces.add(namespace)
+
+async def list_namespaces() -> List[str]:
+    """All namespaces in use, the default one first."""
+    names = {doc["_id"] async for doc in db.db.namespaces.find({}, {"_id": 1})}
+    _known_namespaces.update(names)
+    names.discard(settings.DEFAULT_NAMESPACE)
+    return [settings.DEFAULT_NAMESPACE] + sorted(names)
+
+async def get_namespace_collection(namespace: str, create: bool = False, base: Optional[str] = None):
+    """
+    Get the vector collection of a namespace within the active collection (or base).
+
+    Returns None for a namespace that has never been written to, unless create
+    is set, so reads cannot create collections.
+    """
+    base = base or chroma.collection.name
+    if namespace == settings.DEFAULT_NAMESPACE and base == chroma.collection.name:
+        return chroma.collection
+
+    name = collection_name(base, namespace)
+    if name not in _collections:
+        if create:
+            await register_namespace(namespace)
+        elif namespace not in _known_namespaces and not await db.db.namespaces.find_one({"_id": namespace}):
+            return None
+        _collections[name] = chroma.client.get_or_create_collection(
+            name=name, metadata={"hnsw:space": "cosine"}
+        )
+        _known_namespaces.add(namespace)
+    return _collections[name]
+
+def forget_collections(base: str):
+    """Drop cached handles of a base collection's namespace collections (after deleting them)."""
+    for name in [name for name in _collections if name == base or name.startswith(f"{base}{COLLECTION_SEPARATOR}")]:
+        del _collections[name]
@@ -1,68 +1,166 @@
+import asyncio
 import httpx
 import logging
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from app.core.admission import budget_timeout, check_budget, shared_call
 from app.core.config import settings
+from app.core.metrics import track_stage, record_usage
+from app.core.rate_limiter import openrouter_limiter, Priority
+from app.utils.singleflight import SingleFlight, make_key
+
+# Status codes worth retrying; 429 and 503 also shrink the concurrency limit
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+
+# Identical embedding requests in flight at the same time share one upstream call
+embedding_flight = SingleFlight("openrouter.generate_embeddings")
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    ceiling = min(settings.OPENROUTER_BACKOFF_MAX, settings.OPENROUTER_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
 
 class OpenRouterClient:
     """Client for interacting with OpenRouter API."""
-    
+
     def __init__(self, api_key=None, base_url=None):
         self.api_key = api_key or settings.OPENROUTER_API_KEY
         self.base_url = base_url or settings.OPENROUTER_API_URL
-        
+
         if not self.api_key:
             logging.warning("OpenRouter API key not set")
-    
-    async def generate_embeddings(self, texts, model=None):
+
+    def check_model(self, model: Optional[str]):
+        """Any model OpenRouter offers can be requested, so nothing is rejected up front."""
+
+    async def generate_embeddings(self, texts, model=None, priority=Priority.INTERACTIVE):
         """Generate embeddings for the provided texts."""
         if not isinstance(texts, list):
             texts = [texts]
-            
+
         model = model or settings.EMBEDDING_MODEL
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/embeddings",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    # "HTTP-Referer": "https://your-app-url.com",  # Replace with your app URL
-                    "X-Title": settings.PROJECT_NAME
-                },
-                json={
-                    "model": model,
-                    "input": texts
-                },
-                timeout=60.0
+
+        with track_stage("embedding"):
+            # Priority is part of the key, so interactive callers never wait in a background call's queue
+            return await shared_call(
+                embedding_flight,
+                make_key(self.base_url, model, texts, priority),
+                lambda: self._post(
+                    "/embeddings",
+                    {
+                        "model": model,
+                        "input": texts
+                    },
+                    priority=priority,
+                    stage="embedding",
+                    operation="embeddings",
+                    action="generating embeddings"
+                ),
+                "embedding"
             )
-            
-            if response.status_code != 200:
-                logging.error(f"Error generating embeddings: {response.text}")
-                response.raise_for_status()
-                
-            return response.json()
-    
-    async def generate_completion(self, messages, model=None, temperature=0.7, max_tokens=1000):
+
+    async def generate_completion(self, messages, model=None, temperature=0.7, max_tokens=1000,
+                                  priority=Priority.INTERACTIVE):
         """Generate a completion using the OpenRouter API."""
         model = model or settings.DEFAULT_LLM_MODEL
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    # "HTTP-Referer": "https://your-app-url.com",  # Replace with your app URL
-                    "X-Title": settings.PROJECT_NAME
-                },
-                json={
+
+        with track_stage("completion"):
+            return await self._post(
+                "/chat/completions",
+                {
                     "model": model,
                     "messages": messages,
                     "temperature": temperature,
                     "max_tokens": max_tokens
                 },
-                timeout=60.0
+                priority=priority,
+                stage="completion",
+                operation="completion",
+                action="generating completion"
             )
-            
-            if response.status_code != 200:
-                logging.error(f"Error generating completion: {response.text}")
-                response.raise_for_status()
-                
-            return response.json()
\ No newline at end of file
+
+    async def _post(self, path, payload, priority, stage, operation, action):
+        """
+        POST to OpenRouter through the shared limiter, retrying throttled and failed calls.
+
+        Within an admission-controlled request, no attempt starts that the request's
+        remaining deadline cannot cover, and each attempt times out by the deadline.
+        """
+        max_retries = settings.OPENROUTER_MAX_RETRIES
+
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            check_budget(stage)
+
+            async with openrouter_limiter.slot(priority):
+                try:
+                    async with httpx.AsyncClient() as client:
+                        response = await client.post(
+                            f"{self.base_url}{path}",
+                            headers={
+                                "Authorization": f"Bearer {self.api_key}",
+                                # "HTTP-Referer": "https://your-app-url.com",  # Replace with your app URL
+                                "X-Title": settings.PROJECT_NAME
+                            },
+                            json=payload,
+                            timeout=budget_timeout(60.0)
+                        )
+                except httpx.TransportError as e:
+                    if attempt == max_retries:
+                        logging.error(f"Error {action}: {e!r}")
+                        raise
+                    response = None
+                    logging.warning(f"Transport error {action} (attempt {attempt + 1}): {e!r}")
+
+                if response is not None:
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        openrouter_limiter.record_success()
+
+                        if response.status_code != 200:
+                            logging.error(f"Error {action}: {response.text}")
+                            response.raise_for_status()
+
+                        result = response.json()
+                        record_usage(operation, payload["model"], result.get("usage"))
+                        return result
+
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if response.status_code in THROTTLE_STATUS_CODES:
+                        openrouter_limiter.record_throttle(retry_after)
+
+                    if attempt == max_retries:
+                        logging.error(f"Error {action}: {response.text}")
+                        response.raise_for_status()
+
+                    logging.warning(
+                        f"OpenRouter returned {response.status_code} {action} (attempt {attempt + 1}), retrying"
+                    )
+
+            # Back off outside of the slot so other callers are not blocked
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, settings.OPENROUTER_BACKOFF_BASE)
+            else:
+                delay = backoff_delay(attempt)
+            await asyncio.sleep(delay)
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from app.core.config import settings
+
+class TextProcessingPool:
+    """
+    Worker processes for CPU-bound text processing of large inputs.
+
+    Inputs under the size threshold are processed inline, where a pool round
+    trip would cost more than the work. Larger ones run in a worker process,
+    so the event loop keeps serving other requests meanwhile. Workers are
+    spawned on first use, not forked from the running server.
+    """
+
+    def __init__(self, workers: int, threshold: int):
+        self.workers = workers
+        self.threshold = threshold
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, size: int, func: Callable[..., Any], *args) -> Any:
+        """Run func(*args), in a worker process if size is over the threshold and the pool is enabled."""
+        if self.workers <= 0 or size <= self.threshold:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for later calls
+            logging.warning("Text processing pool broke, restarting it")
+            self.shutdown()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self):
+        """Stop the worker processes (they are started again on the next large input)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+text_pool = TextProcessingPool(settings.TEXT_PROCESS_WORKERS, settings.TEXT_PROCESS_THRESHOLD)
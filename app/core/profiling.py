@@ -0,0 +1,86 @@
+import asyncio
+import hmac
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running a sampling profiler around selected requests.
+
+    A request is profiled when it carries an X-Profile header matching
+    PROFILING_TOKEN, or when it is picked by PROFILING_SAMPLE_RATE. The profile
+    is written in speedscope format (viewable as a flamegraph) to
+    PROFILING_OUTPUT_DIR, named after the request id. Requests that are not
+    selected pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.token = settings.PROFILING_TOKEN.encode("latin-1")
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.interval = settings.PROFILING_INTERVAL
+        self.output_dir = settings.PROFILING_OUTPUT_DIR
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self._request_id(scope)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            profiler.stop()
+            await self._write_profile(profiler, request_id, scope)
+
+    def _should_profile(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _request_id(self, scope) -> str:
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                # Only keep characters that are safe in a file name
+                request_id = re.sub(r"[^A-Za-z0-9_.-]", "_", value.decode("latin-1"))[:128]
+                if request_id.strip("."):
+                    return request_id
+        return uuid.uuid4().hex
+
+    async def _write_profile(self, profiler: Profiler, request_id: str, scope):
+        path = os.path.join(self.output_dir, f"{int(time.time())}-{request_id}.speedscope.json")
+        try:
+            output = profiler.output(renderer=SpeedscopeRenderer())
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _write_file, path, output)
+            logging.info(f"Profile for {scope['method']} {scope['path']} written to {path}")
+        except Exception as e:
+            logging.error(f"Error writing profile for request {request_id}: {str(e)}")
+
+def _write_file(path: str, content: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
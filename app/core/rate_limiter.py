@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+from app.core.config import settings
+
+class Priority:
+    """Priority classes for upstream calls (lower values are served first)."""
+    INTERACTIVE = 0  # Query embeddings and chat completions
+    BACKGROUND = 1  # Document ingestion and other bulk work
+
+    NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+class AdaptiveLimiter:
+    """
+    Client-side limiter combining a token bucket with an AIMD concurrency limit.
+
+    Callers queue by priority class, so interactive work always jumps ahead of
+    background work. The concurrency limit grows additively on success and is
+    halved whenever the upstream throttles us.
+    """
+
+    def __init__(self, rate: float, burst: int, min_concurrency: int, max_concurrency: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.concurrency_limit = float(self.max_concurrency)
+
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiters = []  # Heap of (priority, sequence, future)
+        self._sequence = itertools.count()
+        self._wakeup_handle = None
+        self._throttled = 0
+        self._class_stats = {
+            priority: {"queue_depth": 0, "acquired": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for priority in Priority.NAMES
+        }
+
+    async def acquire(self, priority: int = Priority.INTERACTIVE):
+        """Wait for a slot, honoring priority, rate, concurrency and pauses."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        stats = self._class_stats[priority]
+        started = time.monotonic()
+
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        stats["queue_depth"] += 1
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been granted just before the caller was cancelled
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+        finally:
+            stats["queue_depth"] -= 1
+
+        waited = time.monotonic() - started
+        stats["acquired"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def release(self):
+        """Return a slot and wake up the next waiter."""
+        self._in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = Priority.INTERACTIVE):
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_success(self):
+        """Additively increase the concurrency limit."""
+        self.concurrency_limit = min(
+            float(self.max_concurrency),
+            self.concurrency_limit + 1.0 / self.concurrency_limit
+        )
+        self._dispatch()
+
+    def record_throttle(self, retry_after: Optional[float] = None):
+        """Multiplicatively decrease the concurrency limit and pause if asked to."""
+        self._throttled += 1
+        self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+        self._tokens = 0.0
+
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get limiter state and per-class queue depth and wait times."""
+        now = time.monotonic()
+        self._refill(now)
+
+        classes = {}
+        for priority, name in Priority.NAMES.items():
+            stats = self._class_stats[priority]
+            acquired = stats["acquired"]
+            classes[name] = {
+                "queue_depth": stats["queue_depth"],
+                "acquired": acquired,
+                "avg_wait_seconds": stats["total_wait"] / acquired if acquired else 0.0,
+                "max_wait_seconds": stats["max_wait"]
+            }
+
+        return {
+            "concurrency_limit": int(self.concurrency_limit),
+            "in_flight": self._in_flight,
+            "tokens": round(self._tokens, 2),
+            "paused_for_seconds": max(0.0, self._paused_until - now),
+            "throttled": self._throttled,
+            "classes": classes
+        }
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._last_refill) * self.rate)
+        else:
+            self._tokens = float(self.burst)
+        self._last_refill = now
+
+    def _dispatch(self):
+        now = time.monotonic()
+        self._refill(now)
+
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                # Cancelled waiter, drop it
+                heapq.heappop(self._waiters)
+                continue
+
+            if self._in_flight >= int(self.concurrency_limit):
+                # A release will dispatch again
+                return
+
+            if now < self._paused_until:
+                self._schedule_wakeup(self._paused_until - now)
+                return
+
+            if self._tokens < 1.0:
+                self._schedule_wakeup((1.0 - self._tokens) / self.rate)
+                return
+
+            heapq.heappop(self._waiters)
+            self._tokens -= 1.0
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._wakeup_handle = loop.call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup_handle = None
+        self._dispatch()
+
+openrouter_limiter = AdaptiveLimiter(
+    rate=settings.OPENROUTER_RATE_LIMIT,
+    burst=settings.OPENROUTER_BURST,
+    min_concurrency=settings.OPENROUTER_MIN_CONCURRENCY,
+    max_concurrency=settings.OPENROUTER_MAX_CONCURRENCY
+)
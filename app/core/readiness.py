@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+
+# Imported first by main, so this approximates when the application started loading
+IMPORT_STARTED = time.perf_counter()
+
+class ReadinessState:
+    """
+    Startup timing and readiness of the application.
+
+    The application only reports ready once MongoDB answers a ping, its indexes
+    exist, the Chroma collection is loaded, the embedding provider can produce
+    the served collection's model and, if enabled, a warm-up embedding and
+    query have completed. After that the dependency checks are repeated at
+    most every READINESS_RECHECK_INTERVAL seconds when readiness is probed, so
+    a failed check is also retried and readiness recovers with the dependency.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self.phases: Dict[str, float] = {}
+        self.ready_after: Optional[float] = None
+        self.last_checked = 0.0
+        self.indexes_created = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def record_phase(self, name: str, seconds: float):
+        self.phases[name] = round(seconds, 4)
+
+    def startup_report(self) -> Dict[str, Any]:
+        return {
+            "phases": self.phases,
+            "ready_after_seconds": self.ready_after,
+            "budget_seconds": settings.STARTUP_BUDGET_SECONDS,
+            "within_budget": self.ready_after is not None and self.ready_after <= settings.STARTUP_BUDGET_SECONDS
+        }
+
+    async def check(self, warm_up: bool = False) -> bool:
+        """Run the dependency checks and update readiness."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            checks = [
+                ("mongodb", check_mongodb), ("indexes", self.ensure_indexes), ("chroma", check_chroma),
+                ("embedding_model", check_embedding_model)
+            ]
+            if warm_up:
+                checks.append(("warm_up", warm_up_retrieval))
+
+            ready = True
+            for name, check in checks:
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(check(), timeout=settings.READINESS_CHECK_TIMEOUT)
+                    self.checks[name] = {"ok": True}
+                except Exception as e:
+                    ready = False
+                    self.checks[name] = {"ok": False, "error": str(e) or type(e).__name__}
+                self.checks[name]["seconds"] = round(time.perf_counter() - started, 4)
+                if not ready:
+                    break
+
+            self.ready = ready
+            self.last_checked = time.monotonic()
+            return ready
+
+    async def ensure_indexes(self):
+        """Create the MongoDB indexes once (done here so an unreachable MongoDB does not fail startup)."""
+        from app.core.database import create_indexes
+
+        if self.indexes_created:
+            return
+        started = time.perf_counter()
+        await create_indexes()
+        self.indexes_created = True
+        self.record_phase("indexes", time.perf_counter() - started)
+
+    async def probe(self) -> bool:
+        """Readiness for the probe endpoint, re-checking dependencies when stale."""
+        # Until startup completes, the retry loop started by start() does the checking
+        if self.ready_after is None:
+            return self.ready
+        if time.monotonic() - self.last_checked >= settings.READINESS_RECHECK_INTERVAL:
+            return await self.check()
+        return self.ready
+
+    async def start(self):
+        """Startup handler: check readiness, retrying in the background until ready."""
+        started = time.perf_counter()
+        if await self.check(warm_up=settings.READINESS_WARMUP):
+            self._mark_ready(time.perf_counter() - started)
+        else:
+            logging.warning(f"Application not ready yet: {self.checks}")
+            self._task = asyncio.ensure_future(self._retry(started))
+
+    async def stop(self):
+        """Shutdown handler: stop retrying and report not ready."""
+        self.ready = False
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _retry(self, started: float):
+        delay = 0.5
+        while True:
+            await asyncio.sleep(delay)
+            if await self.check(warm_up=settings.READINESS_WARMUP):
+                self._mark_ready(time.perf_counter() - started)
+                return
+            delay = min(delay * 2, 10.0)
+
+    def _mark_ready(self, check_seconds: float):
+        self.record_phase("readiness_checks", check_seconds)
+        self.ready_after = round(time.perf_counter() - IMPORT_STARTED, 4)
+        logging.info(f"Application ready after {self.ready_after}s (phases: {self.phases})")
+        if self.ready_after > settings.STARTUP_BUDGET_SECONDS:
+            logging.warning(
+                f"Startup took {self.ready_after}s, over the {settings.STARTUP_BUDGET_SECONDS}s budget"
+            )
+
+def timed_startup(name: str, handler: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+    """Wrap a startup handler so its duration is recorded as a startup phase."""
+    async def run():
+        started = time.perf_counter()
+        try:
+            return await handler()
+        finally:
+            readiness.record_phase(name, time.perf_counter() - started)
+    return run
+
+async def check_mongodb():
+    from app.core.database import db
+    await db.client.admin.command("ping")
+
+async def check_chroma():
+    from app.core.chroma_client import chroma
+    if chroma.collection is None:
+        raise RuntimeError("Chroma collection not initialized")
+    # Counting forces the collection to be loaded (and the server to be reachable)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, chroma.collection.count)
+
+async def check_embedding_model():
+    """Refuse to serve a collection whose vectors come from a model the embedding provider does not produce."""
+    from app.core.active_collection import active
+    from app.core.embeddings import get_embedding_provider
+    get_embedding_provider().check_model(active.embedding_model)
+
+async def warm_up_retrieval():
+    """Run one query embedding and vector query so the first request does not pay for them."""
+    from app.core.active_collection import active
+    from app.core.chroma_client import chroma
+    from app.core.embeddings import get_embedding_provider
+    from app.utils.quantization import truncate_embeddings
+
+    response = await get_embedding_provider().generate_embeddings(["warm-up"], model=active.embedding_model)
+    embeddings = [response["data"][0]["embedding"]]
+    embedding = truncate_embeddings(embeddings, active.index_dimensions)[0].tolist()
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        None, lambda: chroma.collection.query(query_embeddings=[embedding], n_results=1)
+    )
+
+readiness = ReadinessState()
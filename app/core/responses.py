@@ -0,0 +1,57 @@
+from typing import Any, AsyncIterator, Dict
+import orjson
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse as BaseORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from app.utils.pagination import SortSpec, encode_cursor
+
+# Rows are sent in writes of about this size; the first row is always sent on its own
+NDJSON_FLUSH_BYTES = 64 * 1024
+
+def orjson_default(value: Any) -> Any:
+    """Serialize the types orjson does not handle natively."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """Encode content as JSON bytes (datetimes natively, ObjectIds as strings)."""
+    return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(BaseORJSONResponse):
+    """Default response class, encoding with orjson instead of the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+async def ndjson_rows(rows: AsyncIterator[Dict[str, Any]], sort: SortSpec) -> AsyncIterator[bytes]:
+    """
+    Encode Mongo rows as NDJSON, one object per line.
+
+    _id is renamed to id as in the JSON responses, and each row carries the
+    cursor to pass back to resume an interrupted export after it.
+    """
+    buffer = bytearray()
+    first = True
+    async for row in rows:
+        row["cursor"] = encode_cursor([row.get(field) for field, _ in sort])
+        row["id"] = row.pop("_id")
+        buffer += orjson.dumps(row, default=orjson_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+        if first or len(buffer) >= NDJSON_FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+            first = False
+    if buffer:
+        yield bytes(buffer)
+
+class NDJSONResponse(StreamingResponse):
+    """Stream rows as newline-delimited JSON while they are read from Mongo."""
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, rows: AsyncIterator[Dict[str, Any]], sort: SortSpec, **kwargs):
+        super().__init__(ndjson_rows(rows, sort), **kwargs)
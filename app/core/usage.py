@@ -0,0 +1,65 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.core.database import db
+
+# Counters accumulated from OpenRouter usage blocks (cost is only reported with usage accounting enabled)
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens", "cost")
+
+class TokenBudgetExceeded(Exception):
+    """A chat session has used up its token budget."""
+
+    def __init__(self, session_id: str, budget: int, used: int):
+        super().__init__(f"Session {session_id} has used {used} of its {budget} token budget")
+        self.session_id = session_id
+        self.budget = budget
+        self.used = used
+
+def usage_counts(usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The numeric counters of a usage block."""
+    if not usage:
+        return {}
+    return {field: usage[field] for field in USAGE_FIELDS if isinstance(usage.get(field), (int, float))}
+
+def usage_increments(usage: Optional[Dict[str, Any]], prefix: str = "usage") -> Dict[str, Any]:
+    """$inc operand adding a usage block's counters to the fields under prefix."""
+    return {f"{prefix}.{field}": value for field, value in usage_counts(usage).items()}
+
+def with_usage(update: Dict[str, Any], usage: Optional[Dict[str, Any]], prefix: str = "usage") -> Dict[str, Any]:
+    """Add a usage block's counters to an update (Mongo rejects an empty $inc, so only if any)."""
+    increments = usage_increments(usage, prefix)
+    if increments:
+        update["$inc"] = {**update.get("$inc", {}), **increments}
+    return update
+
+async def record_rollup(kind: str, model: str, usage: Optional[Dict[str, Any]], namespace: Optional[str],
+                        session_id: Optional[str] = None, document_id: Optional[str] = None,
+                        latency: Optional[float] = None):
+    """
+    Add one upstream call to the daily usage rollup of its namespace, model and
+    session or document.
+
+    kind is "completion", "embedding" (ingestion), "query_embedding" or "reindex"
+    (which spans namespaces, so has none). The write is best-effort: a failure is
+    logged, never raised into the request or job whose call was already paid for.
+    """
+    now = datetime.utcnow()
+    increments = {"requests": 1, **usage_counts(usage)}
+    if latency is not None:
+        increments["latency_seconds"] = latency
+
+    try:
+        await db.db.usage_rollups.update_one(
+            {
+                "day": datetime(now.year, now.month, now.day),
+                "namespace": namespace,
+                "kind": kind,
+                "model": model,
+                "session_id": session_id,
+                "document_id": document_id
+            },
+            {"$inc": increments, "$set": {"updated_at": now}},
+            upsert=True
+        )
+    except Exception as e:
+        logging.warning(f"Usage rollup for {kind} with {model} not recorded: {str(e)}")
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.config import settings
+from app.core.database import db
+
+# Duplicate key errors mean an earlier, partially failed flush already wrote the document
+DUPLICATE_KEY_ERROR = 11000
+
+class WriteBehindBuffer:
+    """
+    Write-behind buffer for chat message inserts and session touches.
+
+    Writes are acknowledged immediately and flushed in batches with
+    insert_many/bulk_write, either every flush interval or as soon as the
+    batch size is reached. Failed writes are kept and retried on the next flush.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.flushed_messages = 0
+        self.flushed_sessions = 0
+        self.failed_flushes = 0
+
+        self._messages: List[Dict[str, Any]] = []
+        self._flushing: List[Dict[str, Any]] = []
+        self._session_touches: Dict[str, datetime] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CHAT_DURABILITY_MODE == "buffered"
+
+    def add_message(self, message: Dict[str, Any]):
+        """Queue a chat message document (with its _id already assigned)."""
+        self._ensure_started()
+        self._messages.append(message)
+        if len(self._messages) >= self.batch_size:
+            self._wakeup.set()
+
+    def touch_session(self, session_id: str, updated_at: datetime):
+        """Queue an update of a session's updated_at, keeping the latest timestamp."""
+        self._ensure_started()
+        self._merge_touch(session_id, updated_at)
+
+    def pending_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get messages for a session that are not yet persisted."""
+        return [
+            message for message in self._flushing + self._messages
+            if message["session_id"] == session_id
+        ]
+
+    async def discard_session(self, session_id: str):
+        """
+        Drop pending writes for a session that is being deleted.
+
+        Waits for a flush in progress first, since it may be writing the
+        session's messages, so deleting them after this returns is final.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._messages = [m for m in self._messages if m["session_id"] != session_id]
+            self._session_touches.pop(session_id, None)
+
+    async def flush(self):
+        """Write all pending messages and session touches."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            messages, self._messages = self._messages, []
+            touches, self._session_touches = self._session_touches, {}
+            self._flushing = messages
+
+            try:
+                if messages:
+                    await self._insert_messages(messages)
+                if touches:
+                    await self._update_sessions(touches)
+            finally:
+                self._flushing = []
+
+    async def drain(self):
+        """Stop the background flusher and write out everything still buffered."""
+        if self._flush_task:
+            # Let an in-progress flush finish rather than cancelling it halfway
+            self._stopping = True
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+
+        if self._messages or self._session_touches:
+            logging.info(
+                f"Draining write-behind buffer ({len(self._messages)} messages, "
+                f"{len(self._session_touches)} sessions)..."
+            )
+            await self.flush()
+
+        if self._messages or self._session_touches:
+            logging.error(
+                f"Write-behind buffer could not be drained: {len(self._messages)} messages "
+                f"and {len(self._session_touches)} session updates were not persisted"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get buffer depth and flush counters."""
+        return {
+            "mode": settings.CHAT_DURABILITY_MODE,
+            "pending_messages": len(self._messages) + len(self._flushing),
+            "pending_sessions": len(self._session_touches),
+            "flushed_messages": self.flushed_messages,
+            "flushed_sessions": self.flushed_sessions,
+            "failed_flushes": self.failed_flushes
+        }
+
+    async def _insert_messages(self, messages: List[Dict[str, Any]]):
+        try:
+            await db.db.chat_messages.insert_many(messages, ordered=False)
+            self.flushed_messages += len(messages)
+        except BulkWriteError as e:
+            failed_indexes = {
+                error["index"] for error in e.details.get("writeErrors", [])
+                if error.get("code") != DUPLICATE_KEY_ERROR
+            }
+            self.flushed_messages += len(messages) - len(failed_indexes)
+            if failed_indexes:
+                self.failed_flushes += 1
+                logging.error(f"Failed to flush {len(failed_indexes)} chat messages, will retry")
+                self._messages[:0] = [messages[i] for i in sorted(failed_indexes)]
+        except Exception as e:
+            self.failed_flushes += 1
+            logging.error(f"Error flushing chat messages, will retry: {str(e)}")
+            self._messages[:0] = messages
+
+    async def _update_sessions(self, touches: Dict[str, datetime]):
+        operations = [
+            UpdateOne({"_id": ObjectId(session_id)}, {"$max": {"updated_at": updated_at}})
+            for session_id, updated_at in touches.items()
+        ]
+        try:
+            await db.db.chat_sessions.bulk_write(operations, ordered=False)
+            self.flushed_sessions += len(operations)
+        except Exception as e:
+            self.failed_flushes += 1
+            logging.error(f"Error flushing chat session updates, will retry: {str(e)}")
+            for session_id, updated_at in touches.items():
+                self._merge_touch(session_id, updated_at)
+
+    def _merge_touch(self, session_id: str, updated_at: datetime):
+        current = self._session_touches.get(session_id)
+        if current is None or updated_at > current:
+            self._session_touches[session_id] = updated_at
+
+    def _ensure_started(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._flush_task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Write-behind flush failed: {str(e)}")
+
+write_behind = WriteBehindBuffer(
+    flush_interval=settings.WRITE_BEHIND_FLUSH_INTERVAL,
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE
+)
@@ -2,29 +2,16 @@ from datetime import datetime
 from bson import ObjectId
 from typing import Optional, Dict, Any, List
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
-
 class ChatMessage:
     def __init__(self, role: str, content: str, session_id: str,
-                 id: Optional[PyObjectId] = None, created_at: Optional[datetime] = None,
-                 metadata: Optional[Dict[str, Any]] = None, references: Optional[List[str]] = None):
-        self.id = id or PyObjectId()
+                 id: Optional[ObjectId] = None, created_at: Optional[datetime] = None,
+                 metadata: Optional[Dict[str, Any]] = None, references: Optional[List[str]] = None,
+                 namespace: Optional[str] = None):
+        self.id = id or ObjectId()
         self.role = role  # "user", "assistant", "system"
         self.content = content
         self.session_id = session_id
+        self.namespace = namespace
         self.metadata = metadata or {}
         self.references = references or []  # References to document chunks
         self.created_at = created_at or datetime.utcnow()
@@ -42,6 +29,7 @@ class ChatMessage:
             session_id=data.get('session_id'),
             metadata=data.get('metadata'),
             references=data.get('references'),
+            namespace=data.get('namespace'),
             created_at=data.get('created_at')
         )
         return message
@@ -52,6 +40,7 @@ class ChatMessage:
             "role": self.role,
             "content": self.content,
             "session_id": self.session_id,
+            "namespace": self.namespace,
             "metadata": self.metadata,
             "references": self.references,
             "created_at": self.created_at
@@ -59,11 +48,16 @@ class ChatMessage:
 
 class ChatSession:
     def __init__(self, title: Optional[str] = None, 
-                 id: Optional[PyObjectId] = None, created_at: Optional[datetime] = None,
-                 updated_at: Optional[datetime] = None, metadata: Optional[Dict[str, Any]] = None):
-        self.id = id or PyObjectId()
+                 id: Optional[ObjectId] = None, created_at: Optional[datetime] = None,
+                 updated_at: Optional[datetime] = None, metadata: Optional[Dict[str, Any]] = None,
+                 namespace: Optional[str] = None, token_budget: Optional[int] = None,
+                 usage: Optional[Dict[str, Any]] = None):
+        self.id = id or ObjectId()
         self.title = title or "New Chat"
         self.metadata = metadata or {}
+        self.namespace = namespace
+        self.token_budget = token_budget  # Overrides SESSION_TOKEN_BUDGET when set
+        self.usage = usage or {}  # Token counts accumulated from completions
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
     
@@ -77,6 +71,9 @@ class ChatSession:
             id=data.get('_id'),
             title=data.get('title'),
             metadata=data.get('metadata'),
+            namespace=data.get('namespace'),
+            token_budget=data.get('token_budget'),
+            usage=data.get('usage'),
             created_at=data.get('created_at'),
             updated_at=data.get('updated_at')
         )
@@ -87,6 +84,9 @@ class ChatSession:
         return {
             "title": self.title,
             "metadata": self.metadata,
+            "namespace": self.namespace,
+            "token_budget": self.token_budget,
+            "usage": self.usage,
             "created_at": self.created_at,
             "updated_at": self.updated_at
         }
\ No newline at end of file
@@ -1,31 +1,24 @@
 from datetime import datetime
 from bson import ObjectId
 from typing import Optional, Dict, Any, List
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
+from app.utils.title_search import title_search_fields
 
 class Document:
     def __init__(self, title: str, content: str, metadata: Optional[Dict[str, Any]] = None,
-                 id: Optional[PyObjectId] = None, created_at: Optional[datetime] = None,
-                 updated_at: Optional[datetime] = None, chunk_ids: Optional[List[str]] = None):
-        self.id = id or PyObjectId()
+                 id: Optional[ObjectId] = None, created_at: Optional[datetime] = None,
+                 updated_at: Optional[datetime] = None, chunk_ids: Optional[List[str]] = None,
+                 content_length: Optional[int] = None, content_ref: Optional[Dict[str, Any]] = None,
+                 namespace: Optional[str] = None, usage: Optional[Dict[str, Any]] = None):
+        self.id = id or ObjectId()
         self.title = title
         self.content = content
+        self.content_length = content_length if content_length is not None else len(content or "")
+        # Set when the body is kept in the blob store rather than inline
+        self.content_ref = content_ref
         self.metadata = metadata or {}
+        self.namespace = namespace
         self.chunk_ids = chunk_ids or []
+        self.usage = usage or {}  # Embedding token counts, accumulated over every (re)processing
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
     
@@ -41,6 +34,10 @@ class Document:
             content=data.get('content'),
             metadata=data.get('metadata'),
             chunk_ids=data.get('chunk_ids'),
+            content_length=data.get('content_length'),
+            content_ref=data.get('content_ref'),
+            namespace=data.get('namespace'),
+            usage=data.get('usage'),
             created_at=data.get('created_at'),
             updated_at=data.get('updated_at')
         )
@@ -48,11 +45,17 @@ class Document:
     
     def to_mongo(self) -> Dict[str, Any]:
         """Convert Document object to MongoDB document."""
-        return {
+        data = {
             "title": self.title,
-            "content": self.content,
+            "content": None if self.content_ref else self.content,
+            "content_length": self.content_length,
             "metadata": self.metadata,
+            "namespace": self.namespace,
             "chunk_ids": self.chunk_ids,
             "created_at": self.created_at,
-            "updated_at": self.updated_at
-        }
\ No newline at end of file
+            "updated_at": self.updated_at,
+            **title_search_fields(self.title)
+        }
+        if self.content_ref:
+            data["content_ref"] = self.content_ref
+        return data
\ No newline at end of file
@@ -2,32 +2,21 @@ from datetime import datetime
 from bson import ObjectId
 from typing import Optional, Dict, Any, List
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
-
 class DocumentChunk:
     def __init__(self, document_id: str, chunk_text: str, chunk_index: int,
                  metadata: Optional[Dict[str, Any]] = None,
-                 id: Optional[PyObjectId] = None, created_at: Optional[datetime] = None,
-                 vector_id: Optional[str] = None):
-        self.id = id or PyObjectId()
+                 id: Optional[ObjectId] = None, created_at: Optional[datetime] = None,
+                 vector_id: Optional[str] = None, embedding: Optional[bytes] = None,
+                 embedding_model: Optional[str] = None, namespace: Optional[str] = None):
+        self.id = id or ObjectId()
         self.document_id = document_id
         self.chunk_text = chunk_text
         self.chunk_index = chunk_index
         self.metadata = metadata or {}
+        self.namespace = namespace
         self.vector_id = vector_id
+        self.embedding = embedding  # Quantized full-size vector, kept only for rescoring
+        self.embedding_model = embedding_model  # The model that produced its vectors
         self.created_at = created_at or datetime.utcnow()
     
     @classmethod
@@ -43,17 +32,26 @@ class DocumentChunk:
             chunk_index=data.get('chunk_index'),
             metadata=data.get('metadata'),
             vector_id=data.get('vector_id'),
+            embedding=data.get('embedding'),
+            embedding_model=data.get('embedding_model'),
+            namespace=data.get('namespace'),
             created_at=data.get('created_at')
         )
         return chunk
     
     def to_mongo(self) -> Dict[str, Any]:
         """Convert DocumentChunk object to MongoDB document."""
-        return {
+        data = {
             "document_id": self.document_id,
             "chunk_text": self.chunk_text,
             "chunk_index": self.chunk_index,
             "metadata": self.metadata,
+            "namespace": self.namespace,
             "vector_id": self.vector_id,
             "created_at": self.created_at
-        }
\ No newline at end of file
+        }
+        if self.embedding is not None:
+            data["embedding"] = self.embedding
+        if self.embedding_model is not None:
+            data["embedding_model"] = self.embedding_model
+        return data
\ No newline at end of file
@@ -1,22 +1,8 @@
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from bson import ObjectId
-
-class PyObjectId(str):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
+from app.schemas.common import PyObjectId, new_object_id
+from app.schemas.search import SearchOptions
 
 class ChatMessageBase(BaseModel):
     role: str  # "user", "assistant", "system"
@@ -26,7 +12,7 @@ class ChatMessageCreate(ChatMessageBase):
     pass
 
 class ChatMessageResponse(ChatMessageBase):
-    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    id: PyObjectId = Field(default_factory=new_object_id, alias="_id")
     session_id: str
     metadata: Dict[str, Any] = Field(default_factory=dict)
     references: List[str] = Field(default_factory=list)  # References to document chunks
@@ -35,34 +21,40 @@ class ChatMessageResponse(ChatMessageBase):
     class Config:
         from_attributes = True
         validate_by_name = True
-        json_encoders = {
-            ObjectId: str
-        }
 
 class ChatSessionBase(BaseModel):
     title: Optional[str] = "New Chat"
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
 class ChatSessionCreate(ChatSessionBase):
-    pass
+    # Tokens the session may use (SESSION_TOKEN_BUDGET by default)
+    token_budget: Optional[int] = Field(None, ge=1)
 
 class ChatSessionResponse(ChatSessionBase):
-    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    id: PyObjectId = Field(default_factory=new_object_id, alias="_id")
+    token_budget: Optional[int] = None
+    usage: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
         validate_by_name = True
-        json_encoders = {
-            ObjectId: str
-        }
+
+class ChatSessionList(BaseModel):
+    sessions: List[ChatSessionResponse]
+    total: Optional[int] = None
+    size: int
+    next_cursor: Optional[str] = None
+
+class RetrievalOptions(SearchOptions):
+    enabled: bool = True
 
 class ChatRequest(BaseModel):
     session_id: Optional[str] = None
     message: str
     system_prompt: Optional[str] = None
-    retrieval_options: Optional[Dict[str, Any]] = Field(default_factory=dict)
+    retrieval_options: Optional[RetrievalOptions] = Field(default_factory=RetrievalOptions)
     model: Optional[str] = None
     temperature: Optional[float] = 0.7
     max_tokens: Optional[int] = 1000
@@ -0,0 +1,19 @@
+from typing import Any
+from bson import ObjectId
+from pydantic import BeforeValidator
+from typing_extensions import Annotated
+
+def validate_object_id(value: Any) -> str:
+    """Accept an ObjectId or its hex string and return the string form."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return value
+    raise ValueError("Invalid ObjectId")
+
+def new_object_id() -> str:
+    """Generate a new ObjectId string."""
+    return str(ObjectId())
+
+# ObjectId exposed as a plain string in API schemas
+PyObjectId = Annotated[str, BeforeValidator(validate_object_id)]
@@ -1,22 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
-from bson import ObjectId
-
-class PyObjectId(str):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
+from app.schemas.common import PyObjectId, new_object_id
 
 class DocumentBase(BaseModel):
     title: str
@@ -27,20 +12,45 @@ class DocumentCreate(DocumentBase):
     pass
 
 class DocumentResponse(DocumentBase):
-    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    id: PyObjectId = Field(default_factory=new_object_id, alias="_id")
     chunk_ids: List[str] = Field(default_factory=list)
+    usage: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
         validate_by_name = True
-        json_encoders = {
-            ObjectId: str
-        }
+
+class DocumentSummary(BaseModel):
+    """Listing view of a document without its content or chunk IDs."""
+    id: PyObjectId = Field(default_factory=new_object_id, alias="_id")
+    title: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    content_length: Optional[int] = None
+    chunk_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+        validate_by_name = True
+
+class ScoredDocumentResponse(DocumentResponse):
+    """Document from a relevance-ordered title search."""
+    score: float
+
+class ScoredDocumentSummary(DocumentSummary):
+    """Document summary from a relevance-ordered title search."""
+    score: float
 
 class DocumentList(BaseModel):
-    documents: List[DocumentResponse]
-    total: int
-    page: int
+    documents: List[Union[ScoredDocumentResponse, ScoredDocumentSummary, DocumentResponse, DocumentSummary]]
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
+    next_cursor: Optional[str] = None
+
+class BulkDeleteRequest(BaseModel):
+    """Metadata values to match; a list matches any of its items."""
+    metadata: Dict[str, Any]
\ No newline at end of file
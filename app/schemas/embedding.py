@@ -1,22 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from bson import ObjectId
-
-class PyObjectId(str):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return str(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema):
-        field_schema.update(type="string")
+from app.schemas.common import PyObjectId, new_object_id
 
 class DocumentChunkBase(BaseModel):
     document_id: str
@@ -28,19 +13,17 @@ class DocumentChunkCreate(DocumentChunkBase):
     pass
 
 class DocumentChunkResponse(DocumentChunkBase):
-    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    id: PyObjectId = Field(default_factory=new_object_id, alias="_id")
     vector_id: Optional[str] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
         validate_by_name = True
-        json_encoders = {
-            ObjectId: str
-        }
 
 class ChunkList(BaseModel):
     chunks: List[DocumentChunkResponse]
-    total: int
-    page: int
-    size: int
\ No newline at end of file
+    total: Optional[int] = None
+    page: Optional[int] = None
+    size: int
+    next_cursor: Optional[str] = None
\ No newline at end of file
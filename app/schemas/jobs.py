@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Optional
+from datetime import datetime
+
+class JobResponse(BaseModel):
+    id: str = Field(alias="_id")
+    kind: str
+    status: str
+    params: Dict[str, Any] = Field(default_factory=dict)
+    progress: Dict[str, Any] = Field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+        validate_by_name = True
+
+class ReindexRequest(BaseModel):
+    embedding_model: Optional[str] = None
+    index_dimensions: Optional[int] = Field(None, ge=0)
+    rate: Optional[float] = Field(None, gt=0, description="Chunks per second")
+    batch_size: Optional[int] = Field(None, ge=1, le=2048)
+    drop_previous: bool = False
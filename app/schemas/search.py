@@ -1,10 +1,19 @@
 from pydantic import BaseModel, Field
 from typing import Dict, Any, List, Optional, Union
 
-class SearchQuery(BaseModel):
-    query: str
+class SearchOptions(BaseModel):
+    """Retrieval settings, shared by search queries and chat requests."""
     top_k: int = 5
     filter_metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
+    # Search several namespaces at once instead of the request's namespace
+    namespaces: Optional[List[str]] = None
+    # Candidates re-ranked per result in two-stage search (RESCORE_CANDIDATE_FACTOR by default)
+    candidate_factor: Optional[int] = Field(None, ge=1, le=100)
+    # Widen each hit with up to this many neighboring chunks either side, stitched into one passage
+    neighbors: int = Field(0, ge=0, le=5)
+
+class SearchQuery(SearchOptions):
+    query: str
 
 class SearchResult(BaseModel):
     chunk_id: str
@@ -12,6 +21,9 @@ class SearchResult(BaseModel):
     chunk_text: str
     metadata: Dict[str, Any]
     score: float
+    namespace: Optional[str] = None
+    # First and last chunk_index of the passage when widened with neighbors
+    chunk_span: Optional[List[int]] = None
 
 class SearchResponse(BaseModel):
     results: List[SearchResult]
@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Optional
+from datetime import datetime
+
+class UsageTotals(BaseModel):
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cost: float = 0.0
+    latency_seconds: float = 0.0
+
+class UsageConsumer(UsageTotals):
+    key: Any  # Session or document ID, model, namespace or day, depending on the grouping
+
+class TopConsumers(BaseModel):
+    by: str
+    metric: str
+    since: datetime
+    consumers: List[UsageConsumer]
+
+class DailyModelUsage(UsageTotals):
+    day: datetime
+    model: str
+
+class SessionUsage(BaseModel):
+    session_id: str
+    token_budget: Optional[int] = None
+    used_tokens: int = 0
+    remaining_tokens: Optional[int] = None
+    daily: List[DailyModelUsage] = Field(default_factory=list)
@@ -1,122 +1,409 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
 from bson import ObjectId
 from datetime import datetime
 
+from app.core.admission import check_budget, deadline_suspended
+from app.core.blob_store import load_body, read_body, release_body, store_body
+from app.core.config import settings
 from app.core.database import db
+from app.core.jobs import jobs
+from app.core.metrics import track_stage
+from app.core.namespaces import namespace_filter, register_namespace
+from app.core.process_pool import text_pool
+from app.core.usage import usage_counts, with_usage
 from app.models.document import Document
 from app.schemas.document import DocumentCreate
 from app.services.embedding_service import EmbeddingService
-from app.utils.chunking import chunk_document
+from app.utils.chunking import chunk_records, split_text
+from app.utils.pagination import CountCache, apply_cursor, encode_cursor, make_count_key
+from app.utils.title_search import TITLE_SEARCH_FIELDS, relevance_stages, title_filter, title_search_fields
+from pymongo import UpdateOne
+
+# Newest first, with _id as a tie-breaker so keyset cursors are unambiguous
+DOCUMENT_SORT = [("created_at", -1), ("_id", -1)]
+
+document_counts = CountCache(ttl=settings.COUNT_CACHE_TTL)
+
+# The derived title search fields are only used for matching, never returned
+FULL_PROJECTION = {field: 0 for field in TITLE_SEARCH_FIELDS}
+
+# For operations that only need a document's metadata, never its body
+METADATA_PROJECTION = {**FULL_PROJECTION, "content": 0}
+
+# Fields available in the summary view of a document listing
+SUMMARY_FIELDS = ["title", "metadata", "content_length", "chunk_count", "created_at", "updated_at"]
+
+def summary_projection(fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Build the Mongo projection for the summary view.
+    
+    content_length falls back to measuring the stored content for documents
+    written before it was tracked, and chunk_count is derived from chunk_ids.
+    created_at is always included because pagination cursors are built from it.
+    """
+    projection = {"created_at": 1}
+    for field in fields or SUMMARY_FIELDS:
+        if field == "content_length":
+            projection[field] = {"$ifNull": ["$content_length", {"$strLenCP": {"$ifNull": ["$content", ""]}}]}
+        elif field == "chunk_count":
+            projection[field] = {"$size": {"$ifNull": ["$chunk_ids", []]}}
+        else:
+            projection[field] = 1
+    return projection
+
+BULK_DELETE_JOB = "bulk_delete"
+
+def metadata_filter_query(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a Mongo query matching documents by metadata values.
+    
+    Each key matches one metadata field (dotted keys reach nested fields); a
+    list value matches any of its items. Operators are not accepted.
+    """
+    if not metadata:
+        raise ValueError("A metadata filter is required")
+    
+    query = {}
+    for key, value in metadata.items():
+        if not key or key.startswith("$") or any(not part for part in key.split(".")):
+            raise ValueError(f"Invalid metadata key: {key!r}")
+        if isinstance(value, dict):
+            raise ValueError(f"Unsupported value for metadata key {key!r}")
+        query[f"metadata.{key}"] = {"$in": value} if isinstance(value, list) else value
+    return query
 
 class DocumentService:
-    """Service for handling document-related operations."""
+    """Service for handling document-related operations within a namespace."""
+    
+    def __init__(self, namespace: Optional[str] = None):
+        self.namespace = namespace or settings.DEFAULT_NAMESPACE
+        self.scope = namespace_filter(self.namespace)
     
     async def create_document(self, document_data: DocumentCreate, process_embeddings: bool = True) -> Document:
-        """Create a new document and optionally process it for embeddings."""
+        """
+        Create a new document and optionally process it for embeddings.
+        
+        The request deadline is checked before anything is written. Once the
+        document is stored, its chunks are written whatever the deadline, so it
+        is never left behind without them.
+        """
+        if process_embeddings:
+            check_budget("chunking", "embedding")
         document = Document(
             title=document_data.title,
             content=document_data.content,
-            metadata=document_data.metadata
+            metadata=document_data.metadata,
+            content_ref=await store_body(document_data.content),
+            namespace=self.namespace
         )
         
         # Insert document into MongoDB
+        await register_namespace(self.namespace)
         result = await db.db.documents.insert_one(document.to_mongo())
         document.id = result.inserted_id
         
         # Process document for embeddings if requested
         if process_embeddings:
-            embedding_service = EmbeddingService()
-            document_chunks = chunk_document(
-                document_id=str(document.id),
-                text=document.content,
-                metadata={
-                    "title": document.title,
-                    **document.metadata
-                }
-            )
-            
-            # Process chunks and store embeddings
-            chunk_ids = await embedding_service.process_document_chunks(document_chunks)
+            embedding_service = EmbeddingService(self.namespace)
+            with deadline_suspended():
+                document_chunks = await self._chunk_document(
+                    document_id=str(document.id),
+                    text=document.content,
+                    metadata={
+                        "title": document.title,
+                        **document.metadata
+                    }
+                )
+                
+                # Process chunks and store embeddings
+                chunk_ids, usage = await embedding_service.process_document_chunks(document_chunks)
             
-            # Update document with chunk IDs
+            # Update document with chunk IDs and the embedding usage
             document.chunk_ids = chunk_ids
+            document.usage = usage_counts(usage)
             await db.db.documents.update_one(
                 {"_id": document.id},
-                {"$set": {"chunk_ids": chunk_ids}}
+                with_usage({"$set": {"chunk_ids": chunk_ids}}, usage)
             )
         
         return document
     
+    async def _chunk_document(self, document_id: str, text: str,
+                              metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Chunk a document body, in the text processing pool when it is large."""
+        with track_stage("chunking"):
+            texts = await text_pool.run(len(text), split_text, text)
+        return chunk_records(document_id, texts, metadata)
+    
     async def get_documents(self, skip: int = 0, limit: int = 10, 
-                           filters: Optional[Dict[str, Any]] = None) -> List[Document]:
-        """Get all documents with pagination and filtering."""
-        filters = filters or {}
-        documents = []
-        cursor = db.db.documents.find(filters).skip(skip).limit(limit).sort("created_at", -1)
-        
-        async for doc in cursor:
-            documents.append(Document.from_mongo(doc))
+                           filters: Optional[Dict[str, Any]] = None,
+                           cursor: Optional[str] = None) -> Tuple[List[Document], Optional[str]]:
+        """
+        Get a page of documents with filtering.
+        
+        Pages are addressed either by offset (skip) or, preferably, by the opaque
+        cursor returned with the previous page, which Mongo resolves with an index
+        range scan instead of skipping over earlier documents.
+        
+        Returns:
+            The documents on the page and the cursor for the next page, if any
+        """
+        docs, next_cursor = await self._find_page(skip, limit, filters, cursor)
+        return [Document.from_mongo(await self._load_content(doc)) for doc in docs], next_cursor
+    
+    async def get_document_summaries(self, skip: int = 0, limit: int = 10,
+                                     filters: Optional[Dict[str, Any]] = None,
+                                     cursor: Optional[str] = None,
+                                     fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get a page of document summaries without content or chunk IDs.
+        
+        The summary is computed by a Mongo projection, so document bodies never
+        leave the database.
+        
+        Args:
+            fields: Subset of SUMMARY_FIELDS to return (all of them by default)
+        """
+        return await self._find_page(skip, limit, filters, cursor, summary_projection(fields))
+    
+    async def _find_page(self, skip: int, limit: int, filters: Optional[Dict[str, Any]],
+                         cursor: Optional[str],
+                         projection: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Run a paginated documents query and build the next cursor."""
+        query = apply_cursor({**(filters or {}), **self.scope}, DOCUMENT_SORT, cursor)
+        find_cursor = db.db.documents.find(query, projection or FULL_PROJECTION).sort(DOCUMENT_SORT)
+        if not cursor and skip:
+            find_cursor = find_cursor.skip(skip)
+        
+        # Fetch one extra document to know whether there is a next page
+        docs = []
+        async for doc in find_cursor.limit(limit + 1):
+            docs.append(doc)
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor([docs[-1]["created_at"], docs[-1]["_id"]])
             
-        return documents
+        return docs, next_cursor
+    
+    def export_documents(self, filters: Optional[Dict[str, Any]] = None, cursor: Optional[str] = None,
+                         fields: Optional[List[str]] = None,
+                         summary: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over all matching documents, newest first, for a streaming export.
+        
+        The Mongo cursor is read in batches of EXPORT_BATCH_SIZE and rows are
+        yielded as they arrive, so memory use does not grow with the result.
+        
+        Raises:
+            ValueError: If the cursor is invalid (raised before iteration starts)
+        """
+        query = apply_cursor({**(filters or {}), **self.scope}, DOCUMENT_SORT, cursor)
+        projection = summary_projection(fields) if summary else FULL_PROJECTION
+        find_cursor = db.db.documents.find(query, projection).sort(DOCUMENT_SORT).batch_size(settings.EXPORT_BATCH_SIZE)
+        return self._export_rows(find_cursor, load_content=not summary)
+    
+    async def _export_rows(self, find_cursor, load_content: bool) -> AsyncIterator[Dict[str, Any]]:
+        async for doc in find_cursor:
+            if load_content:
+                doc = await self._load_content(doc)
+                doc.pop("content_ref", None)
+            yield doc
+    
+    async def count_documents(self, filters: Optional[Dict[str, Any]] = None,
+                              mode: str = "exact") -> Optional[int]:
+        """
+        Count documents in the namespace matching filters.
+        
+        Args:
+            filters: Query filters
+            mode: "exact" for a full count, "estimated" for a briefly cached
+                count, "none" to skip
+        """
+        if mode == "none":
+            return None
+        
+        query = {**(filters or {}), **self.scope}
+        if mode == "estimated":
+            return await document_counts.get(
+                make_count_key(query),
+                lambda: db.db.documents.count_documents(query)
+            )
+        
+        return await db.db.documents.count_documents(query)
+    
+    async def search_by_title(self, title: str, mode: str = "prefix", skip: int = 0, limit: int = 10,
+                              fields: Optional[List[str]] = None,
+                              summary: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get documents matching a title search, most relevant first.
+        
+        Matches come from the title search indexes and are ranked by trigram
+        similarity to the query; pages are addressed by offset only. Only the
+        ranking fields go through the sort, which a common trigram can make span
+        most of the collection; the page's documents are fetched after it.
+        
+        Raises:
+            ValueError: If the query has no searchable characters
+        """
+        pipeline = [
+            {"$match": {**title_filter(title, mode), **self.scope}},
+            {"$project": {"title_trigrams": 1, "created_at": 1}},
+            *relevance_stages(title, mode),
+            {"$project": {"score": 1, "created_at": 1}},
+            {"$sort": {"score": -1, "created_at": -1, "_id": -1}},
+            {"$skip": skip},
+            {"$limit": limit}
+        ]
+        scores = {doc["_id"]: doc["score"] async for doc in db.db.documents.aggregate(pipeline)}
+        
+        projection = summary_projection(fields) if summary else FULL_PROJECTION
+        found = {doc["_id"]: doc async for doc in db.db.documents.find({"_id": {"$in": list(scores)}}, projection)}
+        # In ranking order, skipping documents deleted in between
+        docs = [{**found[doc_id], "score": score} for doc_id, score in scores.items() if doc_id in found]
+        if not summary:
+            docs = [await self._load_content(doc) for doc in docs]
+        return docs
     
-    async def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
-        """Count documents matching filters."""
-        filters = filters or {}
-        return await db.db.documents.count_documents(filters)
+    async def count_title_matches(self, title: str, mode: str = "prefix", count_mode: str = "exact") -> Optional[int]:
+        """Count documents matching a title search (fuzzy matches are counted after thresholding)."""
+        if mode != "fuzzy":
+            return await self.count_documents(title_filter(title, mode), mode=count_mode)
+        if count_mode == "none":
+            return None
+        
+        async def count():
+            pipeline = [
+                {"$match": {**title_filter(title, mode), **self.scope}},
+                *relevance_stages(title, mode),
+                {"$count": "total"}
+            ]
+            result = [doc async for doc in db.db.documents.aggregate(pipeline)]
+            return result[0]["total"] if result else 0
+        
+        if count_mode == "estimated":
+            return await document_counts.get(make_count_key({"fuzzy_title": title, **self.scope}), count)
+        return await count()
+    
+    async def backfill_title_search(self, batch_size: int = 500) -> int:
+        """Compute title search fields for documents written before they were maintained."""
+        updated = 0
+        while True:
+            cursor = db.db.documents.find({"title_tokens": {"$exists": False}}, {"title": 1}).limit(batch_size)
+            docs = [doc async for doc in cursor]
+            if not docs:
+                return updated
+            
+            await db.db.documents.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": title_search_fields(doc.get("title") or "")})
+                for doc in docs
+            ], ordered=False)
+            updated += len(docs)
     
-    async def get_document(self, document_id: str) -> Optional[Document]:
-        """Get a single document by id."""
-        doc = await db.db.documents.find_one({"_id": ObjectId(document_id)})
+    async def get_document(self, document_id: str, include_content: bool = True) -> Optional[Document]:
+        """Get a single document by id, without reading its body unless include_content is set."""
+        projection = FULL_PROJECTION if include_content else METADATA_PROJECTION
+        doc = await db.db.documents.find_one({"_id": ObjectId(document_id), **self.scope}, projection)
         if doc:
+            if include_content:
+                doc = await self._load_content(doc)
             return Document.from_mongo(doc)
         return None
     
+    async def _load_content(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in the content of a document whose body is stored out-of-line."""
+        if doc.get("content_ref"):
+            doc["content"] = await load_body(doc["content_ref"])
+        return doc
+    
+    async def get_document_body(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Locate a document's body for streaming.
+        
+        Returns:
+            The body size in bytes and either its content_ref (out-of-line) or
+            its encoded data (inline), or None if the document does not exist
+        """
+        doc = await db.db.documents.find_one({"_id": ObjectId(document_id), **self.scope}, {"content": 1, "content_ref": 1})
+        if not doc:
+            return None
+        if doc.get("content_ref"):
+            return {"size": doc["content_ref"]["size"], "content_ref": doc["content_ref"]}
+        data = (doc.get("content") or "").encode("utf-8")
+        return {"size": len(data), "data": data}
+    
+    async def read_document_body(self, body: Dict[str, Any], start: int, end: int) -> AsyncIterator[bytes]:
+        """Stream bytes start..end (inclusive) of a body located with get_document_body."""
+        if "content_ref" in body:
+            async for data in read_body(body["content_ref"], start, end):
+                yield data
+        else:
+            yield body["data"][start:end + 1]
+    
     async def update_document(self, document_id: str, document_data: DocumentCreate, 
                              reprocess_embeddings: bool = True) -> Optional[Document]:
-        """Update a document and optionally reprocess embeddings."""
+        """
+        Update a document and optionally reprocess embeddings.
+        
+        As when creating one, the request deadline only applies until the update is written.
+        """
         # Get existing document to access chunk IDs
-        existing_document = await self.get_document(document_id)
+        existing_document = await self.get_document(document_id, include_content=False)
         if not existing_document:
             return None
         
+        if reprocess_embeddings:
+            check_budget("chunking", "embedding")
+        content_ref = await store_body(document_data.content)
         update_data = {
             "title": document_data.title,
-            "content": document_data.content,
+            "content": None if content_ref else document_data.content,
+            "content_length": len(document_data.content),
             "metadata": document_data.metadata,
-            "updated_at": datetime.utcnow()
+            "updated_at": datetime.utcnow(),
+            **title_search_fields(document_data.title)
         }
+        if content_ref:
+            update = {"$set": {**update_data, "content_ref": content_ref}}
+        else:
+            update = {"$set": update_data, "$unset": {"content_ref": ""}}
         
         # Update document in MongoDB
-        result = await db.db.documents.update_one(
-            {"_id": ObjectId(document_id)},
-            {"$set": update_data}
-        )
+        result = await db.db.documents.update_one({"_id": ObjectId(document_id), **self.scope}, update)
+        
+        # Each stored body holds a reference, so the replaced one is released even if unchanged
+        if result.matched_count:
+            await release_body(existing_document.content_ref)
+        else:
+            await release_body(content_ref)
         
         # Reprocess embeddings if content changed and reprocessing is requested
         if reprocess_embeddings and result.modified_count:
-            embedding_service = EmbeddingService()
-            
-            # Delete existing chunks and their vectors
-            if existing_document.chunk_ids:
-                await embedding_service.delete_document_chunks(str(existing_document.id))
-            
-            # Create new chunks
-            document_chunks = chunk_document(
-                document_id=document_id,
-                text=document_data.content,
-                metadata={
-                    "title": document_data.title,
-                    **document_data.metadata
-                }
-            )
+            embedding_service = EmbeddingService(self.namespace)
             
-            # Process new chunks and store embeddings
-            chunk_ids = await embedding_service.process_document_chunks(document_chunks)
+            with deadline_suspended():
+                # Delete existing chunks and their vectors
+                if existing_document.chunk_ids:
+                    await embedding_service.delete_document_chunks(str(existing_document.id))
+                
+                # Create new chunks
+                document_chunks = await self._chunk_document(
+                    document_id=document_id,
+                    text=document_data.content,
+                    metadata={
+                        "title": document_data.title,
+                        **document_data.metadata
+                    }
+                )
+                
+                # Process new chunks and store embeddings
+                chunk_ids, usage = await embedding_service.process_document_chunks(document_chunks)
             
-            # Update document with new chunk IDs
+            # Update document with new chunk IDs, adding to its embedding usage
             await db.db.documents.update_one(
                 {"_id": ObjectId(document_id)},
-                {"$set": {"chunk_ids": chunk_ids}}
+                with_usage({"$set": {"chunk_ids": chunk_ids}}, usage)
             )
             
             update_data["chunk_ids"] = chunk_ids
@@ -128,10 +415,56 @@ class DocumentService:
     
     async def delete_document(self, document_id: str) -> bool:
         """Delete a document and its associated chunks and vectors."""
+        query = {"_id": ObjectId(document_id), **self.scope}
+        if not await db.db.documents.find_one(query, {"_id": 1}):
+            return False
+        
         # Delete associated chunks and vectors first
-        embedding_service = EmbeddingService()
+        embedding_service = EmbeddingService(self.namespace)
         await embedding_service.delete_document_chunks(document_id)
         
-        # Delete the document
-        result = await db.db.documents.delete_one({"_id": ObjectId(document_id)})
-        return result.deleted_count > 0
\ No newline at end of file
+        # Delete the document, then its body if it was stored out-of-line
+        doc = await db.db.documents.find_one_and_delete(query, projection={"content_ref": 1})
+        if not doc:
+            return False
+        await release_body(doc.get("content_ref"))
+        return True
+    
+    async def start_bulk_delete(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Delete all documents of the namespace matching a metadata filter in a background job.
+        
+        Raises:
+            ValueError: If the filter is empty or invalid
+        """
+        query = {**metadata_filter_query(metadata), **self.scope}
+        total = await db.db.documents.count_documents(query)
+        job = await jobs.create(BULK_DELETE_JOB, {"metadata": metadata, "namespace": self.namespace, "total": total})
+        return await jobs.spawn(job["_id"], self.run_bulk_delete)
+    
+    async def run_bulk_delete(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job body: delete matching documents batch by batch, with their chunks and vectors."""
+        namespace = job["params"].get("namespace") or settings.DEFAULT_NAMESPACE
+        query = {**metadata_filter_query(job["params"]["metadata"]), **namespace_filter(namespace)}
+        progress = dict(job.get("progress") or {})
+        progress.setdefault("documents", 0)
+        progress.setdefault("chunks", 0)
+        progress["total"] = job["params"]["total"]
+        embedding_service = EmbeddingService(namespace)
+        
+        while True:
+            # Deleted documents no longer match, so every batch starts from the top
+            cursor = db.db.documents.find(query, {"_id": 1, "content_ref": 1}).limit(settings.BULK_DELETE_BATCH_SIZE)
+            docs = [doc async for doc in cursor]
+            if not docs:
+                break
+            
+            ids = [doc["_id"] for doc in docs]
+            progress["chunks"] += await embedding_service.delete_chunks_for_documents([str(id) for id in ids])
+            result = await db.db.documents.delete_many({"_id": {"$in": ids}})
+            progress["documents"] += result.deleted_count
+            for doc in docs:
+                await release_body(doc.get("content_ref"))
+            await jobs.checkpoint(job["_id"], progress)
+        
+        return progress
\ No newline at end of file
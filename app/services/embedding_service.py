@@ -1,29 +1,68 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from app.core.active_collection import active
+from app.core.config import settings
 from app.core.database import db
-from app.core.chroma_client import chroma
-from app.core.openrouter import OpenRouterClient
+from app.core.embeddings import get_embedding_provider
+from app.core.namespaces import get_namespace_collection, namespace_filter
+from app.core.rate_limiter import Priority
+from app.core.usage import record_rollup
 from app.models.embedding import DocumentChunk
+from app.utils.pagination import CountCache, apply_cursor, encode_cursor
+from app.utils.quantization import quantize, truncate_embeddings
 import uuid
 
+# Chunks are listed in document order; chunk_index is unique within a document
+CHUNK_SORT = [("chunk_index", 1)]
+
+chunk_counts = CountCache(ttl=settings.COUNT_CACHE_TTL)
+
+# The quantized rescoring copies are never needed when listing chunks
+CHUNK_PROJECTION = {"embedding": 0, "pending_embedding": 0}
+
 class EmbeddingService:
-    """Service for handling embedding-related operations."""
+    """Service for handling embedding-related operations within a namespace."""
     
-    async def process_document_chunks(self, chunks: List[Dict[str, Any]]) -> List[str]:
-        """Process document chunks and store them with embeddings."""
+    def __init__(self, namespace: Optional[str] = None):
+        self.namespace = namespace or settings.DEFAULT_NAMESPACE
+        self.scope = namespace_filter(self.namespace)
+    
+    async def process_document_chunks(self, chunks: List[Dict[str, Any]]) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Process document chunks and store them with embeddings.
+        
+        Returns:
+            The chunk IDs and the usage block of the embedding call (empty if none was reported)
+        """
         chunk_ids = []
         
         if not chunks:
-            return chunk_ids
+            return chunk_ids, {}
         
         # Extract text for embedding
         texts = [chunk["text"] for chunk in chunks]
         
-        # Generate embeddings
-        openrouter_client = OpenRouterClient()
-        embedding_response = await openrouter_client.generate_embeddings(texts)
+        # Generate embeddings with the served model (background priority so interactive queries go first).
+        # The collection, model and index size are read together; if a cut-over lands while the
+        # embedding call is in flight, the chunks are embedded again for the new collection
+        while True:
+            served = active.snapshot()
+            base, model, index_dimensions = served
+            embedding_response = await get_embedding_provider().generate_embeddings(
+                texts, model=model, priority=Priority.BACKGROUND
+            )
+            usage = embedding_response.get("usage") or {}
+            await record_rollup(
+                "embedding", embedding_response.get("model") or model, usage,
+                self.namespace, document_id=chunks[0]["document_id"]
+            )
+            if active.snapshot() == served:
+                break
+        collection = await get_namespace_collection(self.namespace, create=True, base=base)
         
-        # Get embeddings from response
+        # Get embeddings from response, truncated to the size kept in the vector index
         embeddings = [item["embedding"] for item in embedding_response["data"]]
+        index_embeddings = truncate_embeddings(embeddings, index_dimensions).tolist()
+        rescore = settings.EMBEDDING_RESCORE_DTYPE != "none"
         
         # Process chunks and store in ChromaDB and MongoDB
         chroma_ids = []
@@ -31,7 +70,7 @@ class EmbeddingService:
         chroma_documents = []
         chroma_embeddings = []
         
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+        for i, (chunk, embedding, index_embedding) in enumerate(zip(chunks, embeddings, index_embeddings)):
             # Generate a unique ID for the vector
             vector_id = str(uuid.uuid4())
             chroma_ids.append(vector_id)
@@ -46,7 +85,7 @@ class EmbeddingService:
             
             # Add text and embedding
             chroma_documents.append(chunk["text"])
-            chroma_embeddings.append(embedding)
+            chroma_embeddings.append(index_embedding)
             
             # Create document chunk in MongoDB
             doc_chunk = DocumentChunk(
@@ -54,43 +93,102 @@ class EmbeddingService:
                 chunk_text=chunk["text"],
                 chunk_index=i,
                 metadata=chunk["metadata"],
-                vector_id=vector_id
+                vector_id=vector_id,
+                embedding=quantize(embedding, settings.EMBEDDING_RESCORE_DTYPE) if rescore else None,
+                embedding_model=model,
+                namespace=self.namespace
             )
             
             # Insert into MongoDB
             result = await db.db.document_chunks.insert_one(doc_chunk.to_mongo())
             chunk_ids.append(str(result.inserted_id))
         
-        # Add to ChromaDB
-        chroma.collection.add(
+        # Add to the namespace's collection within the one the vectors were embedded for (if a cut-over
+        # has landed since, the re-index catch-up re-embeds these chunks by their model tag)
+        collection.add(
             ids=chroma_ids,
             embeddings=chroma_embeddings,
             documents=chroma_documents,
             metadatas=chroma_metadatas
         )
         
-        return chunk_ids
+        return chunk_ids, usage
     
     async def get_chunks_by_document(self, document_id: str) -> List[DocumentChunk]:
         """Get all chunks for a specific document."""
         chunks = []
-        cursor = db.db.document_chunks.find({"document_id": document_id}).sort("chunk_index", 1)
+        cursor = db.db.document_chunks.find({"document_id": document_id, **self.scope}, CHUNK_PROJECTION).sort("chunk_index", 1)
         
         async for doc in cursor:
             chunks.append(DocumentChunk.from_mongo(doc))
             
         return chunks
     
+    async def get_chunks_page(self, document_id: str, limit: int, skip: int = 0,
+                              cursor: Optional[str] = None) -> Tuple[List[DocumentChunk], Optional[str]]:
+        """
+        Get a page of chunks for a document, paginated in Mongo.
+        
+        Returns:
+            The chunks on the page and the cursor for the next page, if any
+        """
+        query = apply_cursor({"document_id": document_id, **self.scope}, CHUNK_SORT, cursor)
+        find_cursor = db.db.document_chunks.find(query, CHUNK_PROJECTION).sort(CHUNK_SORT)
+        if not cursor and skip:
+            find_cursor = find_cursor.skip(skip)
+        
+        # Fetch one extra chunk to know whether there is a next page
+        chunks = []
+        async for doc in find_cursor.limit(limit + 1):
+            chunks.append(DocumentChunk.from_mongo(doc))
+        
+        next_cursor = None
+        if len(chunks) > limit:
+            chunks = chunks[:limit]
+            next_cursor = encode_cursor([chunks[-1].chunk_index])
+        
+        return chunks, next_cursor
+    
+    def export_chunks(self, document_id: str, cursor: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over a document's chunks in order for a streaming export, reading in batches.
+        
+        Raises:
+            ValueError: If the cursor is invalid (raised before iteration starts)
+        """
+        query = apply_cursor({"document_id": document_id, **self.scope}, CHUNK_SORT, cursor)
+        return db.db.document_chunks.find(query, CHUNK_PROJECTION).sort(CHUNK_SORT).batch_size(settings.EXPORT_BATCH_SIZE)
+    
+    async def count_chunks(self, document_id: str, mode: str = "exact") -> Optional[int]:
+        """Count chunks of a document ("exact", briefly cached "estimated", or "none")."""
+        if mode == "none":
+            return None
+        
+        query = {"document_id": document_id, **self.scope}
+        if mode == "estimated":
+            return await chunk_counts.get((self.namespace, document_id), lambda: db.db.document_chunks.count_documents(query))
+        return await db.db.document_chunks.count_documents(query)
+    
     async def delete_document_chunks(self, document_id: str) -> bool:
         """Delete all chunks and vectors associated with a document."""
-        # Get chunks to find vector IDs
-        chunks = await self.get_chunks_by_document(document_id)
-        vector_ids = [chunk.vector_id for chunk in chunks if chunk.vector_id]
+        return await self.delete_chunks_for_documents([document_id]) > 0
+    
+    async def delete_chunks_for_documents(self, document_ids: List[str]) -> int:
+        """
+        Delete the chunks and vectors of several documents with one filter per store.
+        
+        Returns:
+            The number of chunks deleted from MongoDB
+        """
+        if not document_ids:
+            return 0
         
-        # Delete from ChromaDB
-        if vector_ids:
-            chroma.collection.delete(ids=vector_ids)
+        # Delete from ChromaDB by metadata, without looking up vector IDs first
+        collection = await get_namespace_collection(self.namespace)
+        if collection is not None:
+            where = {"document_id": document_ids[0]} if len(document_ids) == 1 else {"document_id": {"$in": document_ids}}
+            collection.delete(where=where)
         
         # Delete from MongoDB
-        result = await db.db.document_chunks.delete_many({"document_id": document_id})
-        return result.deleted_count > 0
\ No newline at end of file
+        result = await db.db.document_chunks.delete_many({"document_id": {"$in": document_ids}, **self.scope})
+        return result.deleted_count
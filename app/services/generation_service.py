@@ -1,61 +1,226 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from datetime import datetime
 from app.core.openrouter import OpenRouterClient
 from app.core.config import settings
 from app.services.retrieval_service import RetrievalService
 from app.models.chat import ChatMessage, ChatSession
 from app.core.database import db
+from app.core.write_behind import write_behind
+from app.core.metrics import track_stage
+from app.core.namespaces import namespace_filter, record_namespace, register_namespace
+from app.core.usage import TokenBudgetExceeded, record_rollup, usage_counts, with_usage
+from app.utils.pagination import CountCache, apply_cursor, encode_cursor
 from bson import ObjectId
 import logging
 
+# Newest first, with _id as a tie-breaker for keyset cursors. Sessions are paged on their
+# immutable creation time, so one active between two page requests is neither skipped nor repeated
+SESSION_SORT = [("created_at", -1), ("_id", -1)]
+
+# Most recently active first (not used for cursors, since activity moves sessions around)
+SESSION_ACTIVITY_SORT = [("updated_at", -1), ("_id", -1)]
+
+session_counts = CountCache(ttl=settings.COUNT_CACHE_TTL)
+
+# Messages in conversation order
+MESSAGE_SORT = [("created_at", 1), ("_id", 1)]
+
 class GenerationService:
-    """Service for handling LLM generation operations."""
+    """Service for handling LLM generation operations within a namespace."""
     
-    async def create_chat_session(self, title: Optional[str] = None) -> ChatSession:
-        """Create a new chat session."""
-        session = ChatSession(title=title)
+    def __init__(self, namespace: Optional[str] = None):
+        self.namespace = namespace or settings.DEFAULT_NAMESPACE
+        self.scope = namespace_filter(self.namespace)
+    
+    async def create_chat_session(self, title: Optional[str] = None,
+                                  token_budget: Optional[int] = None) -> ChatSession:
+        """Create a new chat session, optionally with its own token budget."""
+        session = ChatSession(title=title, namespace=self.namespace, token_budget=token_budget)
+        await register_namespace(self.namespace)
         result = await db.db.chat_sessions.insert_one(session.to_mongo())
         session.id = result.inserted_id
         return session
     
+    async def get_chat_sessions(self, limit: int = 20,
+                                cursor: Optional[str] = None) -> Tuple[List[ChatSession], Optional[str]]:
+        """
+        Get a page of chat sessions, newest first.
+        
+        Returns:
+            The sessions on the page and the cursor for the next page, if any
+        """
+        query = apply_cursor(dict(self.scope), SESSION_SORT, cursor)
+        sessions = []
+        async for doc in db.db.chat_sessions.find(query).sort(SESSION_SORT).limit(limit + 1):
+            sessions.append(ChatSession.from_mongo(doc))
+        
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            last = sessions[-1]
+            next_cursor = encode_cursor([last.created_at, last.id])
+        
+        return sessions, next_cursor
+    
+    async def get_recent_chat_sessions(self, limit: Optional[int] = None) -> List[ChatSession]:
+        """Get chat sessions, most recently active first (all of them unless limited)."""
+        find_cursor = db.db.chat_sessions.find(self.scope).sort(SESSION_ACTIVITY_SORT)
+        if limit:
+            find_cursor = find_cursor.limit(limit)
+        return [ChatSession.from_mongo(doc) async for doc in find_cursor]
+    
+    async def count_chat_sessions(self, mode: str = "estimated") -> Optional[int]:
+        """Count the namespace's chat sessions ("exact", "estimated", briefly cached, or "none")."""
+        if mode == "none":
+            return None
+        if mode == "estimated":
+            return await session_counts.get(self.namespace, lambda: db.db.chat_sessions.count_documents(self.scope))
+        return await db.db.chat_sessions.count_documents(self.scope)
+    
+    async def delete_chat_session(self, session_id: str) -> bool:
+        """Delete a chat session and its messages with filter deletes (messages are never loaded)."""
+        if not ObjectId.is_valid(session_id):
+            return False
+        
+        result = await db.db.chat_sessions.delete_one({"_id": ObjectId(session_id), **self.scope})
+        if not result.deleted_count:
+            # Not in this namespace: leave its messages and buffered writes alone
+            return False
+        
+        # Drop buffered writes (after any flush already writing them) so none land after the delete
+        await write_behind.discard_session(session_id)
+        await db.db.chat_messages.delete_many({"session_id": session_id, **self.scope})
+        return True
+    
     async def get_session_messages(self, session_id: str) -> List[ChatMessage]:
         """Get all messages for a specific chat session."""
         messages = []
-        cursor = db.db.chat_messages.find({"session_id": session_id}).sort("created_at", 1)
+        cursor = db.db.chat_messages.find({"session_id": session_id, **self.scope}).sort("created_at", 1)
         
         async for msg in cursor:
             messages.append(ChatMessage.from_mongo(msg))
+        
+        # Include buffered messages that have not been flushed yet
+        if write_behind.enabled:
+            persisted_ids = {msg.id for msg in messages}
+            pending = [
+                ChatMessage.from_mongo(msg) for msg in write_behind.pending_messages(session_id)
+                if msg["_id"] not in persisted_ids and record_namespace(msg) == self.namespace
+            ]
+            if pending:
+                messages = sorted(messages + pending, key=lambda msg: msg.created_at)
             
         return messages
     
+    async def export_session_messages(self, session_id: str, cursor: Optional[str] = None,
+                                      role: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over a session's messages in order for a streaming export, reading in batches.
+        
+        Buffered messages are flushed first so the export includes them.
+        
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        query = {"session_id": session_id, **self.scope}
+        if role:
+            query["role"] = role
+        query = apply_cursor(query, MESSAGE_SORT, cursor)
+        
+        if write_behind.enabled:
+            await write_behind.flush()
+        return db.db.chat_messages.find(query).sort(MESSAGE_SORT).batch_size(settings.EXPORT_BATCH_SIZE)
+    
+    async def save_message(self, message: ChatMessage) -> ChatMessage:
+        """Persist a chat message, through the write-behind buffer when enabled."""
+        with track_stage("persistence"):
+            if write_behind.enabled:
+                write_behind.add_message({"_id": message.id, **message.to_mongo()})
+            else:
+                result = await db.db.chat_messages.insert_one(message.to_mongo())
+                message.id = result.inserted_id
+        return message
+    
+    async def touch_session(self, session_id: str, updated_at: datetime):
+        """Update a session's last activity time."""
+        with track_stage("persistence"):
+            if write_behind.enabled:
+                write_behind.touch_session(session_id, updated_at)
+            else:
+                await db.db.chat_sessions.update_one(
+                    {"_id": ObjectId(session_id)},
+                    {"$set": {"updated_at": updated_at}}
+                )
+    
+    def remaining_budget(self, session: ChatSession) -> Optional[int]:
+        """
+        Tokens a session may still use, or None if it has no budget.
+        
+        Raises:
+            TokenBudgetExceeded: If the session has used up its budget
+        """
+        budget = session.token_budget or settings.SESSION_TOKEN_BUDGET
+        if not budget:
+            return None
+        used = session.usage.get("total_tokens", 0)
+        if used >= budget:
+            raise TokenBudgetExceeded(str(session.id), budget, used)
+        return budget - used
+    
+    async def record_session_usage(self, session_id: str, model: str, usage: Dict[str, Any], latency: float):
+        """Add a completion's usage to its session's totals and the daily rollup."""
+        with track_stage("usage"):
+            writes = [record_rollup("completion", model, usage, self.namespace, session_id=session_id, latency=latency)]
+            update = with_usage({}, usage)
+            if update:
+                writes.append(db.db.chat_sessions.update_one({"_id": ObjectId(session_id)}, update))
+            await asyncio.gather(*writes)
+    
     async def generate_response(self, session_id: str, user_message: str, 
                                system_prompt: Optional[str] = None,
                                retrieval_options: Optional[Dict[str, Any]] = None,
                                model: Optional[str] = None,
                                temperature: float = 0.7,
                                max_tokens: int = 1000) -> Dict[str, Any]:
-        """Generate a response using RAG."""
+        """
+        Generate a response using RAG.
+        
+        Raises:
+            TokenBudgetExceeded: If the session has used up its token budget
+        """
         # Create session if not exists
         if not session_id:
             session = await self.create_chat_session()
             session_id = str(session.id)
         else:
             # Verify session exists
-            session = await db.db.chat_sessions.find_one({"_id": ObjectId(session_id)})
+            with track_stage("session_lookup"):
+                session = ChatSession.from_mongo(
+                    await db.db.chat_sessions.find_one({"_id": ObjectId(session_id), **self.scope})
+                )
             if not session:
                 session = await self.create_chat_session()
                 session_id = str(session.id)
         
+        # Refuse before doing any work once the budget is used up, and never ask for more than is left
+        remaining_budget = self.remaining_budget(session)
+        if remaining_budget is not None:
+            max_tokens = min(max_tokens or remaining_budget, remaining_budget)
+        
         # Save user message
         user_chat_msg = ChatMessage(
             role="user",
             content=user_message,
-            session_id=session_id
+            session_id=session_id,
+            namespace=self.namespace
         )
-        user_result = await db.db.chat_messages.insert_one(user_chat_msg.to_mongo())
-        user_chat_msg.id = user_result.inserted_id
+        await self.save_message(user_chat_msg)
         
         # Get conversation history
-        conversation_history = await self.get_session_messages(session_id)
+        with track_stage("history"):
+            conversation_history = await self.get_session_messages(session_id)
         
         # Format messages for LLM
         messages = []
@@ -80,11 +245,14 @@ class GenerationService:
         retrieval_options = retrieval_options or {}
         
         if retrieval_options.get("enabled", True):
-            retrieval_service = RetrievalService()
+            retrieval_service = RetrievalService(self.namespace)
             search_results = await retrieval_service.search(
                 user_message,
                 top_k=retrieval_options.get("top_k", 5),
-                filter_metadata=retrieval_options.get("filter_metadata")
+                filter_metadata=retrieval_options.get("filter_metadata"),
+                namespaces=retrieval_options.get("namespaces"),
+                candidate_factor=retrieval_options.get("candidate_factor"),
+                neighbors=retrieval_options.get("neighbors", 0)
             )
             
             # Add retrieval context to system prompt
@@ -119,31 +287,34 @@ When referring to the information, don't mention the source numbers or explicitl
         
         # Generate completion with OpenRouter
         openrouter_client = OpenRouterClient()
+        started = time.perf_counter()
         response = await openrouter_client.generate_completion(
             messages=messages,
             model=model or settings.DEFAULT_LLM_MODEL,
             temperature=temperature,
             max_tokens=max_tokens
         )
+        latency = time.perf_counter() - started
         
         # Extract assistant message
         assistant_content = response["choices"][0]["message"]["content"]
+        usage = usage_counts(response.get("usage"))
+        used_model = response.get("model") or model or settings.DEFAULT_LLM_MODEL
         
-        # Save assistant message with references
+        # Save assistant message with references and the completion's usage
         assistant_chat_msg = ChatMessage(
             role="assistant",
             content=assistant_content,
             session_id=session_id,
-            references=[ref["chunk_id"] for ref in references]
+            metadata={"model": used_model, "usage": usage, "latency_seconds": round(latency, 3)},
+            references=[ref["chunk_id"] for ref in references],
+            namespace=self.namespace
         )
-        assistant_result = await db.db.chat_messages.insert_one(assistant_chat_msg.to_mongo())
-        assistant_chat_msg.id = assistant_result.inserted_id
+        await self.save_message(assistant_chat_msg)
         
-        # Update session metadata
-        await db.db.chat_sessions.update_one(
-            {"_id": ObjectId(session_id)},
-            {"$set": {"updated_at": assistant_chat_msg.created_at}}
-        )
+        # Update session metadata and usage totals
+        await self.touch_session(session_id, assistant_chat_msg.created_at)
+        await self.record_session_usage(session_id, used_model, usage, latency)
         
         # Return response with session info and references
         return {
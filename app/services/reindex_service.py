@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import UpdateOne
+from app.core.active_collection import activate_collection, active
+from app.core.chroma_client import chroma
+from app.core.config import settings
+from app.core.database import db
+from app.core.embeddings import default_embedding_model, get_embedding_provider
+from app.core.jobs import jobs, PENDING, RUNNING
+from app.core.namespaces import (
+    collection_name, forget_collections, get_namespace_collection, list_namespaces, record_namespace
+)
+from app.core.rate_limiter import Priority
+from app.core.usage import record_rollup
+from app.utils.quantization import quantize, truncate_embeddings
+
+REINDEX_JOB = "reindex"
+
+# Re-embedded rescoring vectors are staged here and only replace `embedding` at cut-over.
+# Each vector is tagged with its model, so rescoring never compares vectors from different models,
+# and the tag also marks chunks already copied into the new collection
+PENDING_EMBEDDING_FIELD = "pending_embedding"
+PENDING_EMBEDDING_MODEL_FIELD = "pending_embedding_model"
+
+class ReindexService:
+    """
+    Blue/green re-embedding of the whole corpus.
+
+    All chunks are streamed in _id order through the embedding pipeline into a
+    new collection, checkpointing after every batch. Searches keep using the
+    active collection until the job has caught up, then the new collection is
+    activated in one swap. Once every worker has had time to follow the swap,
+    chunks still embedded with the old model are re-embedded and vectors of
+    chunks deleted meanwhile are removed.
+    Each namespace's collection is rebuilt alongside the new base collection,
+    so every namespace switches over in the same swap.
+    """
+
+    async def start_reindex(self, embedding_model: Optional[str] = None,
+                            index_dimensions: Optional[int] = None,
+                            rate: Optional[float] = None,
+                            batch_size: Optional[int] = None,
+                            drop_previous: bool = False) -> Dict[str, Any]:
+        """Create a re-index job and run it in the background."""
+        job = await self.create_job(embedding_model, index_dimensions, rate, batch_size, drop_previous)
+        return await jobs.spawn(job["_id"], self.run)
+
+    async def create_job(self, embedding_model: Optional[str] = None,
+                         index_dimensions: Optional[int] = None,
+                         rate: Optional[float] = None,
+                         batch_size: Optional[int] = None,
+                         drop_previous: bool = False) -> Dict[str, Any]:
+        """
+        Create a re-index job.
+
+        Raises:
+            UnsupportedEmbeddingModel: If the embedding provider cannot produce the model
+            ValueError: If another re-index job is in progress
+        """
+        embedding_model = embedding_model or default_embedding_model()
+        # Rejected now rather than reported later as a failed job
+        get_embedding_provider().check_model(embedding_model)
+
+        running = await db.db.jobs.find_one({"kind": REINDEX_JOB, "status": {"$in": [PENDING, RUNNING]}})
+        if running:
+            raise ValueError(f"Re-index job {running['_id']} is already in progress")
+
+        return await jobs.create(REINDEX_JOB, {
+            "embedding_model": embedding_model,
+            "index_dimensions": settings.EMBEDDING_INDEX_DIMENSIONS if index_dimensions is None else index_dimensions,
+            "rate": rate or settings.REINDEX_RATE,
+            "batch_size": batch_size or settings.REINDEX_BATCH_SIZE,
+            "drop_previous": drop_previous,
+            "source_collection": chroma.collection.name,
+            "source_embedding_model": active.embedding_model,
+            "target_collection": f"{settings.CHROMADB_COLLECTION}_{datetime.utcnow():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:6]}"
+        })
+
+    async def resume_reindex(self, job_id: str) -> Dict[str, Any]:
+        """
+        Resume an interrupted or failed re-index job from its checkpoint in the background.
+        
+        Raises:
+            ValueError: If the job does not exist, is finished or is still running elsewhere
+        """
+        job = await jobs.get(job_id)
+        if not job or job["kind"] != REINDEX_JOB:
+            raise ValueError(f"Re-index job {job_id} not found")
+        return await jobs.spawn(job_id, self.run)
+
+    async def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job body: copy, cut over, catch up and clean up."""
+        params = job["params"]
+        loop = asyncio.get_running_loop()
+        target = await loop.run_in_executor(None, lambda: chroma.client.get_or_create_collection(
+            name=params["target_collection"],
+            metadata={"hnsw:space": "cosine", "embedding_model": params["embedding_model"]}
+        ))
+        progress = dict(job.get("progress") or {})
+        progress.setdefault("processed", 0)
+        progress["total"] = await db.db.document_chunks.estimated_document_count()
+        checkpoint = job.get("checkpoint")
+
+        logging.info(f"Re-indexing into '{target.name}' with {params['embedding_model']}")
+        await self._tag_rescoring_vectors(params.get("source_embedding_model"))
+        checkpoint = await self._copy(job["_id"], params, target, progress, checkpoint)
+
+        # Cut over, then pick up chunks added to the old collection meanwhile
+        previous = params["source_collection"]
+        await activate_collection(target.name, params["embedding_model"], params["index_dimensions"])
+        await self._promote_rescoring_vectors()
+        progress["activated_at"] = datetime.utcnow()
+        await self._wait_for_cutover(job["_id"], progress)
+        await self._copy(job["_id"], params, target, progress, catch_up=True)
+
+        # The cleanup spans the whole corpus, so the lease is renewed between its phases and pages
+        await self._promote_rescoring_vectors()
+        progress["orphans_removed"] = 0
+        await jobs.checkpoint(job["_id"], progress)
+        for namespace in await list_namespaces():
+            collection = await get_namespace_collection(namespace, base=target.name)
+            if collection is not None:
+                await self._remove_orphans(job["_id"], progress, collection)
+
+        if params["drop_previous"] and previous != target.name:
+            await jobs.checkpoint(job["_id"], progress)
+            # Keeping them (the default) allows rolling back by re-activating the previous collection
+            await self._drop_collections(previous)
+
+        return {"collection": target.name, "previous_collection": previous, **progress}
+
+    async def _copy(self, job_id: str, params: Dict[str, Any], target, progress: Dict[str, Any],
+                    checkpoint: Optional[Any] = None, catch_up: bool = False) -> Optional[Any]:
+        """
+        Re-embed chunks into the target, throttled to the job's rate.
+
+        The initial copy takes every chunk after the checkpoint in _id order. The
+        catch-up takes every chunk not yet embedded with the target's model instead:
+        ObjectIds generated by different processes are not ordered by insertion,
+        so chunks written during the copy can sort below the checkpoint.
+        """
+        batch_size = params["batch_size"]
+        while True:
+            if catch_up:
+                query = self._not_copied(params["embedding_model"])
+            else:
+                query = {"_id": {"$gt": checkpoint}} if checkpoint else {}
+            cursor = db.db.document_chunks.find(query, {"embedding": 0, PENDING_EMBEDDING_FIELD: 0}).sort("_id", 1).limit(batch_size)
+            batch = [chunk async for chunk in cursor]
+            if not batch:
+                return checkpoint
+
+            started = time.monotonic()
+            await self._embed_batch(params, target, batch)
+            if not catch_up:
+                checkpoint = batch[-1]["_id"]
+            progress["processed"] += len(batch)
+            await jobs.checkpoint(job_id, progress, checkpoint)
+
+            # Hold the average rate to params["rate"] chunks per second
+            if params["rate"]:
+                delay = len(batch) / params["rate"] - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+    @staticmethod
+    def _not_copied(model: str) -> Dict[str, Any]:
+        """Chunks with a vector that has not been embedded with model (ingested on the old collection)."""
+        return {
+            "vector_id": {"$ne": None},
+            "embedding_model": {"$ne": model},
+            PENDING_EMBEDDING_MODEL_FIELD: {"$ne": model}
+        }
+
+    async def _wait_for_cutover(self, job_id: str, progress: Dict[str, Any]):
+        """
+        Wait until every worker has followed the cut-over and finished ingests started before it.
+
+        Workers notice it at their next poll of the active collection, and ingests
+        already in flight finish writing to the old collection.
+        """
+        grace = max(
+            settings.REINDEX_CUTOVER_GRACE,
+            settings.ACTIVE_COLLECTION_POLL_INTERVAL + settings.INGEST_DEADLINE
+        )
+        until = time.monotonic() + grace
+        while True:
+            # Keep the lease while waiting, so the job is not resumed elsewhere
+            await jobs.checkpoint(job_id, progress)
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, settings.JOB_LEASE_SECONDS / 4))
+
+    async def _embed_batch(self, params: Dict[str, Any], target, batch: List[Dict[str, Any]]):
+        batch = [chunk for chunk in batch if chunk.get("vector_id")]
+        if not batch:
+            return
+
+        response = await get_embedding_provider().generate_embeddings(
+            [chunk["chunk_text"] for chunk in batch],
+            model=params["embedding_model"],
+            priority=Priority.BACKGROUND
+        )
+        await record_rollup("reindex", params["embedding_model"], response.get("usage"), None)
+        embeddings = [item["embedding"] for item in response["data"]]
+        index_embeddings = truncate_embeddings(embeddings, params["index_dimensions"]).tolist()
+
+        # Vector ids are kept, so chunks resolve the same way in either collection
+        by_namespace: Dict[str, List[int]] = {}
+        for i, chunk in enumerate(batch):
+            by_namespace.setdefault(record_namespace(chunk), []).append(i)
+
+        loop = asyncio.get_running_loop()
+        for namespace, rows in by_namespace.items():
+            collection = await get_namespace_collection(namespace, create=True, base=target.name)
+            await loop.run_in_executor(None, lambda: collection.upsert(
+                ids=[batch[i]["vector_id"] for i in rows],
+                embeddings=[index_embeddings[i] for i in rows],
+                documents=[batch[i]["chunk_text"] for i in rows],
+                metadatas=[
+                    {"document_id": batch[i]["document_id"], "chunk_index": batch[i]["chunk_index"],
+                     **(batch[i].get("metadata") or {})}
+                    for i in rows
+                ]
+            ))
+
+        # Chunks are tagged even without rescoring vectors, which marks them as copied
+        rescore = settings.EMBEDDING_RESCORE_DTYPE != "none"
+        await db.db.document_chunks.bulk_write([
+            UpdateOne(
+                {"_id": chunk["_id"]},
+                {"$set": {
+                    PENDING_EMBEDDING_MODEL_FIELD: params["embedding_model"],
+                    **({PENDING_EMBEDDING_FIELD: quantize(embedding, settings.EMBEDDING_RESCORE_DTYPE)} if rescore else {})
+                }}
+            )
+            for chunk, embedding in zip(batch, embeddings)
+        ], ordered=False)
+
+    async def _tag_rescoring_vectors(self, model: Optional[str]):
+        """Record the model of rescoring vectors stored before vectors were tagged with it."""
+        if not model:
+            return
+        await db.db.document_chunks.update_many(
+            {"embedding": {"$exists": True}, "embedding_model": {"$exists": False}},
+            {"$set": {"embedding_model": model}}
+        )
+
+    async def _promote_rescoring_vectors(self):
+        """
+        Replace the old model's rescoring vectors with the re-embedded ones.
+
+        Until this runs after the cut-over, rescoring uses the staged vectors,
+        which match the new model's query vectors. Chunks keep the model tag
+        either way, as it records which model their indexed vector came from.
+        """
+        # Re-embedded chunks without a staged vector must never be rescored with the old model's one
+        await db.db.document_chunks.update_many(
+            {
+                PENDING_EMBEDDING_MODEL_FIELD: {"$exists": True},
+                PENDING_EMBEDDING_FIELD: {"$exists": False},
+                "embedding": {"$exists": True}
+            },
+            {"$unset": {"embedding": ""}}
+        )
+        await db.db.document_chunks.update_many(
+            {PENDING_EMBEDDING_MODEL_FIELD: {"$exists": True}},
+            {"$rename": {PENDING_EMBEDDING_FIELD: "embedding", PENDING_EMBEDDING_MODEL_FIELD: "embedding_model"}}
+        )
+
+    async def _drop_collections(self, base: str):
+        """Delete a base collection and the collections of every namespace within it."""
+        loop = asyncio.get_running_loop()
+        for namespace in await list_namespaces():
+            name = collection_name(base, namespace)
+            try:
+                await loop.run_in_executor(None, lambda: chroma.client.delete_collection(name=name))
+            except Exception as e:
+                # Namespaces created after the previous collection was replaced have none
+                logging.info(f"Collection '{name}' not deleted: {str(e)}")
+        forget_collections(base)
+
+    async def _remove_orphans(self, job_id: str, progress: Dict[str, Any], target, page_size: int = 1000):
+        """Delete vectors copied for chunks that were deleted while the job ran, counting them in progress."""
+        loop = asyncio.get_running_loop()
+        orphans = []
+        offset = 0
+        while True:
+            page = await loop.run_in_executor(None, lambda: target.get(include=[], limit=page_size, offset=offset))
+            ids = page["ids"]
+            if not ids:
+                break
+            existing = set(await db.db.document_chunks.distinct("vector_id", {"vector_id": {"$in": ids}}))
+            orphans.extend(vector_id for vector_id in ids if vector_id not in existing)
+            offset += len(ids)
+            await jobs.checkpoint(job_id, progress)
+
+        for start in range(0, len(orphans), page_size):
+            await loop.run_in_executor(None, lambda: target.delete(ids=orphans[start:start + page_size]))
+            progress["orphans_removed"] += len(orphans[start:start + page_size])
+            await jobs.checkpoint(job_id, progress)
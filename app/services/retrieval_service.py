@@ -1,31 +1,132 @@
-from typing import List, Dict, Any, Optional
-from app.core.chroma_client import chroma
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+from app.core.active_collection import active
+from app.core.admission import shared_call
+from app.core.config import settings
 from app.core.database import db
-from app.core.openrouter import OpenRouterClient
+from app.core.embeddings import get_embedding_provider
+from app.core.metrics import track_stage
+from app.core.namespaces import get_namespace_collection, namespace_filter
+from app.core.usage import record_rollup
 from app.models.embedding import DocumentChunk
 from app.schemas.search import SearchResult
+from app.services.reindex_service import PENDING_EMBEDDING_FIELD, PENDING_EMBEDDING_MODEL_FIELD
+from app.utils.chunking import stitch_chunks
+from app.utils.quantization import cosine_similarities, dequantize, truncate_embeddings
+from app.utils.singleflight import SingleFlight, make_key
+
+# Identical searches in flight at the same time share one embedding call and Chroma query
+search_flight = SingleFlight("retrieval.search")
 
 class RetrievalService:
-    """Service for handling vector retrieval operations."""
+    """Service for handling vector retrieval operations within one or more namespaces."""
+    
+    def __init__(self, namespace: Optional[str] = None):
+        self.namespace = namespace or settings.DEFAULT_NAMESPACE
     
-    async def search(self, query: str, top_k: int = 5, filter_metadata: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
-        """Search for relevant document chunks based on query."""
-        # Generate query embedding
-        openrouter_client = OpenRouterClient()
-        embedding_response = await openrouter_client.generate_embeddings([query])
+    async def search(self, query: str, top_k: int = 5, filter_metadata: Optional[Dict[str, Any]] = None,
+                     namespaces: Optional[List[str]] = None,
+                     candidate_factor: Optional[int] = None, neighbors: int = 0) -> List[SearchResult]:
+        """
+        Search for relevant document chunks based on query.
+        
+        Searches the service's namespace, or each of namespaces in parallel
+        with the results merged into one top_k by score.
+        
+        When full-size vectors are stored for rescoring, the search runs in two
+        stages: top_k * candidate_factor candidates (RESCORE_CANDIDATE_FACTOR by
+        default) come from the compact index, then are re-ranked exactly.
+        
+        With neighbors, each hit's text is widened to the passage of it and up to
+        that many chunks either side of it in its document.
+        """
+        namespaces = sorted(set(namespaces)) if namespaces else [self.namespace]
+        candidate_factor = candidate_factor or settings.RESCORE_CANDIDATE_FACTOR
+        results = await shared_call(
+            search_flight,
+            make_key(query, top_k, filter_metadata or {}, namespaces, candidate_factor, neighbors),
+            lambda: self._search(query, top_k, filter_metadata, namespaces, candidate_factor, neighbors),
+            "embedding", "vector_query"
+        )
+        # Waiters share the result, so hand each caller its own list
+        return list(results)
+    
+    async def _search(self, query: str, top_k: int, filter_metadata: Optional[Dict[str, Any]],
+                      namespaces: List[str], candidate_factor: int, neighbors: int) -> List[SearchResult]:
+        """Run the embedding call once, then the vector queries of every namespace concurrently."""
+        # Generate query embedding with the model of the vectors being served
+        model = active.embedding_model
+        embedding_response = await get_embedding_provider().generate_embeddings([query], model=model)
         query_embedding = embedding_response["data"][0]["embedding"]
+        index_embedding = truncate_embeddings([query_embedding], active.index_dimensions)[0].tolist()
+        
+        # When rescoring, over-fetch candidates from the compact index
+        rescore = settings.EMBEDDING_RESCORE_DTYPE != "none"
+        n_results = top_k * candidate_factor if rescore else top_k
         
-        # Query ChromaDB
-        results = chroma.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=filter_metadata
+        # The query embedding's usage is recorded alongside the vector queries
+        per_namespace, _ = await asyncio.gather(
+            asyncio.gather(*[
+                self._search_namespace(namespace, index_embedding, n_results, filter_metadata,
+                                       model if rescore else None)
+                for namespace in namespaces
+            ]),
+            record_rollup(
+                "query_embedding", embedding_response.get("model") or model,
+                embedding_response.get("usage"), self.namespace
+            )
         )
+        search_results = [result for results, _ in per_namespace for result in results]
+        full_vectors = [vector for _, vectors in per_namespace for vector in vectors]
+        
+        if rescore:
+            search_results = self._rescore(query_embedding, search_results, full_vectors)
+        elif len(namespaces) > 1:
+            search_results.sort(key=lambda result: result.score, reverse=True)
+        search_results = search_results[:top_k]
+        
+        if neighbors:
+            return await self._expand_neighbors(search_results, neighbors)
+        return search_results
+    
+    async def _search_namespace(self, namespace: str, index_embedding: List[float], n_results: int,
+                                filter_metadata: Optional[Dict[str, Any]],
+                                rescore_model: Optional[str]) -> Tuple[List[SearchResult], List[Any]]:
+        """
+        Query one namespace's collection and resolve its hits to chunks, with their
+        full-size vectors from rescore_model if rescoring.
+        """
+        collection = await get_namespace_collection(namespace)
+        if collection is None:
+            return [], []
+        
+        chunk_projection = {"_id": 1, "vector_id": 1}
+        if rescore_model:
+            chunk_projection.update({
+                "embedding": 1, "embedding_model": 1, PENDING_EMBEDDING_FIELD: 1, PENDING_EMBEDDING_MODEL_FIELD: 1
+            })
+        
+        # Query ChromaDB off the event loop, so namespaces are searched in parallel
+        with track_stage("vector_query"):
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(None, lambda: collection.query(
+                query_embeddings=[index_embedding],
+                n_results=n_results,
+                where=filter_metadata or None
+            ))
         
         # Process results
         search_results = []
+        full_vectors = []
         
         if results and results['ids'][0]:
+            # Resolve all hits to chunks in one query, however many candidates there are
+            with track_stage("chunk_lookup"):
+                chunks = {
+                    chunk["vector_id"]: chunk async for chunk in
+                    db.db.document_chunks.find({"vector_id": {"$in": results['ids'][0]}}, chunk_projection)
+                }
+            
             for i, vector_id in enumerate(results['ids'][0]):
                 # Get score (distance)
                 score = results['distances'][0][i] if 'distances' in results else 0.0
@@ -39,16 +140,108 @@ class RetrievalService:
                 # Get text
                 chunk_text = results['documents'][0][i] if 'documents' in results else ''
                 
-                # Find the corresponding chunk in MongoDB
-                chunk = await db.db.document_chunks.find_one({"vector_id": vector_id})
+                chunk = chunks.get(vector_id)
                 chunk_id = str(chunk['_id']) if chunk else ""
+                if rescore_model:
+                    full_vectors.append(self._rescoring_vector(chunk, rescore_model) if chunk else None)
                 
                 search_results.append(SearchResult(
                     chunk_id=chunk_id,
                     document_id=document_id,
                     chunk_text=chunk_text,
                     metadata=metadata,
-                    score=similarity_score
+                    score=similarity_score,
+                    namespace=namespace
                 ))
         
-        return search_results
\ No newline at end of file
+        return search_results, full_vectors
+    
+    @staticmethod
+    def _rescoring_vector(chunk: Dict[str, Any], model: str) -> Optional[Any]:
+        """
+        A chunk's full-size vector from model, if it has one.
+        
+        During a re-index cut-over a chunk can hold the old model's vector and a
+        staged one from the new model; only one matching the query's model is
+        comparable. Untagged vectors predate tagging and are taken as the served model's.
+        """
+        if chunk.get(PENDING_EMBEDDING_MODEL_FIELD) == model and chunk.get(PENDING_EMBEDDING_FIELD):
+            return dequantize(chunk[PENDING_EMBEDDING_FIELD])
+        if chunk.get("embedding") and chunk.get("embedding_model", model) == model:
+            return dequantize(chunk["embedding"])
+        return None
+    
+    def _rescore(self, query_embedding: List[float], results: List[SearchResult],
+                 full_vectors: List[Any]) -> List[SearchResult]:
+        """
+        Re-rank candidates by full-size similarity to the query.
+        
+        Candidates without a stored full-size vector from the query's model
+        (ingested before rescoring was enabled, or mid re-index) keep their index score.
+        """
+        with track_stage("rescore"):
+            for result, score in zip(results, cosine_similarities(query_embedding, full_vectors)):
+                if score is not None:
+                    result.score = score
+            return sorted(results, key=lambda result: result.score, reverse=True)
+    
+    async def _expand_neighbors(self, results: List[SearchResult], neighbors: int) -> List[SearchResult]:
+        """
+        Widen each hit to the passage of it and its neighbors by chunk_index.
+        
+        The neighbors of every hit are read in one query. Hits whose windows
+        overlap or touch within a document become one passage, kept at the place
+        of the best-scoring of them.
+        """
+        # Windows of hits per document, in score order
+        windows: Dict[str, List[List[Any]]] = {}
+        for rank, result in enumerate(results):
+            chunk_index = result.metadata.get("chunk_index")
+            if chunk_index is None:
+                continue
+            windows.setdefault(result.document_id, []).append(
+                [max(0, chunk_index - neighbors), chunk_index + neighbors, rank]
+            )
+        if not windows:
+            return results
+        
+        # Merge overlapping and adjacent windows, each keeping its best (lowest) rank
+        passages: Dict[int, Tuple[int, int]] = {}
+        dropped = set()
+        for document_windows in windows.values():
+            merged: List[List[Any]] = []
+            for first, last, rank in sorted(document_windows):
+                if merged and first <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], last)
+                    dropped.add(max(rank, merged[-1][2]))
+                    merged[-1][2] = min(rank, merged[-1][2])
+                else:
+                    merged.append([first, last, rank])
+            for first, last, rank in merged:
+                passages[rank] = (first, last)
+        
+        # Fetch every window's chunks in one round trip over the (document_id, chunk_index) index
+        with track_stage("neighbor_lookup"):
+            texts: Dict[Tuple[str, int], str] = {}
+            query = {"$or": [
+                {
+                    "document_id": results[rank].document_id,
+                    "chunk_index": {"$gte": first, "$lte": last},
+                    **namespace_filter(results[rank].namespace or self.namespace)
+                } for rank, (first, last) in passages.items()
+            ]}
+            async for chunk in db.db.document_chunks.find(query, {"document_id": 1, "chunk_index": 1, "chunk_text": 1}):
+                texts[(chunk["document_id"], chunk["chunk_index"])] = chunk["chunk_text"]
+        
+        expanded = []
+        for rank, result in enumerate(results):
+            if rank in dropped:
+                continue
+            if rank in passages:
+                first, last = passages[rank]
+                span = [i for i in range(first, last + 1) if (result.document_id, i) in texts]
+                if span:
+                    result.chunk_text = stitch_chunks([texts[(result.document_id, i)] for i in span])
+                    result.chunk_span = [span[0], span[-1]]
+            expanded.append(result)
+        return expanded
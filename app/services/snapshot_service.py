@@ -0,0 +1,212 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+import numpy as np
+from pymongo.errors import BulkWriteError
+from app.core.active_collection import active
+from app.core.blob_store import load_body, release_body, store_body
+from app.core.config import settings
+from app.core.database import db
+from app.core.chroma_client import chroma
+from app.core.namespaces import get_namespace_collection, record_namespace, register_namespace
+from app.utils.snapshot import SnapshotError, SnapshotReader, SnapshotWriter
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Chroma rejects very large add/upsert calls, so vectors are loaded in slices
+CHROMA_BATCH_SIZE = 500
+
+class SnapshotService:
+    """Service for exporting and importing binary corpus snapshots."""
+
+    async def export_snapshot(self, dtype: Optional[str] = None,
+                              batch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Stream the corpus as a binary snapshot.
+
+        Documents and chunks are read in _id order in row groups of batch_size,
+        and each chunk row group is followed by the vectors of its chunks.
+        """
+        writer = SnapshotWriter(dtype or settings.SNAPSHOT_VECTOR_DTYPE)
+        batch_size = batch_size or settings.SNAPSHOT_BATCH_SIZE
+
+        yield writer.start({
+            "created_at": datetime.utcnow().isoformat(),
+            "embedding_model": active.embedding_model,
+            "collection": chroma.collection.name,
+            "documents": await db.db.documents.estimated_document_count(),
+            "chunks": await db.db.document_chunks.estimated_document_count()
+        })
+
+        totals = {"documents": 0, "chunks": 0, "vectors": 0, "missing_vectors": 0}
+
+        rows = []
+        async for doc in db.db.documents.find().sort("_id", 1):
+            rows.append(await self._inline_body(doc))
+            if len(rows) >= batch_size:
+                totals["documents"] += len(rows)
+                yield writer.documents(rows)
+                rows = []
+        if rows:
+            totals["documents"] += len(rows)
+            yield writer.documents(rows)
+
+        rows = []
+        async for chunk in db.db.document_chunks.find().sort("_id", 1):
+            rows.append(chunk)
+            if len(rows) >= batch_size:
+                async for block in self._export_chunks(writer, rows, totals):
+                    yield block
+                rows = []
+        if rows:
+            async for block in self._export_chunks(writer, rows, totals):
+                yield block
+
+        logging.info(f"Exported snapshot: {totals}")
+        yield writer.end(totals)
+
+    async def _export_chunks(self, writer: SnapshotWriter, rows: List[Dict[str, Any]],
+                             totals: Dict[str, int]) -> AsyncIterator[bytes]:
+        """Encode a chunk row group and the matching vector block."""
+        # Vectors live in the collection of each chunk's namespace
+        vector_ids: Dict[str, List[str]] = {}
+        for row in rows:
+            if row.get("vector_id"):
+                vector_ids.setdefault(record_namespace(row), []).append(row["vector_id"])
+
+        embeddings = {}
+        loop = asyncio.get_running_loop()
+        for namespace, ids in vector_ids.items():
+            collection = await get_namespace_collection(namespace)
+            if collection is None:
+                continue
+            result = await loop.run_in_executor(
+                None, lambda: collection.get(ids=ids, include=["embeddings"])
+            )
+            embeddings.update(zip(result["ids"], result["embeddings"]))
+
+        dimensions = len(next(iter(embeddings.values()))) if embeddings else 0
+        matrix = np.full((len(rows), dimensions), np.nan, dtype=np.float32)
+        for i, row in enumerate(rows):
+            embedding = embeddings.get(row.get("vector_id"))
+            if embedding is not None:
+                matrix[i] = embedding
+
+        found = sum(1 for row in rows if row.get("vector_id") in embeddings)
+        totals["chunks"] += len(rows)
+        totals["vectors"] += found
+        totals["missing_vectors"] += len(rows) - found
+
+        yield writer.chunks(rows)
+        yield writer.vectors(matrix)
+
+    async def import_snapshot(self, path: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Bulk-load a snapshot into MongoDB and Chroma without any embedding calls.
+
+        Records that already exist (same _id) are skipped and vectors are
+        upserted, so an interrupted import can simply be run again.
+
+        Raises:
+            SnapshotError: If the snapshot is invalid, or was embedded with a
+                different model than the one configured (unless force is set)
+        """
+        totals = {"documents": 0, "documents_skipped": 0, "chunks": 0, "chunks_skipped": 0, "vectors": 0}
+        chunks: List[Dict[str, Any]] = []
+
+        with SnapshotReader(path) as reader:
+            for tag, value in reader.blocks():
+                if tag == "META":
+                    model = value.get("embedding_model")
+                    if model != active.embedding_model and not force:
+                        raise SnapshotError(
+                            f"Snapshot was embedded with {model}, but {active.embedding_model} is being served"
+                        )
+                elif tag == "DOCS":
+                    value = [await self._store_body(row) for row in value]
+                    for namespace in {record_namespace(row) for row in value}:
+                        await register_namespace(namespace)
+                    skipped = await self._insert_rows(db.db.documents, value)
+                    totals["documents"] += len(value) - len(skipped)
+                    totals["documents_skipped"] += len(skipped)
+                    # Existing documents hold their own reference, so the one taken for the row is dropped
+                    for index in skipped:
+                        await release_body(value[index].get("content_ref"))
+                elif tag == "CHNK":
+                    chunks = value
+                elif tag == "VECS":
+                    if len(chunks) != len(value):
+                        raise SnapshotError("Vector block does not match the preceding chunk row group")
+                    skipped = await self._insert_rows(db.db.document_chunks, chunks)
+                    totals["chunks"] += len(chunks) - len(skipped)
+                    totals["chunks_skipped"] += len(skipped)
+                    totals["vectors"] += await self._load_vectors(chunks, value)
+                    chunks = []
+
+        logging.info(f"Imported snapshot {path}: {totals}")
+        return totals
+
+    async def _inline_body(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Write out-of-line bodies inline, so a snapshot does not depend on the blob store."""
+        content_ref = doc.pop("content_ref", None)
+        if content_ref:
+            doc["content"] = await load_body(content_ref)
+        return doc
+
+    async def _store_body(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Move a large imported body out-of-line, as on document creation."""
+        content_ref = await store_body(row.get("content") or "")
+        if content_ref:
+            row["content"] = None
+            row["content_ref"] = content_ref
+        return row
+
+    async def _insert_rows(self, collection, rows: List[Dict[str, Any]]) -> List[int]:
+        """Insert rows, skipping ones that already exist, and return the indexes of the skipped rows."""
+        if not rows:
+            return []
+
+        try:
+            await collection.insert_many(rows, ordered=False)
+            return []
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            other_errors = [error for error in errors if error.get("code") != DUPLICATE_KEY_ERROR]
+            if other_errors:
+                raise
+            return [error["index"] for error in errors]
+
+    async def _load_vectors(self, chunks: List[Dict[str, Any]], matrix: np.ndarray) -> int:
+        """Upsert the vectors of a chunk row group into Chroma, skipping missing (NaN) rows."""
+        loop = asyncio.get_running_loop()
+        loaded = 0
+
+        for start in range(0, len(chunks), CHROMA_BATCH_SIZE):
+            block = matrix[start:start + CHROMA_BATCH_SIZE]
+            present = ~np.isnan(block[:, 0]) if block.shape[1] else np.zeros(len(block), dtype=bool)
+
+            # Grouped by namespace, as each namespace has its own collection
+            groups: Dict[str, Dict[str, list]] = {}
+            for offset in np.flatnonzero(present):
+                chunk = chunks[start + offset]
+                if not chunk.get("vector_id"):
+                    continue
+                group = groups.setdefault(
+                    record_namespace(chunk), {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+                )
+                group["ids"].append(chunk["vector_id"])
+                group["embeddings"].append(block[offset].astype(np.float32).tolist())
+                group["documents"].append(chunk["chunk_text"])
+                group["metadatas"].append({
+                    "document_id": chunk["document_id"],
+                    "chunk_index": chunk["chunk_index"],
+                    **(chunk.get("metadata") or {})
+                })
+
+            for namespace, group in groups.items():
+                collection = await get_namespace_collection(namespace, create=True)
+                await loop.run_in_executor(None, lambda: collection.upsert(**group))
+                loaded += len(group["ids"])
+
+        return loaded
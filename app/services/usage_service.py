@@ -0,0 +1,97 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.database import db
+from app.core.namespaces import namespace_filter
+from app.models.chat import ChatSession
+from bson import ObjectId
+
+# Rollup fields consumers can be grouped by
+USAGE_GROUPS = {
+    "session": "session_id",
+    "document": "document_id",
+    "model": "model",
+    "namespace": "namespace",
+    "day": "day"
+}
+
+# Summed rollup counters, any of which consumers can be ranked by
+USAGE_METRICS = ["requests", "prompt_tokens", "completion_tokens", "total_tokens", "cost", "latency_seconds"]
+
+class UsageService:
+    """Service for querying token usage rollups."""
+    
+    def __init__(self, namespace: Optional[str] = None):
+        self.namespace = namespace or settings.DEFAULT_NAMESPACE
+        self.scope = namespace_filter(self.namespace)
+    
+    async def top_consumers(self, by: str = "session", metric: str = "total_tokens", days: int = 7,
+                            limit: int = 10, namespace: Optional[str] = None,
+                            kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Rank sessions, documents, models, namespaces or days by their usage over the last days.
+        
+        Raises:
+            ValueError: If by or metric is unknown
+        """
+        if by not in USAGE_GROUPS:
+            raise ValueError(f"Unknown grouping {by!r}, expected one of {sorted(USAGE_GROUPS)}")
+        if metric not in USAGE_METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {USAGE_METRICS}")
+        
+        field = USAGE_GROUPS[by]
+        match: Dict[str, Any] = {"day": {"$gte": self.since(days)}, field: {"$ne": None}}
+        if namespace:
+            match["namespace"] = namespace
+        if kind:
+            match["kind"] = kind
+        
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": f"${field}", **{name: {"$sum": f"${name}"} for name in USAGE_METRICS}}},
+            {"$sort": {metric: -1, "_id": 1}},
+            {"$limit": limit}
+        ]
+        return [
+            {"key": row.pop("_id"), **row}
+            async for row in db.db.usage_rollups.aggregate(pipeline)
+        ]
+    
+    async def get_session_usage(self, session_id: str, days: int = 30) -> Optional[Dict[str, Any]]:
+        """Get a session's token totals against its budget, with a daily breakdown by model."""
+        if not ObjectId.is_valid(session_id):
+            return None
+        session = ChatSession.from_mongo(
+            await db.db.chat_sessions.find_one({"_id": ObjectId(session_id), **self.scope}, {"token_budget": 1, "usage": 1})
+        )
+        if not session:
+            return None
+        
+        pipeline = [
+            {"$match": {"session_id": session_id, "day": {"$gte": self.since(days)}}},
+            {"$group": {
+                "_id": {"day": "$day", "model": "$model"},
+                **{name: {"$sum": f"${name}"} for name in USAGE_METRICS}
+            }},
+            {"$sort": {"_id.day": 1, "_id.model": 1}}
+        ]
+        daily = [
+            {**row.pop("_id"), **row}
+            async for row in db.db.usage_rollups.aggregate(pipeline)
+        ]
+        
+        budget = session.token_budget or settings.SESSION_TOKEN_BUDGET or None
+        used = session.usage.get("total_tokens", 0)
+        return {
+            "session_id": session_id,
+            "token_budget": budget,
+            "used_tokens": used,
+            "remaining_tokens": max(0, budget - used) if budget else None,
+            "daily": daily
+        }
+    
+    @staticmethod
+    def since(days: int) -> datetime:
+        """Start of the first rollup day within the last days (today counts as one)."""
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=days - 1)
@@ -2,6 +2,9 @@ from typing import List, Dict, Any
 from app.utils.text_processing import clean_text, normalize_line_breaks
 import re
 
+# Shorter matches between the end of one chunk and the start of the next are treated as coincidence
+MIN_STITCH_OVERLAP = 16
+
 def chunk_document(document_id: str, text: str, metadata: Dict[str, Any] = None, 
                  chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Dict[str, Any]]:
     """
@@ -17,26 +20,31 @@ def chunk_document(document_id: str, text: str, metadata: Dict[str, Any] = None,
     Returns:
         List of dictionaries containing chunk information
     """
-    # Clean and normalize text
-    text = clean_text(text)
-    text = normalize_line_breaks(text)
-    
-    # Initialize variables
-    chunks = []
+    return chunk_records(document_id, split_text(text, chunk_size, chunk_overlap), metadata)
+
+def chunk_records(document_id: str, texts: List[str], metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """Wrap chunk texts of a document into chunk dictionaries."""
     metadata = metadata or {}
+    return [{"document_id": document_id, "text": text, "metadata": metadata} for text in texts]
+
+def split_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """
+    Normalize a text and split it into overlapping chunk texts.
+    
+    Pure CPU work on plain strings, so it can run in a worker process.
+    """
+    # Normalize line breaks first, so cleaning can keep paragraph boundaries
+    text = normalize_line_breaks(text)
+    text = clean_text(text)
     
     # If text is shorter than chunk_size, return as a single chunk
     if len(text) <= chunk_size:
-        chunks.append({
-            "document_id": document_id,
-            "text": text,
-            "metadata": metadata
-        })
-        return chunks
+        return [text]
     
     # Split into paragraphs first to respect natural boundaries
     paragraphs = re.split(r'\n{2,}', text)
     
+    chunks = []
     current_chunk = ""
     current_chunk_size = 0
     
@@ -49,12 +57,7 @@ def chunk_document(document_id: str, text: str, metadata: Dict[str, Any] = None,
         
         # If adding this paragraph exceeds chunk_size, finalize current chunk
         if current_chunk_size + paragraph_len > chunk_size and current_chunk:
-            # Add current chunk to list
-            chunks.append({
-                "document_id": document_id,
-                "text": current_chunk.strip(),
-                "metadata": metadata
-            })
+            chunks.append(current_chunk.strip())
             
             # Start new chunk with overlap
             overlap_start = max(0, len(current_chunk) - chunk_overlap)
@@ -70,10 +73,26 @@ def chunk_document(document_id: str, text: str, metadata: Dict[str, Any] = None,
     
     # Add the last chunk if it's not empty
     if current_chunk:
-        chunks.append({
-            "document_id": document_id,
-            "text": current_chunk.strip(),
-            "metadata": metadata
-        })
+        chunks.append(current_chunk.strip())
     
-    return chunks
\ No newline at end of file
+    return chunks
+
+def stitch_chunks(texts: List[str]) -> str:
+    """
+    Join consecutive chunks of a document into one passage.
+    
+    Each chunk starts with the tail of the one before it (chunk_overlap), so the
+    longest end of a chunk that the next one starts with is only kept once.
+    """
+    passage = ""
+    for text in texts:
+        if not passage:
+            passage = text
+            continue
+        overlap = 0
+        for size in range(min(len(passage), len(text)), MIN_STITCH_OVERLAP - 1, -1):
+            if passage.endswith(text[:size]):
+                overlap = size
+                break
+        passage += text[overlap:] if overlap else "\n\n" + text
+    return passage
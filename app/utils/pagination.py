@@ -0,0 +1,76 @@
+import base64
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from bson import json_util
+
+# A sort specification as used by Motor, e.g. [("created_at", -1), ("_id", -1)]
+SortSpec = List[Tuple[str, int]]
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key values of the last item on a page as an opaque cursor."""
+    payload = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is invalid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise ValueError("Invalid pagination cursor")
+
+    return values
+
+def keyset_filter(sort: SortSpec, values: List[Any]) -> Dict[str, Any]:
+    """
+    Build a filter that selects items strictly after the given sort key values.
+
+    For a sort of [(a, -1), (b, -1)] this is {a < va} OR {a == va AND b < vb},
+    which Mongo answers with a range scan on the matching compound index.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prefix_field: value for (prefix_field, _), value in zip(sort[:i], values[:i])}
+        clause[field] = {"$gt" if direction == 1 else "$lt": values[i]}
+        clauses.append(clause)
+
+    return {"$or": clauses} if len(clauses) > 1 else clauses[0]
+
+def apply_cursor(filters: Dict[str, Any], sort: SortSpec, cursor: Optional[str]) -> Dict[str, Any]:
+    """Combine query filters with the keyset condition for a cursor."""
+    if not cursor:
+        return filters
+
+    condition = keyset_filter(sort, decode_cursor(cursor, sort))
+    if not filters:
+        return condition
+    return {"$and": [filters, condition]}
+
+def make_count_key(filters: Dict[str, Any]) -> str:
+    """Build a cache key for a filter document."""
+    return json_util.dumps(filters, sort_keys=True)
+
+class CountCache:
+    """Short-lived cache for expensive filtered counts."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, int]] = {}
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[int]]) -> int:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and now - entry[0] < self.ttl:
+            return entry[1]
+
+        value = await compute()
+        self._entries[key] = (now, value)
+
+        # Drop expired entries so the cache cannot grow without bound
+        if len(self._entries) > 1024:
+            self._entries = {k: v for k, v in self._entries.items() if now - v[0] < self.ttl}
+
+        return value
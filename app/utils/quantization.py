@@ -0,0 +1,65 @@
+import struct
+from typing import List, Optional, Sequence
+import numpy as np
+
+# First byte of a stored embedding identifies its encoding
+CODEC_FLOAT16 = 1
+CODEC_INT8 = 2
+CODEC_FLOAT32 = 3
+
+SCALE = struct.Struct("<f")
+
+def truncate_embeddings(embeddings: Sequence[Sequence[float]], dimensions: int = 0) -> np.ndarray:
+    """
+    Keep the first `dimensions` components of each embedding and re-normalize.
+
+    Matryoshka-trained models (such as text-embedding-3) front-load information,
+    so a prefix of the vector is itself a usable, smaller embedding. With
+    dimensions of 0 the vectors are returned at full size.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if dimensions and dimensions < matrix.shape[1]:
+        matrix = matrix[:, :dimensions]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def quantize(vector: Sequence[float], dtype: str) -> bytes:
+    """Encode a vector as float32 (full precision), float16, or int8 with a per-vector scale."""
+    vector = np.asarray(vector, dtype=np.float32)
+    if dtype == "float32":
+        return bytes([CODEC_FLOAT32]) + vector.astype("<f4").tobytes()
+    if dtype == "float16":
+        return bytes([CODEC_FLOAT16]) + vector.astype("<f2").tobytes()
+    if dtype == "int8":
+        scale = float(np.abs(vector).max()) / 127.0 or 1.0
+        quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        return bytes([CODEC_INT8]) + SCALE.pack(scale) + quantized.tobytes()
+    raise ValueError(f"Unsupported quantization dtype: {dtype}")
+
+def dequantize(data: bytes) -> np.ndarray:
+    """Decode a vector produced by quantize."""
+    codec = data[0]
+    if codec == CODEC_FLOAT32:
+        return np.frombuffer(data, dtype="<f4", offset=1).astype(np.float32)
+    if codec == CODEC_FLOAT16:
+        return np.frombuffer(data, dtype="<f2", offset=1).astype(np.float32)
+    if codec == CODEC_INT8:
+        scale = SCALE.unpack_from(data, 1)[0]
+        return np.frombuffer(data, dtype=np.int8, offset=1 + SCALE.size).astype(np.float32) * scale
+    raise ValueError(f"Unknown quantized vector codec: {codec}")
+
+def cosine_similarities(query: Sequence[float], vectors: List[Optional[np.ndarray]]) -> List[Optional[float]]:
+    """Cosine similarity of the query to each vector (None where a vector is missing), in one matrix product."""
+    query = np.asarray(query, dtype=np.float32)
+    scores: List[Optional[float]] = [None] * len(vectors)
+    present = [i for i, vector in enumerate(vectors) if vector is not None and vector.shape == query.shape]
+    if not present:
+        return scores
+
+    matrix = np.stack([vectors[i] for i in present])
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    similarities = matrix @ query / (norms * (float(np.linalg.norm(query)) or 1.0))
+    for i, score in zip(present, similarities.tolist()):
+        scores[i] = score
+    return scores
@@ -0,0 +1,62 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with identical keys into one execution.
+
+    The first caller for a key starts the upstream call; callers arriving while
+    it is in flight wait on the same task and share its result (or exception).
+    The upstream call is shielded, so a cancelled waiter never cancels it for
+    the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        _registry.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn for key, or join the call already in flight for it."""
+        self.calls += 1
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get call, execution and collapse counters."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._in_flight)
+        }
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieve the exception so it is not logged when every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+_registry: List[SingleFlight] = []
+
+def make_key(*parts: Any) -> str:
+    """Build a stable key from JSON-serializable parts."""
+    return json.dumps(parts, sort_keys=True, default=str)
+
+def singleflight_stats() -> Dict[str, Any]:
+    """Get counters for every singleflight group."""
+    return {group.name: group.stats() for group in _registry}
@@ -0,0 +1,185 @@
+"""
+Binary corpus snapshot format.
+
+A snapshot is the magic string followed by blocks. Every block starts on a
+16-byte boundary with a 32-byte header (tag, codec, CRC32 of the payload,
+payload length):
+
+    META  JSON: format version, embedding model, vector dtype, source counts
+    DOCS  row group of raw `documents` records (BSON, zlib compressed)
+    CHNK  row group of raw `document_chunks` records (BSON, zlib compressed)
+    VECS  vectors for the preceding CHNK group: a 16-byte subheader (dtype,
+          rows, dimensions) then a little-endian rows x dimensions matrix.
+          Rows of NaN mark chunks that had no vector in the store.
+    END!  JSON with the exported totals; a snapshot without it is truncated
+
+Vector payloads are uncompressed and 16-byte aligned so they can be
+memory-mapped directly on import.
+"""
+import json
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import bson
+import numpy as np
+
+MAGIC = b"RAGSNAP1"
+FORMAT_VERSION = 1
+ALIGNMENT = 16
+
+BLOCK_HEADER = struct.Struct("<4sB3xIQ12x")
+VECTOR_HEADER = struct.Struct("<4sII4x")
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot is corrupt, truncated or unsupported."""
+
+def _padding(offset: int) -> int:
+    return -offset % ALIGNMENT
+
+class SnapshotWriter:
+    """
+    Encode snapshot blocks as bytes, so a snapshot can be streamed.
+
+    Each method returns the bytes to append next, including alignment padding.
+    """
+
+    def __init__(self, dtype: str = "float32"):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.dtype = dtype
+        self.offset = 0
+
+    def start(self, meta: Dict[str, Any]) -> bytes:
+        self.offset = len(MAGIC)
+        meta = {"format_version": FORMAT_VERSION, "dtype": self.dtype, **meta}
+        return MAGIC + self._json_block(b"META", meta)
+
+    def documents(self, rows: List[Dict[str, Any]]) -> bytes:
+        return self._rows_block(b"DOCS", rows)
+
+    def chunks(self, rows: List[Dict[str, Any]]) -> bytes:
+        return self._rows_block(b"CHNK", rows)
+
+    def vectors(self, matrix: np.ndarray) -> bytes:
+        matrix = np.ascontiguousarray(matrix, dtype=DTYPES[self.dtype])
+        rows, dimensions = matrix.shape
+        code = self.dtype.encode("ascii")[:1] + str(DTYPES[self.dtype].itemsize).encode("ascii")
+        payload = VECTOR_HEADER.pack(code, rows, dimensions) + matrix.tobytes()
+        return self._block(b"VECS", CODEC_RAW, payload)
+
+    def end(self, totals: Dict[str, Any]) -> bytes:
+        return self._json_block(b"END!", totals)
+
+    def _json_block(self, tag: bytes, value: Dict[str, Any]) -> bytes:
+        return self._block(tag, CODEC_RAW, json.dumps(value).encode("utf-8"))
+
+    def _rows_block(self, tag: bytes, rows: List[Dict[str, Any]]) -> bytes:
+        payload = b"".join(bson.encode(row) for row in rows)
+        return self._block(tag, CODEC_ZLIB, zlib.compress(payload, 6))
+
+    def _block(self, tag: bytes, codec: int, payload: bytes) -> bytes:
+        padding = b"\0" * _padding(self.offset)
+        header = BLOCK_HEADER.pack(tag, codec, zlib.crc32(payload), len(payload))
+        self.offset += len(padding) + len(header) + len(payload)
+        return padding + header + payload
+
+class SnapshotReader:
+    """
+    Read a snapshot file block by block.
+
+    Row groups are decoded into lists of dicts; vector blocks are returned as
+    read-only np.memmap views, so vectors are paged in as they are used.
+    """
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        self.verify = verify
+        self._file = open(path, "rb")
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise SnapshotError(f"{path} is not a corpus snapshot")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def blocks(self) -> Iterator[Tuple[str, Any]]:
+        """Yield (tag, value) for every block, ending with "END!"."""
+        offset = len(MAGIC)
+        while True:
+            offset += _padding(offset)
+            self._file.seek(offset)
+            header = self._file.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                raise SnapshotError("Snapshot is truncated (no end marker)")
+
+            tag, codec, crc, length = BLOCK_HEADER.unpack(header)
+            tag = tag.decode("ascii", "replace")
+            payload_offset = offset + BLOCK_HEADER.size
+            offset = payload_offset + length
+
+            if tag == "VECS":
+                yield tag, self._vectors(payload_offset, length, crc)
+                continue
+
+            payload = self._file.read(length)
+            if len(payload) < length:
+                raise SnapshotError(f"Snapshot is truncated inside a {tag} block")
+            self._check(tag, payload, crc)
+            if codec == CODEC_ZLIB:
+                payload = zlib.decompress(payload)
+
+            if tag in ("META", "END!"):
+                value = json.loads(payload.decode("utf-8"))
+                if tag == "META" and value.get("format_version") != FORMAT_VERSION:
+                    raise SnapshotError(f"Unsupported snapshot version: {value.get('format_version')}")
+                yield tag, value
+                if tag == "END!":
+                    return
+            elif tag in ("DOCS", "CHNK"):
+                yield tag, bson.decode_all(payload)
+            else:
+                raise SnapshotError(f"Unknown snapshot block: {tag}")
+
+    def _vectors(self, offset: int, length: int, crc: int) -> np.ndarray:
+        self._file.seek(offset)
+        code, rows, dimensions = VECTOR_HEADER.unpack(self._file.read(VECTOR_HEADER.size))
+        code = code.rstrip(b"\0").decode("ascii", "replace")
+        if code not in ("f4", "f2"):
+            raise SnapshotError(f"Unsupported vector dtype in snapshot: {code}")
+        dtype = np.dtype("<" + code)
+        if VECTOR_HEADER.size + rows * dimensions * dtype.itemsize != length:
+            raise SnapshotError("Vector block size does not match its shape")
+        if rows == 0:
+            return np.empty((0, dimensions), dtype=dtype)
+
+        try:
+            matrix = np.memmap(
+                self.path, dtype=dtype, mode="r",
+                offset=offset + VECTOR_HEADER.size, shape=(rows, dimensions)
+            )
+        except ValueError:
+            raise SnapshotError("Snapshot is truncated inside a VECS block")
+        if self.verify:
+            checksum = zlib.crc32(VECTOR_HEADER.pack(code.encode("ascii"), rows, dimensions))
+            checksum = zlib.crc32(memoryview(matrix).cast("B"), checksum)
+            self._check("VECS", None, crc, checksum)
+        return matrix
+
+    def _check(self, tag: str, payload: Any, crc: int, checksum: Optional[int] = None):
+        if not self.verify:
+            return
+        if checksum is None:
+            checksum = zlib.crc32(payload)
+        if checksum != crc:
+            raise SnapshotError(f"Checksum mismatch in {tag} block")
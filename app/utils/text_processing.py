@@ -3,8 +3,9 @@ from typing import List
 
 def clean_text(text: str) -> str:
     """Clean and normalize text."""
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    # Remove extra whitespace, keeping line breaks so paragraphs survive
+    text = re.sub(r'[^\S\n]+', ' ', text)
+    text = re.sub(r' ?\n ?', '\n', text).strip()
     
     # Handle common Unicode characters
     text = text.replace('\u2019', "'")  # Right single quotation mark
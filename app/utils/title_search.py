@@ -0,0 +1,81 @@
+import re
+import unicodedata
+from typing import Any, Dict, List
+
+# Fields maintained on every document so title searches are multikey index lookups
+TITLE_SEARCH_FIELDS = ["title_tokens", "title_prefixes", "title_trigrams"]
+
+# Longer query tokens are matched on this prefix, which still narrows results well
+MAX_PREFIX_LENGTH = 16
+
+# Minimum share of the query's trigrams a title must contain to match fuzzily
+FUZZY_THRESHOLD = 0.4
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase, strip accents and split into word tokens."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(text.lower())
+
+def trigrams(tokens: List[str]) -> List[str]:
+    """Padded character trigrams of each token, so short tokens and word edges count."""
+    grams = set()
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return sorted(grams)
+
+def title_search_fields(title: str) -> Dict[str, List[str]]:
+    """Compute the indexed search fields for a title."""
+    tokens = normalize_tokens(title)
+    prefixes = {token[:length] for token in tokens for length in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1)}
+    return {
+        "title_tokens": sorted(set(tokens)),
+        "title_prefixes": sorted(prefixes),
+        "title_trigrams": trigrams(tokens)
+    }
+
+def title_filter(query: str, mode: str = "prefix") -> Dict[str, Any]:
+    """
+    Build an indexed filter for a title search.
+
+    "prefix" matches titles where every query word starts a title word,
+    "token" requires every query word as a whole word, and "fuzzy" matches
+    titles sharing any trigram (to be narrowed and ranked with relevance_stages).
+
+    Raises:
+        ValueError: If the query has no searchable characters
+    """
+    tokens = normalize_tokens(query)
+    if not tokens:
+        raise ValueError("Title search needs at least one letter or digit")
+
+    if mode == "token":
+        return {"title_tokens": {"$all": sorted(set(tokens))}}
+    if mode == "fuzzy":
+        return {"title_trigrams": {"$in": trigrams(tokens)}}
+    return {"title_prefixes": {"$all": sorted({token[:MAX_PREFIX_LENGTH] for token in tokens})}}
+
+def relevance_stages(query: str, mode: str = "prefix") -> List[Dict[str, Any]]:
+    """
+    Aggregation stages scoring matches by trigram similarity to the query.
+
+    The score is the Jaccard similarity of query and title trigrams, so close
+    and shorter titles rank first. Fuzzy matches below FUZZY_THRESHOLD of the
+    query's trigrams are dropped.
+    """
+    query_grams = trigrams(normalize_tokens(query))
+    shared = {"$size": {"$setIntersection": [{"$ifNull": ["$title_trigrams", []]}, query_grams]}}
+    stages = [{"$addFields": {
+        "_shared": shared,
+        "score": {"$divide": [
+            shared,
+            {"$max": [1, {"$size": {"$setUnion": [{"$ifNull": ["$title_trigrams", []]}, query_grams]}}]}
+        ]}
+    }}]
+    if mode == "fuzzy":
+        stages.append({"$match": {"_shared": {"$gte": FUZZY_THRESHOLD * len(query_grams)}}})
+    stages.append({"$project": {"_shared": 0}})
+    return stages
@@ -0,0 +1,70 @@
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, Any]:
+    """Summarize latencies (in seconds) as milliseconds."""
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3)
+    }
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 2)
+    return round(peak / 1024, 2)
+
+def git_revision() -> Optional[str]:
+    """Current git commit, so results can be compared across commits."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def build_report(name: str, config: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap benchmark results with the metadata needed to compare runs."""
+    return {
+        "benchmark": name,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_commit": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results
+    }
+
+def write_report(report: Dict[str, Any], path: Optional[str]):
+    """Print a report and optionally write it as JSON."""
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
@@ -0,0 +1,74 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+
+Exits with status 1 when --fail-on-regression is given and any metric
+regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (dotted.path, value) for every numeric leaf."""
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, path + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+def direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None if not a performance metric."""
+    name = metric.rsplit(".", 1)[-1]
+    if name.endswith("per_second") or name.startswith("recall"):
+        return 1
+    if name.endswith("_ms") or name.endswith("_mb") or name == "error_rate":
+        return -1
+    return None
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float):
+    """
+    Compare the results sections of two reports.
+
+    Returns:
+        Rows of (metric, baseline, candidate, relative change, regressed)
+    """
+    base_values = dict(flatten(baseline["results"]))
+    rows = []
+    for metric, new in flatten(candidate["results"]):
+        sign = direction(metric)
+        old = base_values.get(metric)
+        if sign is None or old is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        regressed = change * sign < -threshold
+        rows.append((metric, old, new, change, regressed))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline.get('git_commit')} vs candidate {candidate.get('git_commit')}")
+    rows = compare(baseline, candidate, args.threshold)
+    for metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:45} {old:>12.3f} {new:>12.3f} {change:>+8.1%}{flag}")
+
+    if args.fail_on_regression and any(row[4] for row in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Synthetic corpora for the benchmarks."""
+import random
+import string
+from typing import Any, Dict, List
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+def make_document(index: int, size: int, vocabulary: List[str], rng: random.Random) -> Dict[str, Any]:
+    """Build a document of roughly size characters split into paragraphs."""
+    # Each document leans on its own topic words so searches have a clear best match
+    topic = rng.sample(vocabulary, 20)
+    paragraphs = []
+    length = 0
+    while length < size:
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = [rng.choice(topic) if rng.random() < 0.4 else rng.choice(vocabulary)
+                     for _ in range(rng.randint(8, 20))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+
+    return {
+        "title": f"Synthetic document {index}",
+        "content": "\n\n".join(paragraphs),
+        "metadata": {"source": "benchmark", "topic": topic[0]}
+    }
+
+def make_corpus(documents: int, document_size: int, vocabulary_size: int = 5000,
+                seed: int = 42) -> List[Dict[str, Any]]:
+    """Build a deterministic synthetic corpus."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    return [make_document(i, document_size, vocabulary, rng) for i in range(documents)]
+
+def make_queries(corpus: List[Dict[str, Any]], count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    Build queries from word spans of corpus documents.
+
+    Returns:
+        Dictionaries with the query text and the index of the source document
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        source = rng.randrange(len(corpus))
+        words = corpus[source]["content"].split()
+        start = rng.randrange(max(1, len(words) - 12))
+        queries.append({"query": " ".join(words[start:start + 12]), "source": source})
+    return queries
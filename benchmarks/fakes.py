@@ -0,0 +1,147 @@
+"""Local stand-ins for OpenRouter, MongoDB and ChromaDB used by the benchmarks."""
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional
+import uvicorn
+from fastapi import FastAPI, Request
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def hash_embedding(text: str, dimensions: int) -> List[float]:
+    """
+    Deterministic bag-of-words embedding using feature hashing.
+
+    Texts sharing words get similar vectors, so searches over a synthetic
+    corpus return meaningful neighbours without calling a real model.
+    """
+    vector = [0.0] * dimensions
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[index] += sign
+
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return [value / norm for value in vector]
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def create_fake_openrouter(latency_ms: float = 0.0, jitter_ms: float = 0.0, dimensions: int = 1536) -> FastAPI:
+    """Build an app implementing the OpenRouter endpoints used by the service."""
+    app = FastAPI()
+
+    async def simulate_latency():
+        delay = latency_ms + (random.uniform(0, jitter_ms) if jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+
+    @app.post("/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await simulate_latency()
+        tokens = sum(estimate_tokens(text) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": hash_embedding(text, dimensions)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await simulate_latency()
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in body["messages"])
+        content = f"Synthetic answer to: {body['messages'][-1]['content'][:200]}"
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": f"gen-{uuid.uuid4().hex}",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    return app
+
+@contextmanager
+def fake_openrouter_server(latency_ms: float = 0.0, jitter_ms: float = 0.0, dimensions: int = 1536):
+    """Serve the fake OpenRouter API on a free local port in a background thread."""
+    app = create_fake_openrouter(latency_ms, jitter_ms, dimensions)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("Fake OpenRouter server did not start")
+        time.sleep(0.01)
+
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+def connect_local_mongo(mongo_url: Optional[str]):
+    """
+    Point the app's database handle at a local MongoDB.
+
+    Without a URL an in-memory mongomock-motor client is used; with one, a
+    throwaway database is created on that server.
+
+    Returns:
+        A callable that drops the throwaway database
+    """
+    from app.core.database import db
+
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        db.client = AsyncIOMotorClient(mongo_url)
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise RuntimeError("Install mongomock-motor or pass --mongo-url to run the benchmarks")
+        db.client = AsyncMongoMockClient()
+
+    db_name = f"rag_bench_{uuid.uuid4().hex[:8]}"
+    db.db = db.client[db_name]
+
+    async def cleanup():
+        await db.client.drop_database(db_name)
+
+    return cleanup
+
+def connect_ephemeral_chroma():
+    """Point the app's Chroma handle at a fresh in-memory collection."""
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+    from app.core.chroma_client import chroma
+
+    chroma.client = chromadb.EphemeralClient(settings=ChromaSettings(anonymized_telemetry=False))
+    chroma.collection = chroma.client.get_or_create_collection(
+        name=f"bench_{uuid.uuid4().hex[:8]}",
+        metadata={"hnsw:space": "cosine"}
+    )
+    return chroma.collection
@@ -0,0 +1,207 @@
+"""
+Replay recorded API traffic against the app and report per-endpoint latency.
+
+The input is NDJSON with one request per line:
+
+    {"method": "POST", "path": "/api/v1/search/", "body": {"query": "...", "top_k": 5}}
+
+Requests are sent in-process through the ASGI transport (default), or over
+HTTP with --base-url. Load is either closed-loop (--concurrency workers) or
+open-loop (--rate arrivals per second, Poisson distributed); in open-loop
+mode latency is measured from the scheduled send time so queueing delay is
+not hidden.
+
+    python -m benchmarks.loadgen traffic.ndjson --rate 50 --offline --output bench_results/load.json
+    python -m benchmarks.loadgen traffic.ndjson --baseline bench_results/load.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.common import build_report, summarize_latencies, write_report
+from benchmarks.compare import compare
+
+OBJECT_ID_SEGMENT = re.compile(r"/[0-9a-f]{24}(?=/|$)")
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    """Read replayable requests, skipping lines without a method and path."""
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "method" in entry and "path" in entry:
+                requests.append(entry)
+    return requests
+
+def endpoint_name(method: str, path: str) -> str:
+    """Group requests by method and path with ObjectIds and query strings removed."""
+    path = OBJECT_ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+    return f"{method.upper()} {path}"
+
+class Recorder:
+    """Collect latency and status per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint: str, latency: float, status: str, error: bool):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] += 1
+        if error:
+            self.errors[endpoint] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        endpoints = {}
+        all_latencies = []
+        total_errors = 0
+        for endpoint, latencies in sorted(self.latencies.items()):
+            errors = self.errors[endpoint]
+            endpoints[endpoint] = {
+                "latency": summarize_latencies(latencies),
+                "errors": errors,
+                "error_rate": round(errors / len(latencies), 4),
+                "statuses": dict(self.statuses[endpoint])
+            }
+            all_latencies.extend(latencies)
+            total_errors += errors
+
+        return {
+            "overall": {
+                "latency": summarize_latencies(all_latencies),
+                "errors": total_errors,
+                "error_rate": round(total_errors / len(all_latencies), 4) if all_latencies else 0.0
+            },
+            "endpoints": endpoints
+        }
+
+async def send(client: httpx.AsyncClient, request: Dict[str, Any], recorder: Recorder, started: float):
+    endpoint = endpoint_name(request["method"], request["path"])
+    try:
+        response = await client.request(
+            request["method"],
+            request["path"],
+            json=request.get("body"),
+            headers=request.get("headers")
+        )
+        status = str(response.status_code)
+        error = response.status_code >= 400
+    except Exception as e:
+        status = type(e).__name__
+        error = True
+    recorder.record(endpoint, time.perf_counter() - started, status, error)
+
+async def closed_loop(client, requests, concurrency: int, recorder: Recorder):
+    queue = iter(requests)
+
+    async def worker():
+        for request in queue:
+            await send(client, request, recorder, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def open_loop(client, requests, rate: float, recorder: Recorder, seed: int):
+    rng = random.Random(seed)
+    tasks = []
+    scheduled = time.perf_counter()
+    for request in requests:
+        scheduled += rng.expovariate(rate)
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Latency counts from the intended send time, not from when we got around to it
+        tasks.append(asyncio.ensure_future(send(client, request, recorder, scheduled)))
+    await asyncio.gather(*tasks)
+
+async def run(args) -> Dict[str, Any]:
+    requests = load_requests(args.traffic) * args.repeat
+    if not requests:
+        raise SystemExit(f"No replayable requests (method/path) found in {args.traffic}")
+
+    recorder = Recorder()
+    timeout = httpx.Timeout(args.timeout)
+
+    async with AsyncExitStack() as stack:
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=timeout)
+        else:
+            from main import app
+
+            if args.offline:
+                from app.core.config import settings
+                from benchmarks.fakes import connect_ephemeral_chroma, connect_local_mongo, fake_openrouter_server
+
+                settings.OPENROUTER_API_URL = stack.enter_context(fake_openrouter_server(args.latency_ms))
+                settings.OPENROUTER_API_KEY = "loadgen"
+                stack.push_async_callback(connect_local_mongo(args.mongo_url))
+                connect_ephemeral_chroma()
+            else:
+                await stack.enter_async_context(app.router.lifespan_context(app))
+
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app),
+                base_url="http://loadgen",
+                timeout=timeout
+            )
+        await stack.enter_async_context(client)
+
+        started = time.perf_counter()
+        if args.rate:
+            await open_loop(client, requests, args.rate, recorder, args.seed)
+        else:
+            await closed_loop(client, requests, args.concurrency, recorder)
+        elapsed = time.perf_counter() - started
+
+    results = recorder.summary()
+    results["overall"]["requests"] = len(requests)
+    results["overall"]["seconds"] = round(elapsed, 3)
+    results["overall"]["requests_per_second"] = round(len(requests) / elapsed, 2)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traffic", help="NDJSON file of recorded requests")
+    parser.add_argument("--base-url", default=None, help="Send over HTTP to this server instead of in-process")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop workers")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open-loop arrivals per second (overrides --concurrency)")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the traffic this many times")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--offline", action="store_true", help="In-process only: use the benchmark stand-ins")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake OpenRouter latency with --offline")
+    parser.add_argument("--mongo-url", default=None, help="Local MongoDB for --offline (default: mongomock)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    parser.add_argument("--baseline", default=None, help="Compare against an earlier loadgen result")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "mongo_url")}
+    report = build_report("loadgen", config, results)
+    write_report(report, args.output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = [row for row in compare(baseline, report, args.threshold) if row[4]]
+        for metric, old, new, change, _ in regressions:
+            print(f"REGRESSION {metric}: {old:.3f} -> {new:.3f} ({change:+.1%})", file=sys.stderr)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
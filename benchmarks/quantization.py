@@ -0,0 +1,125 @@
+"""
+Recall@k vs. memory for compact embedding storage.
+
+For each index size (--dimensions) and rescoring mode (--rescore), search a
+corpus of embeddings exactly with the truncated index vectors, optionally
+rescore the top candidates with the quantized full-size vectors, and compare
+against exact full-precision search. Memory is the raw vector payload, so
+index overhead (HNSW links) comes on top.
+
+Embeddings are read from a .npy matrix or a corpus snapshot, or generated
+synthetically with energy concentrated in the leading dimensions, like
+Matryoshka-trained models.
+
+    python -m benchmarks.quantization --snapshot corpus.snap --dimensions 1536 512 256 --rescore none int8
+"""
+import argparse
+import time
+from typing import Any, Dict
+import numpy as np
+
+from app.utils.quantization import dequantize, quantize, truncate_embeddings
+from benchmarks.common import build_report, write_report
+
+def synthetic_embeddings(count: int, dimensions: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    spectrum = 1.0 / np.sqrt(np.arange(1, dimensions + 1))
+    return truncate_embeddings(rng.standard_normal((count, dimensions)) * spectrum)
+
+def load_embeddings(args) -> np.ndarray:
+    if args.embeddings:
+        return truncate_embeddings(np.load(args.embeddings))
+    if args.snapshot:
+        from app.utils.snapshot import SnapshotReader
+
+        with SnapshotReader(args.snapshot) as reader:
+            blocks = [np.array(value) for tag, value in reader.blocks() if tag == "VECS" and len(value)]
+        matrix = np.concatenate(blocks)
+        return truncate_embeddings(matrix[~np.isnan(matrix[:, 0])])
+    return synthetic_embeddings(args.corpus, args.full_dimensions, args.seed)
+
+def make_queries(corpus: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    """Queries are perturbed corpus vectors, so each has a meaningful neighbourhood."""
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(0, len(corpus), count)]
+    return truncate_embeddings(picks + rng.standard_normal(picks.shape) * noise / np.sqrt(corpus.shape[1]))
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[1])
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+def recall(found: np.ndarray, expected: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(truth)) for row, truth in zip(found, expected))
+    return hits / expected.size
+
+def evaluate(corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray, dimensions: int,
+             rescore: str, k: int, factor: int) -> Dict[str, Any]:
+    index = truncate_embeddings(corpus, dimensions)
+    index_queries = truncate_embeddings(queries, dimensions)
+    started = time.perf_counter()
+
+    if rescore == "none":
+        found = top_k(index_queries @ index.T, k)
+        rescore_bytes = 0
+    else:
+        stored = [quantize(vector, rescore) for vector in corpus]
+        full = np.stack([dequantize(data) for data in stored])
+        candidates = top_k(index_queries @ index.T, k * factor)
+        rescored = np.einsum("qd,qcd->qc", queries, full[candidates])
+        found = np.take_along_axis(candidates, top_k(rescored, k), axis=1)
+        rescore_bytes = sum(len(data) for data in stored)
+
+    elapsed = time.perf_counter() - started
+    index_bytes = index.shape[0] * index.shape[1] * 4
+    return {
+        "dimensions": index.shape[1],
+        "rescore": rescore,
+        f"recall_at_{k}": round(recall(found, truth), 4),
+        "index_mb": round(index_bytes / (1024 * 1024), 3),
+        "rescore_store_mb": round(rescore_bytes / (1024 * 1024), 3),
+        "query_ms": round(elapsed * 1000 / len(queries), 4)
+    }
+
+def run(args) -> Dict[str, Any]:
+    corpus = load_embeddings(args)
+    queries = make_queries(corpus, args.queries, args.noise, args.seed + 1)
+    truth = top_k(queries @ corpus.T, args.top_k)
+
+    results: Dict[str, Any] = {"corpus": {"vectors": len(corpus), "dimensions": corpus.shape[1]}}
+    for dimensions in args.dimensions:
+        for rescore in args.rescore:
+            row = evaluate(corpus, queries, truth, dimensions, rescore, args.top_k, args.candidate_factor)
+            results[f"d{row['dimensions']}_{rescore}"] = row
+            print(
+                f"dims={row['dimensions']:>5} rescore={rescore:>7} "
+                f"recall@{args.top_k}={row[f'recall_at_{args.top_k}']:.4f} "
+                f"index={row['index_mb']:.2f}MB rescore_store={row['rescore_store_mb']:.2f}MB"
+            )
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", default=None, help="Corpus embeddings as a .npy matrix")
+    parser.add_argument("--snapshot", default=None, help="Read corpus embeddings from a corpus snapshot")
+    parser.add_argument("--corpus", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--full-dimensions", type=int, default=1536, help="Synthetic embedding size")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.5, help="Query perturbation relative to a corpus vector")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[0, 768, 512, 256],
+                        help="Index sizes to evaluate (0 is full size)")
+    parser.add_argument("--rescore", nargs="+", default=["none", "float16", "int8"],
+                        choices=["none", "float32", "float16", "int8"])
+    parser.add_argument("--candidate-factor", type=int, default=4, help="Candidates rescored per result")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    write_report(build_report("quantization", config, results), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Offline benchmark for ingestion, search and generation.
+
+Runs DocumentService, RetrievalService and GenerationService against a fake
+OpenRouter server, a local or in-memory MongoDB and an ephemeral Chroma
+collection, and reports throughput, latency percentiles and peak memory.
+
+    python -m benchmarks.run_benchmark --documents 200 --queries 500 --output bench/results.json
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.common import build_report, peak_rss_mb, summarize_latencies, write_report
+from benchmarks.corpus import make_corpus, make_queries
+from benchmarks.fakes import connect_ephemeral_chroma, connect_local_mongo, fake_openrouter_server
+
+async def run_concurrently(items: List[Any], concurrency: int,
+                           fn: Callable[[Any], Awaitable[Any]]) -> List[float]:
+    """Run fn over items with bounded concurrency and return per-item latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def run_one(item):
+        async with semaphore:
+            started = time.perf_counter()
+            await fn(item)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(run_one(item) for item in items))
+    return latencies
+
+async def benchmark_ingest(corpus: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    from app.core.database import db
+    from app.schemas.document import DocumentCreate
+    from app.services.document_service import DocumentService
+
+    async def ingest(document):
+        await DocumentService().create_document(DocumentCreate(**document))
+
+    started = time.perf_counter()
+    latencies = await run_concurrently(corpus, concurrency, ingest)
+    elapsed = time.perf_counter() - started
+    chunks = await db.db.document_chunks.count_documents({})
+
+    return {
+        "documents": len(corpus),
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(len(corpus) / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 2),
+        "latency": summarize_latencies(latencies)
+    }
+
+async def benchmark_search(queries: List[Dict[str, Any]], top_k: int, concurrency: int) -> Dict[str, Any]:
+    from app.services.retrieval_service import RetrievalService
+
+    async def search(query):
+        await RetrievalService().search(query["query"], top_k=top_k)
+
+    started = time.perf_counter()
+    latencies = await run_concurrently(queries, concurrency, search)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        "queries_per_second": round(len(queries) / elapsed, 2),
+        "latency": summarize_latencies(latencies)
+    }
+
+async def benchmark_generation(queries: List[Dict[str, Any]], top_k: int, concurrency: int) -> Dict[str, Any]:
+    from app.services.generation_service import GenerationService
+
+    async def generate(query):
+        await GenerationService().generate_response(
+            session_id=None,
+            user_message=query["query"],
+            retrieval_options={"top_k": top_k}
+        )
+
+    started = time.perf_counter()
+    latencies = await run_concurrently(queries, concurrency, generate)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(queries),
+        "requests_per_second": round(len(queries) / elapsed, 2),
+        "latency": summarize_latencies(latencies)
+    }
+
+async def run(args) -> Dict[str, Any]:
+    from app.core.config import settings
+    from app.core.rate_limiter import openrouter_limiter
+
+    corpus = make_corpus(args.documents, args.document_size, seed=args.seed)
+    queries = make_queries(corpus, args.queries, seed=args.seed + 1)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    with fake_openrouter_server(args.latency_ms, args.jitter_ms, args.dimensions) as url:
+        settings.OPENROUTER_API_URL = url
+        settings.OPENROUTER_API_KEY = "benchmark"
+        # The fake server never throttles, so only apply a client-side rate if asked to
+        openrouter_limiter.rate = args.rate_limit
+        if args.embedding_model_path:
+            # Embed with a real local model; completions still go to the fake server
+            settings.EMBEDDING_PROVIDER = "local"
+            settings.EMBEDDING_LOCAL_MODEL_PATH = args.embedding_model_path
+            settings.EMBEDDING_LOCAL_BACKEND = args.embedding_backend
+
+        cleanup_mongo = connect_local_mongo(args.mongo_url)
+        connect_ephemeral_chroma()
+        try:
+            results = {"ingest": await benchmark_ingest(corpus, args.concurrency)}
+            results["search"] = await benchmark_search(queries, args.top_k, args.concurrency)
+            if args.chat_requests:
+                results["generation"] = await benchmark_generation(
+                    queries[:args.chat_requests], args.top_k, args.concurrency
+                )
+        finally:
+            await cleanup_mongo()
+
+    results["memory"] = {"peak_rss_mb": peak_rss_mb()}
+    if args.tracemalloc:
+        results["memory"]["peak_python_heap_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100, help="Number of synthetic documents")
+    parser.add_argument("--document-size", type=int, default=5000, help="Approximate characters per document")
+    parser.add_argument("--queries", type=int, default=200, help="Number of search queries")
+    parser.add_argument("--chat-requests", type=int, default=50, help="Number of generation requests (0 to skip)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake OpenRouter base latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Fake OpenRouter random extra latency")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding dimensions")
+    parser.add_argument("--embedding-model-path", default=None,
+                        help="Embed with a local sentence-transformers model instead of the fake server")
+    parser.add_argument("--embedding-backend", default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Client-side requests/s (0 for unlimited)")
+    parser.add_argument("--mongo-url", default=None, help="Local MongoDB URL (default: in-memory mongomock)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the peak Python heap (slower)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "mongo_url")}
+    config["mongo"] = "external" if args.mongo_url else "mongomock"
+    write_report(build_report("rag", config, results), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Latency vs. recall of two-stage (coarse-to-fine) retrieval.
+
+Each query is run one at a time, as in RetrievalService.search: a baseline
+search over the full-size vectors, and for each candidate factor a search of
+the truncated index for top_k * factor candidates whose stored full-size
+vectors are then decoded and re-ranked with the production rescoring code.
+Recall is measured against exact full-precision search.
+
+The index is searched exactly by default; --index hnsw uses hnswlib (the
+library behind Chroma's index, installed with chromadb) for realistic
+approximate-search latency.
+
+    python -m benchmarks.two_stage --dimensions 256 --factors 1 2 4 8 16 --rescore float32
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+import numpy as np
+
+from app.utils.quantization import cosine_similarities, dequantize, quantize, truncate_embeddings
+from benchmarks.common import build_report, summarize_latencies, write_report
+from benchmarks.quantization import load_embeddings, make_queries, recall, top_k
+
+def build_index(vectors: np.ndarray, kind: str, ef: int) -> Callable[[np.ndarray, int], np.ndarray]:
+    """Return a function finding the ids of the n most similar vectors to a query."""
+    if kind == "hnsw":
+        import hnswlib
+
+        index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+        index.init_index(max_elements=len(vectors), ef_construction=200, M=16)
+        index.add_items(vectors, np.arange(len(vectors)))
+
+        def search(query: np.ndarray, n: int) -> np.ndarray:
+            index.set_ef(max(ef, n))
+            return index.knn_query(query, k=n)[0][0]
+        return search
+
+    def search(query: np.ndarray, n: int) -> np.ndarray:
+        return top_k((vectors @ query)[None, :], n)[0]
+    return search
+
+def measure(queries: np.ndarray, run_query: Callable[[int], List[int]]) -> Dict[str, Any]:
+    latencies, found = [], []
+    for i in range(len(queries)):
+        started = time.perf_counter()
+        found.append(run_query(i))
+        latencies.append(time.perf_counter() - started)
+    return {"found": np.array(found), "latency": summarize_latencies(latencies)}
+
+def run(args) -> Dict[str, Any]:
+    corpus = load_embeddings(args)
+    queries = make_queries(corpus, args.queries, args.noise, args.seed + 1)
+    truth = top_k(queries @ corpus.T, args.top_k)
+    k = args.top_k
+
+    results: Dict[str, Any] = {"corpus": {"vectors": len(corpus), "dimensions": corpus.shape[1]}}
+
+    full_search = build_index(corpus, args.index, args.ef)
+    baseline = measure(queries, lambda i: full_search(queries[i], k))
+    results["baseline"] = {f"recall_at_{k}": round(recall(baseline["found"], truth), 4), **baseline["latency"]}
+    print(f"baseline dims={corpus.shape[1]} recall@{k}={results['baseline'][f'recall_at_{k}']:.4f} "
+          f"p50={baseline['latency']['p50_ms']:.3f}ms")
+
+    stored = [quantize(vector, args.rescore) for vector in corpus]
+    for dimensions in args.dimensions:
+        index_vectors = truncate_embeddings(corpus, dimensions)
+        index_queries = truncate_embeddings(queries, dimensions)
+        coarse_search = build_index(index_vectors, args.index, args.ef)
+
+        for factor in args.factors:
+            def two_stage(i: int) -> List[int]:
+                candidates = coarse_search(index_queries[i], min(k * factor, len(corpus)))
+                scores = cosine_similarities(queries[i], [dequantize(stored[c]) for c in candidates])
+                order = np.argsort([-score for score in scores])[:k]
+                return [int(candidates[j]) for j in order]
+
+            row = measure(queries, two_stage)
+            results[f"d{index_vectors.shape[1]}_x{factor}"] = {
+                "dimensions": index_vectors.shape[1],
+                "candidate_factor": factor,
+                f"recall_at_{k}": round(recall(row["found"], truth), 4),
+                **row["latency"]
+            }
+            print(f"dims={index_vectors.shape[1]:>5} factor={factor:>3} "
+                  f"recall@{k}={recall(row['found'], truth):.4f} p50={row['latency']['p50_ms']:.3f}ms "
+                  f"p95={row['latency']['p95_ms']:.3f}ms")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", default=None, help="Corpus embeddings as a .npy matrix")
+    parser.add_argument("--snapshot", default=None, help="Read corpus embeddings from a corpus snapshot")
+    parser.add_argument("--corpus", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--full-dimensions", type=int, default=1536, help="Synthetic embedding size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5, help="Query perturbation relative to a corpus vector")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[256], help="Coarse index sizes")
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="Candidate factors (candidates re-ranked per result)")
+    parser.add_argument("--rescore", default="float32", choices=["float32", "float16", "int8"])
+    parser.add_argument("--index", default="exact", choices=["exact", "hnsw"])
+    parser.add_argument("--ef", type=int, default=100, help="HNSW search breadth (raised to the candidate count)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    write_report(build_report("two_stage", config, results), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,69 @@
+# Imported first so the recorded startup time covers the imports below
+from app.core.readiness import IMPORT_STARTED, readiness, timed_startup
+import logging
+import time
 import uvicorn
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.core.config import settings
+from app.core.responses import ORJSONResponse
+from app.core.metrics import MetricsMiddleware
 from app.api.routes.api import router as api_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.routes.health import router as health_router
+from app.api.errors import request_shed_handler, token_budget_exceeded_handler
+from app.core.admission import RequestShed
+from app.core.usage import TokenBudgetExceeded
 from app.core.database import connect_to_mongodb, close_mongodb_connection
 from app.core.chroma_client import initialize_chroma, close_chroma_connection
+from app.core.active_collection import collection_watcher
+from app.core.jobs import jobs
+from app.core.process_pool import text_pool
+
+def add_compression_middleware(application: FastAPI):
+    """Add gzip or brotli response compression according to settings."""
+    if settings.RESPONSE_COMPRESSION == "brotli":
+        try:
+            from brotli_asgi import BrotliMiddleware
+        except ImportError:
+            logging.warning("brotli-asgi is not installed, falling back to gzip compression")
+        else:
+            application.add_middleware(
+                BrotliMiddleware,
+                minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+                gzip_fallback=True
+            )
+            return
+    
+    if settings.RESPONSE_COMPRESSION in ("gzip", "brotli"):
+        application.add_middleware(GZipMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+def add_profiling_middleware(application: FastAPI):
+    """Install the on-demand profiling hook if it is enabled."""
+    if not settings.PROFILING_ENABLED:
+        return
+    
+    try:
+        from app.core.profiling import ProfilingMiddleware
+    except ImportError:
+        logging.warning("pyinstrument is not installed, request profiling is disabled")
+        return
+    
+    application.add_middleware(ProfilingMiddleware)
 
 def create_application() -> FastAPI:
     application = FastAPI(
         title=settings.PROJECT_NAME,
         description=settings.PROJECT_DESCRIPTION,
         version=settings.PROJECT_VERSION,
-        debug=settings.DEBUG
+        debug=settings.DEBUG,
+        default_response_class=ORJSONResponse
     )
     
+    # Compress large responses
+    add_compression_middleware(application)
+    
     # Set up CORS
     application.add_middleware(
         CORSMiddleware,
@@ -23,18 +73,40 @@ def create_application() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Record request latency and per-stage Server-Timing
+    application.add_middleware(MetricsMiddleware)
+    
+    # Profile requests on demand (not installed at all unless enabled)
+    add_profiling_middleware(application)
+    
     # Include API router
     application.include_router(api_router, prefix=settings.API_PREFIX)
+    application.include_router(metrics_router)
+    application.include_router(health_router)
+    
+    # Requests shed by admission control get 429/503 with Retry-After
+    application.add_exception_handler(RequestShed, request_shed_handler)
+    
+    # Generations for sessions over their token budget get 429
+    application.add_exception_handler(TokenBudgetExceeded, token_budget_exceeded_handler)
     
-    # Set up event handlers
-    application.add_event_handler("startup", connect_to_mongodb)
-    application.add_event_handler("startup", initialize_chroma)
+    # Set up event handlers (each startup phase is timed; readiness is checked last and
+    # creates the indexes, retrying in the background while MongoDB is unreachable)
+    application.add_event_handler("startup", timed_startup("mongodb", connect_to_mongodb))
+    application.add_event_handler("startup", timed_startup("chroma", initialize_chroma))
+    application.add_event_handler("startup", timed_startup("active_collection", collection_watcher.start))
+    application.add_event_handler("startup", readiness.start)
+    application.add_event_handler("shutdown", readiness.stop)
+    application.add_event_handler("shutdown", collection_watcher.stop)
+    application.add_event_handler("shutdown", jobs.shutdown)
+    application.add_event_handler("shutdown", text_pool.shutdown)
     application.add_event_handler("shutdown", close_mongodb_connection)
     application.add_event_handler("shutdown", close_chroma_connection)
     
     return application
 
 app = create_application()
+readiness.record_phase("import", time.perf_counter() - IMPORT_STARTED)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,11 @@
+import pytest
+from app.core.database import db
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """An in-memory MongoDB in place of the configured one."""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(db, "client", client)
+    monkeypatch.setattr(db, "db", client["test"])
+    return db.db
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.routes import chat
+from app.services.generation_service import GenerationService
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    async def generate_response(self, **kwargs):
+        calls.append(kwargs["retrieval_options"])
+        raise LookupError("not generating in tests")
+
+    monkeypatch.setattr(GenerationService, "generate_response", generate_response)
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/chat")
+    client = TestClient(app, raise_server_exceptions=False)
+    client.calls = calls
+    return client
+
+@pytest.mark.parametrize("options", [
+    {"namespaces": "team"},
+    {"candidate_factor": 1000},
+    {"neighbors": 50},
+    {"neighbors": "many"}
+])
+def test_out_of_range_retrieval_options_are_rejected(client, options):
+    response = client.post("/chat/generate", json={"message": "hi", "retrieval_options": options})
+    assert response.status_code == 422
+    assert client.calls == []
+
+def test_retrieval_namespaces_are_validated_like_search(client):
+    response = client.post("/chat/generate", json={"message": "hi", "retrieval_options": {"namespaces": ["Not Valid"]}})
+    assert response.status_code == 400
+    assert client.calls == []
+
+def test_valid_retrieval_options_reach_the_service(client):
+    client.post("/chat/generate", json={
+        "message": "hi", "retrieval_options": {"namespaces": ["team"], "neighbors": 2, "enabled": False}
+    })
+    assert client.calls[0]["namespaces"] == ["team"]
+    assert client.calls[0]["neighbors"] == 2
+    assert client.calls[0]["enabled"] is False
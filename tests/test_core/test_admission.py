@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from app.core.admission import (
+    AdmissionLimiter, RequestShed, LATENCY_SAMPLE_CAP, remaining_budget, shared_call
+)
+from app.utils.singleflight import SingleFlight
+
+async def hold(limiter: AdmissionLimiter, seconds: float, timeout=None):
+    async with limiter.admit(timeout):
+        await asyncio.sleep(seconds)
+
+@pytest.mark.asyncio
+async def test_admits_up_to_limit_then_queues_in_order():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=2, deadline=5.0)
+    order = []
+
+    async def request(name):
+        async with limiter.admit():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(request("a"), request("b"), request("c"))
+    assert order == ["a", "b", "c"]
+    assert limiter.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_with_429():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=0, deadline=5.0)
+    running = asyncio.ensure_future(hold(limiter, 0.05))
+    await asyncio.sleep(0)
+
+    with pytest.raises(RequestShed) as exc:
+        async with limiter.admit():
+            pass
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after >= 1
+    await running
+
+@pytest.mark.asyncio
+async def test_deadline_is_visible_inside_the_block():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=0, deadline=5.0)
+    async with limiter.admit(timeout=2.0):
+        assert 0 < remaining_budget() <= 2.0
+    assert remaining_budget() is None
+
+@pytest.mark.asyncio
+async def test_busy_route_sheds_requests_its_deadline_cannot_cover():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=5, deadline=5.0)
+    limiter.latency = 1.0
+    running = asyncio.ensure_future(hold(limiter, 0.05))
+    await asyncio.sleep(0)
+
+    with pytest.raises(RequestShed) as exc:
+        async with limiter.admit(timeout=0.5):
+            pass
+    assert exc.value.status_code == 503
+    await running
+
+@pytest.mark.asyncio
+async def test_recovers_after_a_request_slower_than_the_deadline():
+    limiter = AdmissionLimiter("test", limit=1, max_queue=5, deadline=0.1)
+
+    # A single request overruns the deadline; its sample is capped below it
+    await hold(limiter, 0.2)
+    assert limiter.latency == pytest.approx(0.1 * LATENCY_SAMPLE_CAP)
+
+    # Even an inflated estimate does not shed an idle route: the next request probes it
+    limiter.latency = 10.0
+    await hold(limiter, 0.0)
+    assert limiter.latency < 10.0
+
+    for _ in range(20):
+        await hold(limiter, 0.0)
+    assert limiter.latency < 0.1
+    assert limiter.stats()["admitted"] == 22
+
+@pytest.mark.asyncio
+async def test_shared_call_runs_without_the_deadline_of_the_caller_that_started_it():
+    limiter = AdmissionLimiter("test", limit=4, max_queue=0, deadline=5.0)
+    flight = SingleFlight("test.deadline")
+    budgets = []
+
+    async def call():
+        budgets.append(remaining_budget())
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def request(timeout):
+        async with limiter.admit(timeout):
+            return await shared_call(flight, "key", call, "test_stage")
+
+    async def unlimited():
+        await asyncio.sleep(0)
+        return await shared_call(flight, "key", call, "test_stage")
+
+    # The impatient request started the call and gives up; the others still get the result
+    results = await asyncio.gather(request(0.01), request(2.0), unlimited(), return_exceptions=True)
+    assert isinstance(results[0], RequestShed) and results[0].status_code == 503
+    assert results[1:] == ["result", "result"]
+    assert budgets == [None]
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import pytest
+from datetime import datetime
+from app.core import blob_store
+from app.core.blob_store import load_body, release_body, store_body
+from app.core.config import settings
+
+BODY = "x" * 100
+
+@pytest.fixture
+def store(monkeypatch, tmp_path, mongo):
+    monkeypatch.setattr(settings, "CONTENT_STORE", "local")
+    monkeypatch.setattr(settings, "CONTENT_STORE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "CONTENT_INLINE_THRESHOLD", 10)
+    monkeypatch.setattr(blob_store, "_stores", {})
+    return blob_store.get_blob_store()
+
+def blob_exists(store, key):
+    return os.path.exists(store._path(key))
+
+@pytest.mark.asyncio
+async def test_small_bodies_stay_inline(store):
+    assert await store_body("short") is None
+
+@pytest.mark.asyncio
+async def test_body_is_deleted_with_its_last_reference(store, mongo):
+    first = await store_body(BODY)
+    second = await store_body(BODY)
+    assert first["key"] == second["key"]
+
+    await release_body(first)
+    assert blob_exists(store, first["key"])
+    await release_body(second)
+    assert not blob_exists(store, first["key"])
+    assert await mongo.blob_refs.count_documents({}) == 0
+
+@pytest.mark.asyncio
+async def test_body_stored_before_insert_survives_concurrent_release(store, mongo):
+    # Document A exists with the body
+    ref_a = await store_body(BODY)
+    await mongo.documents.insert_one({"_id": "a", "content_ref": ref_a})
+
+    # A create of identical content stores the body, but has not inserted its document yet
+    ref_b = await store_body(BODY)
+
+    # Meanwhile document A is deleted, releasing its reference
+    await mongo.documents.delete_one({"_id": "a"})
+    await release_body(ref_a)
+
+    await mongo.documents.insert_one({"_id": "b", "content_ref": ref_b})
+    assert await load_body(ref_b) == BODY
+
+@pytest.mark.asyncio
+async def test_new_reference_waits_for_deletion_in_progress(store, mongo):
+    ref = await store_body(BODY)
+    await mongo.blob_refs.update_one({"_id": ref["key"]}, {"$set": {"refs": 0, "deleting_at": datetime.utcnow()}})
+
+    pending = asyncio.ensure_future(store_body(BODY))
+    await asyncio.sleep(0.1)
+    assert not pending.done()
+
+    # The deletion finishes, then the waiting store writes the blob again
+    await store.delete(ref["key"])
+    await mongo.blob_refs.delete_one({"_id": ref["key"]})
+    assert await asyncio.wait_for(pending, 1) == ref
+    assert await load_body(ref) == BODY
+
+@pytest.mark.asyncio
+async def test_uncounted_references_keep_the_body(store, mongo):
+    # Bodies stored before references were counted have no blob_refs entry
+    ref = await store_body(BODY)
+    await mongo.blob_refs.delete_many({})
+    await mongo.documents.insert_one({"_id": "legacy", "content_ref": ref})
+
+    await release_body(ref)
+    assert blob_exists(store, ref["key"])
+    assert (await mongo.blob_refs.find_one({"_id": ref["key"]}))["refs"] == 1
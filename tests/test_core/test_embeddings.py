@@ -0,0 +1,89 @@
+import asyncio
+import gc
+import numpy as np
+import pytest
+from app.core import embeddings
+from app.core.active_collection import active
+from app.core.config import settings
+from app.core.embeddings import LocalEmbeddingProvider, UnsupportedEmbeddingModel
+from app.core.readiness import check_embedding_model
+
+class FakeModel:
+    """Stands in for a sentence-transformers model, recording the size of every forward pass."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, **kwargs):
+        self.batches.append(len(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+@pytest.fixture
+def provider():
+    provider = LocalEmbeddingProvider("local/test", "/unused", batch_size=8, threads=1)
+    provider._model = FakeModel()
+    return provider
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced_into_batches(provider):
+    responses = await asyncio.gather(*[provider.generate_embeddings([f"text {i}"]) for i in range(20)])
+
+    assert [response["data"][0]["embedding"] for response in responses] == [
+        [float(len(f"text {i}")), 1.0] for i in range(20)
+    ]
+    assert sum(provider._model.batches) == 20
+    assert len(provider._model.batches) < 20
+    assert max(provider._model.batches) <= 8
+
+@pytest.mark.asyncio
+async def test_batch_runners_are_held_until_done(provider):
+    request = asyncio.ensure_future(provider.generate_embeddings(["text"]))
+    await asyncio.sleep(0)
+    gc.collect()
+    assert len(provider._batch_tasks) == 1
+
+    assert (await request)["model"] == "local/test"
+    await asyncio.sleep(0)
+    assert not provider._batch_tasks
+
+@pytest.mark.asyncio
+async def test_other_models_are_rejected(provider):
+    provider.check_model("local/test")
+    provider.check_model(None)
+    with pytest.raises(UnsupportedEmbeddingModel):
+        await provider.generate_embeddings(["text"], model="openai/text-embedding-3-large")
+
+@pytest.mark.asyncio
+async def test_reindex_to_another_model_is_rejected_on_creation(mongo, monkeypatch, provider):
+    from app.services.reindex_service import ReindexService
+
+    monkeypatch.setattr(embeddings.settings, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(embeddings, "_local_provider", provider)
+    with pytest.raises(UnsupportedEmbeddingModel):
+        await ReindexService().create_job(embedding_model="openai/text-embedding-3-large")
+    assert await mongo.jobs.count_documents({}) == 0
+
+def test_local_provider_requires_its_own_model_name(monkeypatch):
+    monkeypatch.setattr(embeddings, "_local_provider", None)
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL_PATH", "/models/minilm")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL", "")
+    with pytest.raises(RuntimeError):
+        embeddings.get_embedding_provider()
+
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL", "local/minilm")
+    assert embeddings.get_embedding_provider().model_name == "local/minilm"
+    assert embeddings.default_embedding_model() == "local/minilm"
+
+@pytest.mark.asyncio
+async def test_readiness_refuses_a_collection_from_another_model(monkeypatch):
+    monkeypatch.setattr(embeddings, "_local_provider", None)
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL_PATH", "/models/minilm")
+    monkeypatch.setattr(settings, "EMBEDDING_LOCAL_MODEL", "local/minilm")
+    monkeypatch.setattr(active, "_embedding_model", "openai/text-embedding-3-small")
+    with pytest.raises(UnsupportedEmbeddingModel):
+        await check_embedding_model()
+
+    monkeypatch.setattr(active, "_embedding_model", "local/minilm")
+    await check_embedding_model()
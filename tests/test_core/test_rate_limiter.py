@@ -0,0 +1,103 @@
+import asyncio
+import time
+import pytest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from app.core.openrouter import parse_retry_after
+from app.core.rate_limiter import AdaptiveLimiter, Priority
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_a_burst_then_the_rate():
+    limiter = AdaptiveLimiter(rate=20, burst=3, min_concurrency=1, max_concurrency=10)
+    started = time.monotonic()
+
+    for _ in range(5):
+        async with limiter.slot():
+            pass
+
+    # Three tokens up front, then two more at 20 per second
+    assert time.monotonic() - started >= 0.09
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_holds_callers_until_release():
+    limiter = AdaptiveLimiter(rate=0, burst=1, min_concurrency=1, max_concurrency=2)
+    await limiter.acquire()
+    await limiter.acquire()
+
+    third = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert not third.done()
+
+    limiter.release()
+    await asyncio.wait_for(third, 1)
+    assert limiter.stats()["in_flight"] == 2
+
+def test_aimd_halves_on_throttle_and_grows_additively():
+    limiter = AdaptiveLimiter(rate=0, burst=1, min_concurrency=1, max_concurrency=8)
+    limiter.record_throttle()
+    assert limiter.concurrency_limit == 4
+    limiter.record_throttle()
+    limiter.record_throttle()
+    limiter.record_throttle()
+    assert limiter.concurrency_limit == 1
+
+    limiter.record_success()
+    assert limiter.concurrency_limit == 2
+    limiter.record_success()
+    assert limiter.concurrency_limit == 2.5
+    for _ in range(100):
+        limiter.record_success()
+    assert limiter.concurrency_limit == 8
+
+@pytest.mark.asyncio
+async def test_interactive_callers_are_served_before_queued_background_work():
+    limiter = AdaptiveLimiter(rate=0, burst=1, min_concurrency=1, max_concurrency=1)
+    await limiter.acquire()
+    order = []
+
+    async def caller(name, priority):
+        async with limiter.slot(priority):
+            order.append(name)
+
+    waiters = [
+        asyncio.ensure_future(caller("background 1", Priority.BACKGROUND)),
+        asyncio.ensure_future(caller("background 2", Priority.BACKGROUND)),
+    ]
+    await asyncio.sleep(0)
+    waiters.append(asyncio.ensure_future(caller("interactive", Priority.INTERACTIVE)))
+    await asyncio.sleep(0)
+    assert limiter.stats()["classes"]["background"]["queue_depth"] == 2
+
+    limiter.release()
+    await asyncio.gather(*waiters)
+    assert order == ["interactive", "background 1", "background 2"]
+
+@pytest.mark.asyncio
+async def test_throttle_pauses_for_retry_after():
+    limiter = AdaptiveLimiter(rate=0, burst=1, min_concurrency=1, max_concurrency=4)
+    limiter.record_throttle(retry_after=0.1)
+    started = time.monotonic()
+    async with limiter.slot():
+        pass
+    assert time.monotonic() - started >= 0.09
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_its_place_up():
+    limiter = AdaptiveLimiter(rate=0, burst=1, min_concurrency=1, max_concurrency=1)
+    await limiter.acquire()
+    cancelled = asyncio.ensure_future(limiter.acquire())
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+
+    limiter.release()
+    await asyncio.wait_for(waiting, 1)
+    assert limiter.stats()["in_flight"] == 1
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 <= parse_retry_after(in_a_minute) <= 60
@@ -0,0 +1,56 @@
+import pytest
+from app.core import database, readiness as readiness_module
+from app.core.config import settings
+from app.core.readiness import ReadinessState
+
+class Dependencies:
+    """Stand-in dependency checks that can be switched between up and down."""
+
+    def __init__(self, monkeypatch):
+        self.mongodb_up = True
+        self.index_calls = 0
+        monkeypatch.setattr(readiness_module, "check_mongodb", self.check_mongodb)
+        monkeypatch.setattr(readiness_module, "check_chroma", self.check_chroma)
+        monkeypatch.setattr(database, "create_indexes", self.create_indexes)
+        monkeypatch.setattr(settings, "READINESS_RECHECK_INTERVAL", 0.0)
+        monkeypatch.setattr(settings, "READINESS_WARMUP", False)
+
+    async def check_mongodb(self):
+        if not self.mongodb_up:
+            raise ConnectionError("mongodb down")
+
+    async def check_chroma(self):
+        pass
+
+    async def create_indexes(self):
+        self.index_calls += 1
+
+@pytest.mark.asyncio
+async def test_readiness_recovers_after_a_failed_recheck(monkeypatch):
+    dependencies = Dependencies(monkeypatch)
+    state = ReadinessState()
+    await state.start()
+    assert await state.probe()
+
+    dependencies.mongodb_up = False
+    assert not await state.probe()
+    assert not state.checks["mongodb"]["ok"]
+
+    dependencies.mongodb_up = True
+    assert await state.probe()
+    await state.stop()
+
+@pytest.mark.asyncio
+async def test_indexes_are_created_once_mongodb_is_reachable(monkeypatch):
+    dependencies = Dependencies(monkeypatch)
+    dependencies.mongodb_up = False
+    state = ReadinessState()
+
+    assert not await state.check()
+    assert dependencies.index_calls == 0
+
+    dependencies.mongodb_up = True
+    assert await state.check()
+    assert await state.check()
+    assert dependencies.index_calls == 1
+    assert "indexes" in state.phases
@@ -0,0 +1,23 @@
+import logging
+import pytest
+from app.core.usage import record_rollup
+
+@pytest.mark.asyncio
+async def test_rollups_accumulate_per_day_and_model(mongo):
+    await record_rollup("embedding", "model", {"total_tokens": 5}, "default", document_id="doc")
+    await record_rollup("embedding", "model", {"total_tokens": 7, "note": "ignored"}, "default", document_id="doc")
+
+    rollup = await mongo.usage_rollups.find_one()
+    assert rollup["requests"] == 2
+    assert rollup["total_tokens"] == 12
+    assert await mongo.usage_rollups.count_documents({}) == 1
+
+@pytest.mark.asyncio
+async def test_failed_rollup_write_is_logged_not_raised(mongo, monkeypatch, caplog):
+    async def fail(*args, **kwargs):
+        raise ConnectionError("mongodb down")
+
+    monkeypatch.setattr(type(mongo.usage_rollups), "update_one", fail)
+    with caplog.at_level(logging.WARNING):
+        await record_rollup("query_embedding", "model", {"total_tokens": 5}, "default")
+    assert "not recorded" in caplog.text
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.core.write_behind import WriteBehindBuffer
+
+def message(session_id: str, content: str = "hi"):
+    return {"_id": ObjectId(), "session_id": session_id, "role": "user", "content": content}
+
+@pytest.mark.asyncio
+async def test_flush_writes_buffered_messages(mongo):
+    buffer = WriteBehindBuffer(flush_interval=60, batch_size=100)
+    buffer.add_message(message("s", "a"))
+    buffer.add_message(message("s", "b"))
+    assert [m["content"] for m in buffer.pending_messages("s")] == ["a", "b"]
+
+    await buffer.flush()
+    assert await mongo.chat_messages.count_documents({}) == 2
+    assert buffer.stats()["pending_messages"] == 0
+    await buffer.drain()
+
+@pytest.mark.asyncio
+async def test_session_touches_keep_the_latest_timestamp():
+    buffer = WriteBehindBuffer(flush_interval=60, batch_size=100)
+    later = datetime(2021, 1, 1)
+    buffer.touch_session("s", later)
+    buffer.touch_session("s", later - timedelta(days=1))
+    assert buffer.stats()["pending_sessions"] == 1
+    assert buffer._session_touches["s"] == later
+
+    await buffer.discard_session("s")
+    assert buffer.stats()["pending_sessions"] == 0
+    await buffer.drain()
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_messages_for_retry(mongo, monkeypatch):
+    buffer = WriteBehindBuffer(flush_interval=60, batch_size=100)
+    buffer.add_message(message("s"))
+
+    insert_many = type(mongo.chat_messages).insert_many
+
+    async def fail(*args, **kwargs):
+        raise ConnectionError("mongodb down")
+
+    monkeypatch.setattr(type(mongo.chat_messages), "insert_many", fail)
+    await buffer.flush()
+    assert buffer.stats()["pending_messages"] == 1
+    assert buffer.failed_flushes == 1
+
+    monkeypatch.setattr(type(mongo.chat_messages), "insert_many", insert_many)
+    await buffer.flush()
+    assert await mongo.chat_messages.count_documents({}) == 1
+    await buffer.drain()
+
+@pytest.mark.asyncio
+async def test_discard_waits_for_flush_in_progress(mongo, monkeypatch):
+    buffer = WriteBehindBuffer(flush_interval=60, batch_size=100)
+    release = asyncio.Event()
+    insert_messages = buffer._insert_messages
+
+    async def slow_insert(messages):
+        await release.wait()
+        await insert_messages(messages)
+
+    monkeypatch.setattr(buffer, "_insert_messages", slow_insert)
+    buffer.add_message(message("deleted"))
+    buffer.add_message(message("kept"))
+
+    flushing = asyncio.ensure_future(buffer.flush())
+    await asyncio.sleep(0)
+    buffer.add_message(message("deleted"))
+    discarding = asyncio.ensure_future(buffer.discard_session("deleted"))
+    await asyncio.sleep(0.01)
+    assert not discarding.done()
+
+    release.set()
+    await flushing
+    await discarding
+
+    # What the session delete does next: nothing written after this can bring messages back
+    await mongo.chat_messages.delete_many({"session_id": "deleted"})
+    await buffer.drain()
+    assert [m["session_id"] async for m in mongo.chat_messages.find()] == ["kept"]
+
+@pytest.mark.asyncio
+async def test_drain_writes_everything_buffered(mongo):
+    buffer = WriteBehindBuffer(flush_interval=60, batch_size=100)
+    for i in range(5):
+        buffer.add_message(message("s", str(i)))
+
+    await buffer.drain()
+    assert await mongo.chat_messages.count_documents({}) == 5
+    assert buffer.stats()["pending_messages"] == 0
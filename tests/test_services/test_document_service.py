@@ -0,0 +1,63 @@
+import pytest
+from app.core import metrics
+from app.core.admission import AdmissionLimiter, RequestShed, remaining_budget
+from app.schemas.document import DocumentCreate
+from app.services import document_service as document_module
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+
+@pytest.mark.asyncio
+async def test_ingest_is_shed_before_anything_is_written(mongo, monkeypatch):
+    monkeypatch.setitem(metrics._expected_latency, "embedding", 10.0)
+    limiter = AdmissionLimiter("test", limit=1, max_queue=0, deadline=5.0)
+
+    with pytest.raises(RequestShed):
+        async with limiter.admit(1.0):
+            await DocumentService().create_document(DocumentCreate(title="t", content="body"))
+    assert await mongo.documents.count_documents({}) == 0
+
+@pytest.mark.asyncio
+async def test_stored_document_is_embedded_without_the_deadline(mongo, monkeypatch):
+    budgets = []
+
+    async def process_document_chunks(self, chunks):
+        budgets.append(remaining_budget())
+        return ["chunk"], {}
+
+    monkeypatch.setattr(EmbeddingService, "process_document_chunks", process_document_chunks)
+    limiter = AdmissionLimiter("test", limit=1, max_queue=0, deadline=5.0)
+
+    async with limiter.admit(1.0):
+        document = await DocumentService().create_document(DocumentCreate(title="t", content="body"))
+        assert remaining_budget() is not None
+    assert budgets == [None]
+    assert (await mongo.documents.find_one({"_id": document.id}))["chunk_ids"] == ["chunk"]
+
+@pytest.mark.asyncio
+async def test_title_search_sorts_ranking_fields_only_then_fetches_the_page(mongo, monkeypatch):
+    # mongomock lacks $setIntersection, so titles are ranked by their number of trigrams instead
+    monkeypatch.setattr(document_module, "relevance_stages", lambda title, mode: [
+        {"$addFields": {"score": {"$size": "$title_trigrams"}}}
+    ])
+    sorted_fields = []
+    aggregate = type(mongo.documents).aggregate
+
+    def capture(self, pipeline, *args, **kwargs):
+        sort = next(i for i, stage in enumerate(pipeline) if "$sort" in stage)
+        sorted_fields.append(pipeline[sort - 1])
+        return aggregate(self, pipeline, *args, **kwargs)
+
+    monkeypatch.setattr(type(mongo.documents), "aggregate", capture)
+    service = DocumentService()
+    for title in ["Report", "Annual report 2020", "Annual report"]:
+        await service.create_document(DocumentCreate(title=title, content=f"Body of {title}"), process_embeddings=False)
+
+    docs = await service.search_by_title("report", "fuzzy")
+    assert [doc["title"] for doc in docs] == ["Annual report 2020", "Annual report", "Report"]
+    assert docs[0]["content"] == "Body of Annual report 2020"
+    assert docs[0]["score"] > docs[1]["score"]
+    assert "title_trigrams" not in docs[0]
+    assert sorted_fields == [{"$project": {"score": 1, "created_at": 1}}]
+
+    summaries = await service.search_by_title("report", "fuzzy", skip=1, limit=1, summary=True, fields=["title"])
+    assert [(doc["title"], "content" in doc) for doc in summaries] == [("Annual report", False)]
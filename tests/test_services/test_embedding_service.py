@@ -0,0 +1,45 @@
+import pytest
+from app.core.active_collection import active
+from app.core.chroma_client import chroma
+from app.core.config import settings
+from app.services import embedding_service as embedding_module
+from app.services.embedding_service import EmbeddingService
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+        self.added = []
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.added.extend(ids)
+
+class CuttingOverProvider:
+    """Embeds with the requested model, with a re-index cut-over landing during the first call."""
+
+    def __init__(self, new_collection):
+        self.new_collection = new_collection
+        self.models = []
+
+    async def generate_embeddings(self, texts, model=None, priority=None):
+        self.models.append(model)
+        if len(self.models) == 1:
+            chroma.collection = self.new_collection
+            active.update({"name": "new", "embedding_model": "new-model", "index_dimensions": 0})
+        return {"data": [{"embedding": [1.0, 0.0]} for _ in texts]}
+
+@pytest.mark.asyncio
+async def test_chunks_are_embedded_again_when_a_cut_over_lands_mid_call(mongo, monkeypatch):
+    old, new = FakeCollection("old"), FakeCollection("new")
+    monkeypatch.setattr(chroma, "collection", old)
+    for attribute in ("name", "_embedding_model", "_index_dimensions"):
+        monkeypatch.setattr(active, attribute, getattr(active, attribute))
+    monkeypatch.setattr(settings, "EMBEDDING_RESCORE_DTYPE", "none")
+    provider = CuttingOverProvider(new)
+    monkeypatch.setattr(embedding_module, "get_embedding_provider", lambda: provider)
+
+    chunks = [{"document_id": "doc", "text": "text", "metadata": {}}]
+    chunk_ids, _ = await EmbeddingService().process_document_chunks(chunks)
+
+    assert provider.models == [settings.EMBEDDING_MODEL, "new-model"]
+    assert len(new.added) == 1 and not old.added
+    assert (await mongo.document_chunks.find_one())["embedding_model"] == "new-model"
@@ -0,0 +1,37 @@
+import pytest
+from datetime import datetime, timedelta
+from app.services.generation_service import GenerationService
+
+@pytest.mark.asyncio
+async def test_session_pages_are_stable_while_sessions_are_active(mongo):
+    service = GenerationService("test")
+    created = [await service.create_chat_session(f"session {i}") for i in range(5)]
+
+    first_page, cursor = await service.get_chat_sessions(limit=2)
+
+    # Sessions on both sides of the page boundary see new messages before the next page is read
+    for session in (created[0], created[4]):
+        await mongo.chat_sessions.update_one(
+            {"_id": session.id}, {"$set": {"updated_at": datetime.utcnow() + timedelta(minutes=1)}}
+        )
+
+    second_page, cursor = await service.get_chat_sessions(limit=2, cursor=cursor)
+    third_page, cursor = await service.get_chat_sessions(limit=2, cursor=cursor)
+    assert cursor is None
+
+    paged = [session.id for session in first_page + second_page + third_page]
+    assert sorted(paged) == sorted(session.id for session in created)
+    assert len(set(paged)) == len(paged)
+
+@pytest.mark.asyncio
+async def test_recent_sessions_are_ordered_by_activity(mongo):
+    service = GenerationService("test")
+    older = await service.create_chat_session("older")
+    await service.create_chat_session("newer")
+    await mongo.chat_sessions.update_one(
+        {"_id": older.id}, {"$set": {"updated_at": datetime.utcnow() + timedelta(minutes=1)}}
+    )
+
+    sessions = await service.get_recent_chat_sessions()
+    assert [session.title for session in sessions] == ["older", "newer"]
+    assert len(await service.get_recent_chat_sessions(limit=1)) == 1
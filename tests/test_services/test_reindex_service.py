@@ -0,0 +1,131 @@
+import time
+import pytest
+from types import SimpleNamespace
+from app.core import jobs as jobs_module
+from app.core.chroma_client import chroma
+from app.core.config import settings
+from app.services.reindex_service import (
+    PENDING_EMBEDDING_FIELD, PENDING_EMBEDDING_MODEL_FIELD, REINDEX_JOB, ReindexService
+)
+
+@pytest.mark.asyncio
+async def test_only_one_reindex_job_at_a_time(mongo, monkeypatch):
+    monkeypatch.setattr(chroma, "collection", SimpleNamespace(name="documents"))
+    service = ReindexService()
+    job = await service.create_job(embedding_model="new")
+    assert job["params"]["source_embedding_model"] == settings.EMBEDDING_MODEL
+
+    with pytest.raises(ValueError):
+        await service.create_job(embedding_model="new")
+
+    await mongo.jobs.update_one({"_id": job["_id"]}, {"$set": {"status": jobs_module.FAILED}})
+    assert (await service.create_job(embedding_model="new"))["kind"] == REINDEX_JOB
+
+@pytest.mark.asyncio
+async def test_rescoring_vectors_are_tagged_then_promoted(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_RESCORE_DTYPE", "float16")
+    await mongo.document_chunks.insert_many([
+        {"_id": 1, "embedding": b"old"},
+        {"_id": 2, "embedding": b"old", PENDING_EMBEDDING_FIELD: b"new", PENDING_EMBEDDING_MODEL_FIELD: "new"}
+    ])
+    service = ReindexService()
+
+    await service._tag_rescoring_vectors("old")
+    assert await mongo.document_chunks.count_documents({"embedding_model": "old"}) == 2
+
+    await service._promote_rescoring_vectors()
+    promoted = await mongo.document_chunks.find_one({"_id": 2})
+    assert promoted["embedding"] == b"new" and promoted["embedding_model"] == "new"
+    assert PENDING_EMBEDDING_FIELD not in promoted
+    assert (await mongo.document_chunks.find_one({"_id": 1}))["embedding_model"] == "old"
+
+@pytest.mark.asyncio
+async def test_promotion_without_rescoring_drops_the_old_vectors(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_RESCORE_DTYPE", "none")
+    await mongo.document_chunks.insert_many([
+        {"_id": 1, "embedding": b"old", "embedding_model": "old", PENDING_EMBEDDING_MODEL_FIELD: "new"},
+        {"_id": 2, "embedding": b"old", "embedding_model": "old"}
+    ])
+    await ReindexService()._promote_rescoring_vectors()
+
+    promoted = await mongo.document_chunks.find_one({"_id": 1})
+    assert "embedding" not in promoted and promoted["embedding_model"] == "new"
+    assert (await mongo.document_chunks.find_one({"_id": 2}))["embedding"] == b"old"
+
+@pytest.mark.asyncio
+async def test_catch_up_takes_chunks_not_embedded_with_the_new_model(mongo, monkeypatch):
+    await mongo.document_chunks.insert_many([
+        # Copied before the cut-over, or ingested by a worker that had followed it
+        {"_id": 1, "vector_id": "a", "embedding_model": "old", PENDING_EMBEDDING_MODEL_FIELD: "new"},
+        {"_id": 2, "vector_id": "b", "embedding_model": "new"},
+        # Ingested on the old collection, whatever their _id
+        {"_id": 0, "vector_id": "c", "embedding_model": "old"},
+        {"_id": 3, "vector_id": "d"},
+        # No vector to copy
+        {"_id": 4}
+    ])
+    embedded = []
+
+    async def embed_batch(params, target, batch):
+        embedded.extend(chunk["_id"] for chunk in batch)
+        await mongo.document_chunks.update_many(
+            {"_id": {"$in": [chunk["_id"] for chunk in batch]}},
+            {"$set": {PENDING_EMBEDDING_MODEL_FIELD: params["embedding_model"]}}
+        )
+
+    async def checkpoint(job_id, progress, checkpoint=None):
+        pass
+
+    service = ReindexService()
+    monkeypatch.setattr(service, "_embed_batch", embed_batch)
+    monkeypatch.setattr(jobs_module.jobs, "checkpoint", checkpoint)
+    params = {"embedding_model": "new", "batch_size": 1, "rate": 0}
+    await service._copy("job", params, None, {"processed": 0}, checkpoint=2, catch_up=True)
+    assert embedded == [0, 3]
+
+@pytest.mark.asyncio
+async def test_cutover_grace_covers_the_poll_interval_and_ingest_deadline(monkeypatch):
+    renewals = []
+
+    async def checkpoint(job_id, progress, checkpoint=None):
+        renewals.append(job_id)
+
+    monkeypatch.setattr(jobs_module.jobs, "checkpoint", checkpoint)
+    monkeypatch.setattr(settings, "REINDEX_CUTOVER_GRACE", 0.0)
+    monkeypatch.setattr(settings, "ACTIVE_COLLECTION_POLL_INTERVAL", 0.02)
+    monkeypatch.setattr(settings, "INGEST_DEADLINE", 0.02)
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.04)
+
+    started = time.monotonic()
+    await ReindexService()._wait_for_cutover("job", {})
+    assert time.monotonic() - started >= 0.04
+    # The lease was renewed throughout
+    assert len(renewals) >= 4
+
+class PagedCollection:
+    def __init__(self, ids):
+        self.ids = list(ids)
+
+    def get(self, include, limit, offset):
+        return {"ids": self.ids[offset:offset + limit]}
+
+    def delete(self, ids):
+        self.ids = [vector_id for vector_id in self.ids if vector_id not in ids]
+
+@pytest.mark.asyncio
+async def test_orphan_sweep_renews_the_lease_every_page(mongo, monkeypatch):
+    await mongo.document_chunks.insert_many([{"vector_id": f"v{i}"} for i in range(0, 10, 2)])
+    renewals = []
+
+    async def checkpoint(job_id, progress, checkpoint=None):
+        renewals.append(progress["orphans_removed"])
+
+    monkeypatch.setattr(jobs_module.jobs, "checkpoint", checkpoint)
+    target = PagedCollection(f"v{i}" for i in range(10))
+    progress = {"orphans_removed": 0}
+    await ReindexService()._remove_orphans("job", progress, target, page_size=3)
+
+    assert target.ids == [f"v{i}" for i in range(0, 10, 2)]
+    assert progress["orphans_removed"] == 5
+    # Four pages read, then two pages of deletes
+    assert renewals == [0, 0, 0, 0, 3, 5]
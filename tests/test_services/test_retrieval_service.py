@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from app.schemas.search import SearchResult
+from app.services.retrieval_service import RetrievalService
+from app.services.reindex_service import PENDING_EMBEDDING_FIELD, PENDING_EMBEDDING_MODEL_FIELD
+from app.utils.quantization import quantize
+
+OLD = quantize([1.0, 0.0], "float32")
+NEW = quantize([0.0, 1.0], "float32")
+
+def test_rescoring_uses_the_vector_of_the_query_model():
+    chunk = {
+        "embedding": OLD, "embedding_model": "old",
+        PENDING_EMBEDDING_FIELD: NEW, PENDING_EMBEDDING_MODEL_FIELD: "new"
+    }
+    # Mid cut-over both are stored; each model's queries get their own model's vector
+    assert np.array_equal(RetrievalService._rescoring_vector(chunk, "old"), [1.0, 0.0])
+    assert np.array_equal(RetrievalService._rescoring_vector(chunk, "new"), [0.0, 1.0])
+    assert RetrievalService._rescoring_vector(chunk, "other") is None
+
+def test_untagged_vectors_are_taken_as_the_served_model():
+    assert np.array_equal(RetrievalService._rescoring_vector({"embedding": OLD}, "any"), [1.0, 0.0])
+    assert RetrievalService._rescoring_vector({}, "any") is None
+
+def result(chunk_id: str, score: float, document_id: str = "doc", chunk_index=None, namespace=None):
+    metadata = {} if chunk_index is None else {"chunk_index": chunk_index}
+    return SearchResult(
+        chunk_id=chunk_id, document_id=document_id, chunk_text=chunk_id,
+        metadata=metadata, score=score, namespace=namespace
+    )
+
+def test_rescoring_reranks_by_full_size_similarity():
+    results = [result("a", 0.9), result("b", 0.8), result("c", 0.7)]
+    full_vectors = [
+        np.array([0.0, 1.0], dtype=np.float32),
+        np.array([1.0, 0.0], dtype=np.float32),
+        None
+    ]
+    rescored = RetrievalService()._rescore([1.0, 0.0], results, full_vectors)
+
+    # "c" has no full-size vector and keeps its index score
+    assert [r.chunk_id for r in rescored] == ["b", "c", "a"]
+    assert [r.score for r in rescored] == [1.0, 0.7, 0.0]
+
+async def insert_chunks(mongo, document_id: str, count: int, namespace=None):
+    await mongo.document_chunks.insert_many([
+        {"document_id": document_id, "chunk_index": i, "chunk_text": f"{document_id}-{i}", "namespace": namespace}
+        for i in range(count)
+    ])
+
+@pytest.mark.asyncio
+async def test_neighbor_windows_merge_within_a_document(mongo):
+    await insert_chunks(mongo, "doc", 10)
+    await insert_chunks(mongo, "other", 3)
+    results = [
+        result("doc-5", 0.9, chunk_index=5),
+        result("other-0", 0.8, document_id="other", chunk_index=0),
+        # Touches the window of doc-5 (4..6), so the two become one passage
+        result("doc-8", 0.7, chunk_index=8),
+        result("doc-1", 0.6, chunk_index=1)
+    ]
+    expanded = await RetrievalService()._expand_neighbors(results, neighbors=1)
+
+    assert [r.chunk_id for r in expanded] == ["doc-5", "other-0", "doc-1"]
+    assert [r.chunk_span for r in expanded] == [[4, 9], [0, 1], [0, 2]]
+    assert expanded[0].chunk_text == "\n\n".join(f"doc-{i}" for i in range(4, 10))
+    assert expanded[1].chunk_text == "other-0\n\nother-1"
+
+@pytest.mark.asyncio
+async def test_merged_passage_keeps_the_place_of_its_best_hit(mongo):
+    await insert_chunks(mongo, "doc", 6)
+    results = [result("doc-4", 0.9, chunk_index=4), result("doc-0", 0.8, chunk_index=0), result("doc-2", 0.7, chunk_index=2)]
+    expanded = await RetrievalService()._expand_neighbors(results, neighbors=1)
+
+    assert [r.chunk_id for r in expanded] == ["doc-4"]
+    assert expanded[0].chunk_span == [0, 5]
+
+@pytest.mark.asyncio
+async def test_neighbors_come_from_the_hit_namespace_only(mongo):
+    await insert_chunks(mongo, "doc", 3, namespace="team")
+    await mongo.document_chunks.insert_one({"document_id": "doc", "chunk_index": 0, "chunk_text": "elsewhere", "namespace": "other"})
+    results = [result("doc-1", 0.9, chunk_index=1, namespace="team"), result("untracked", 0.5)]
+    expanded = await RetrievalService()._expand_neighbors(results, neighbors=1)
+
+    assert expanded[0].chunk_text == "doc-0\n\ndoc-1\n\ndoc-2"
+    assert expanded[1].chunk_span is None
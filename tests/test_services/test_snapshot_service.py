@@ -0,0 +1,40 @@
+import pytest
+from bson import ObjectId
+from app.core import blob_store
+from app.core.active_collection import active
+from app.core.config import settings
+from app.services.snapshot_service import SnapshotService
+from app.utils.snapshot import SnapshotWriter
+
+BODY = "x" * 100
+
+@pytest.fixture
+def store(monkeypatch, tmp_path, mongo):
+    monkeypatch.setattr(settings, "CONTENT_STORE", "local")
+    monkeypatch.setattr(settings, "CONTENT_STORE_PATH", str(tmp_path / "blobs"))
+    monkeypatch.setattr(settings, "CONTENT_INLINE_THRESHOLD", 10)
+    monkeypatch.setattr(blob_store, "_stores", {})
+    return blob_store.get_blob_store()
+
+@pytest.mark.asyncio
+async def test_reimport_does_not_pin_bodies(store, mongo, tmp_path):
+    writer = SnapshotWriter()
+    path = tmp_path / "corpus.snap"
+    path.write_bytes(
+        writer.start({"embedding_model": active.embedding_model})
+        + writer.documents([{"_id": ObjectId(), "title": "doc", "content": BODY}])
+        + writer.end({"documents": 1})
+    )
+    service = SnapshotService()
+
+    assert (await service.import_snapshot(str(path)))["documents"] == 1
+    totals = await service.import_snapshot(str(path))
+    assert (totals["documents"], totals["documents_skipped"]) == (0, 1)
+
+    document = await mongo.documents.find_one()
+    assert (await mongo.blob_refs.find_one({"_id": document["content_ref"]["key"]}))["refs"] == 1
+
+    # With the document gone, so is its body
+    await mongo.documents.delete_one({"_id": document["_id"]})
+    await blob_store.release_body(document["content_ref"])
+    assert not await mongo.blob_refs.find_one({"_id": document["content_ref"]["key"]})
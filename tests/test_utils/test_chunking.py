@@ -0,0 +1,17 @@
+from app.utils.chunking import MIN_STITCH_OVERLAP, stitch_chunks
+
+def test_overlap_between_consecutive_chunks_is_kept_once():
+    shared = "the shared overlap between chunks "
+    assert len(shared) >= MIN_STITCH_OVERLAP
+    first = "Opening sentence of the passage, then " + shared
+    second = shared + "and the closing sentence."
+    assert stitch_chunks([first, second]) == "Opening sentence of the passage, then " + shared + "and the closing sentence."
+
+def test_chunks_without_enough_overlap_are_joined_as_paragraphs():
+    assert stitch_chunks(["First part ends.", "Second part."]) == "First part ends.\n\nSecond part."
+    # A coincidental match shorter than the minimum is not an overlap
+    assert stitch_chunks(["ends with a b", "a b starts"]) == "ends with a b\n\na b starts"
+
+def test_single_and_empty_inputs():
+    assert stitch_chunks(["only chunk"]) == "only chunk"
+    assert stitch_chunks([]) == ""
@@ -0,0 +1,62 @@
+import pytest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.utils.pagination import CountCache, apply_cursor, decode_cursor, encode_cursor, keyset_filter
+
+SORT = [("created_at", -1), ("_id", -1)]
+
+def test_cursor_round_trips_dates_and_object_ids():
+    values = [datetime(2024, 5, 1, 12, 30), ObjectId()]
+    assert decode_cursor(encode_cursor(values), SORT) == values
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor([1]), encode_cursor({"a": 1})])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, SORT)
+
+def test_keyset_filter_selects_items_after_the_cursor():
+    assert keyset_filter(SORT, [5, "b"]) == {
+        "$or": [{"created_at": {"$lt": 5}}, {"created_at": 5, "_id": {"$lt": "b"}}]
+    }
+    assert keyset_filter([("chunk_index", 1)], [3]) == {"chunk_index": {"$gt": 3}}
+
+def test_apply_cursor_combines_with_filters():
+    cursor = encode_cursor([5, "b"])
+    assert apply_cursor({"namespace": "a"}, SORT, None) == {"namespace": "a"}
+    assert apply_cursor({}, SORT, cursor) == keyset_filter(SORT, [5, "b"])
+    assert apply_cursor({"namespace": "a"}, SORT, cursor) == {
+        "$and": [{"namespace": "a"}, keyset_filter(SORT, [5, "b"])]
+    }
+
+@pytest.mark.asyncio
+async def test_pages_cover_every_item_once_including_ties(mongo):
+    created_at = datetime(2024, 1, 1)
+    # Pairs share a timestamp, so the _id tie-breaker decides page boundaries
+    await mongo.items.insert_many([
+        {"_id": ObjectId(), "created_at": created_at + timedelta(minutes=i // 2)} for i in range(7)
+    ])
+
+    seen, cursor = [], None
+    while True:
+        query = apply_cursor({}, SORT, cursor)
+        page = [doc async for doc in mongo.items.find(query).sort(SORT).limit(3)]
+        seen += [doc["_id"] for doc in page]
+        if len(page) < 3:
+            break
+        cursor = encode_cursor([page[-1]["created_at"], page[-1]["_id"]])
+
+    expected = [doc["_id"] async for doc in mongo.items.find().sort(SORT)]
+    assert seen == expected
+
+@pytest.mark.asyncio
+async def test_count_cache_reuses_counts_within_ttl():
+    counts = []
+
+    async def count():
+        counts.append(1)
+        return len(counts)
+
+    cache = CountCache(ttl=60)
+    assert await cache.get("k", count) == 1
+    assert await cache.get("k", count) == 1
+    assert await CountCache(ttl=0).get("k", count) == 2
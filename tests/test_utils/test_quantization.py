@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from app.utils.quantization import cosine_similarities, dequantize, quantize, truncate_embeddings
+
+VECTOR = [0.25, -1.0, 0.5, 0.0, 0.125]
+
+def test_float32_round_trip_is_exact():
+    data = quantize(VECTOR, "float32")
+    assert len(data) == 1 + 4 * len(VECTOR)
+    assert dequantize(data).tolist() == VECTOR
+
+def test_float16_round_trip_halves_the_size():
+    data = quantize(VECTOR, "float16")
+    assert len(data) == 1 + 2 * len(VECTOR)
+    np.testing.assert_allclose(dequantize(data), VECTOR, atol=1e-3)
+
+def test_int8_round_trip_is_within_one_step_of_the_scale():
+    vector = np.random.default_rng(0).normal(size=256).astype(np.float32)
+    data = quantize(vector, "int8")
+    assert len(data) == 1 + 4 + len(vector)
+    step = np.abs(vector).max() / 127.0
+    assert np.abs(dequantize(data) - vector).max() <= step / 2 + 1e-6
+
+def test_int8_encodes_a_zero_vector():
+    assert dequantize(quantize([0.0, 0.0], "int8")).tolist() == [0.0, 0.0]
+
+def test_unknown_dtypes_and_codecs_are_rejected():
+    with pytest.raises(ValueError):
+        quantize(VECTOR, "int4")
+    with pytest.raises(ValueError):
+        dequantize(b"\x09\x00")
+
+def test_truncation_keeps_a_prefix_and_renormalizes():
+    matrix = truncate_embeddings([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]], dimensions=2)
+    np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 0.0]])
+
+    full = truncate_embeddings([[3.0, 4.0, 12.0]])
+    assert full.shape == (1, 3)
+    assert np.linalg.norm(full[0]) == pytest.approx(1.0)
+
+def test_cosine_similarities_skip_missing_and_mismatched_vectors():
+    vectors = [
+        np.array([2.0, 0.0], dtype=np.float32),
+        None,
+        np.array([1.0, 1.0], dtype=np.float32),
+        np.array([1.0, 0.0, 0.0], dtype=np.float32),
+        np.zeros(2, dtype=np.float32)
+    ]
+    scores = cosine_similarities([1.0, 0.0], vectors)
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] is None
+    assert scores[2] == pytest.approx(2 ** -0.5)
+    assert scores[3] is None
+    assert scores[4] == 0.0
+    assert cosine_similarities([1.0, 0.0], [None]) == [None]
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.core import openrouter
+from app.core.openrouter import OpenRouterClient
+from app.core.rate_limiter import Priority
+from app.utils.singleflight import SingleFlight, make_key
+
+@pytest.mark.asyncio
+async def test_identical_calls_in_flight_share_one_execution():
+    flight = SingleFlight("test.shared")
+    executions = []
+
+    async def call():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*[flight.do("key", call) for _ in range(5)])
+    assert results == ["result"] * 5
+    assert len(executions) == 1
+    assert flight.stats()["collapsed"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately_and_later_calls_run_again():
+    flight = SingleFlight("test.keys")
+    executions = []
+
+    async def call():
+        executions.append(1)
+        await asyncio.sleep(0)
+
+    await asyncio.gather(flight.do("a", call), flight.do("b", call))
+    await flight.do("a", call)
+    assert len(executions) == 3
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_by_every_waiter():
+    flight = SingleFlight("test.error")
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    results = await asyncio.gather(flight.do("key", call), flight.do("key", call), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_the_call_for_others():
+    flight = SingleFlight("test.cancel")
+
+    async def call():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    first = asyncio.ensure_future(flight.do("key", call))
+    second = asyncio.ensure_future(flight.do("key", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "result"
+
+def test_make_key_is_stable_across_dict_order():
+    assert make_key({"a": 1, "b": 2}) == make_key({"b": 2, "a": 1})
+    assert make_key("x", [1, 2]) != make_key("x", [2, 1])
+
+@pytest.mark.asyncio
+async def test_embedding_calls_are_only_shared_within_a_priority(monkeypatch):
+    calls = []
+
+    async def post(self, path, payload, priority, **kwargs):
+        calls.append(priority)
+        await asyncio.sleep(0.01)
+        return {"data": []}
+
+    monkeypatch.setattr(OpenRouterClient, "_post", post)
+    client = OpenRouterClient(api_key="test")
+    await asyncio.gather(
+        client.generate_embeddings(["text"], priority=Priority.BACKGROUND),
+        client.generate_embeddings(["text"], priority=Priority.INTERACTIVE),
+        client.generate_embeddings(["text"], priority=Priority.INTERACTIVE)
+    )
+    assert sorted(calls) == [Priority.INTERACTIVE, Priority.BACKGROUND]
+    assert openrouter.embedding_flight.stats()["in_flight"] == 0
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+from app.utils.snapshot import ALIGNMENT, BLOCK_HEADER, SnapshotError, SnapshotReader, SnapshotWriter
+
+def write_snapshot(path, dtype="float32"):
+    writer = SnapshotWriter(dtype)
+    documents = [{"_id": ObjectId(), "title": "doc", "namespace": "default"}]
+    chunks = [
+        {"_id": ObjectId(), "document_id": "d", "chunk_index": 0, "text": "first"},
+        {"_id": ObjectId(), "document_id": "d", "chunk_index": 1, "text": "second"}
+    ]
+    vectors = np.array([[0.5, -1.0, 2.0], [np.nan, np.nan, np.nan]], dtype=np.float32)
+    data = (
+        writer.start({"embedding_model": "test-model"})
+        + writer.documents(documents)
+        + writer.chunks(chunks)
+        + writer.vectors(vectors)
+        + writer.end({"documents": 1, "chunks": 2})
+    )
+    path.write_bytes(data)
+    return documents, chunks, vectors
+
+def test_round_trip_preserves_rows_and_vectors(tmp_path):
+    path = tmp_path / "corpus.snap"
+    documents, chunks, vectors = write_snapshot(path)
+
+    with SnapshotReader(str(path)) as reader:
+        blocks = list(reader.blocks())
+
+    assert [tag for tag, _ in blocks] == ["META", "DOCS", "CHNK", "VECS", "END!"]
+    values = dict(blocks)
+    assert values["META"]["embedding_model"] == "test-model"
+    assert values["META"]["dtype"] == "float32"
+    assert values["DOCS"] == documents
+    assert values["CHNK"] == chunks
+    np.testing.assert_array_equal(values["VECS"], vectors)
+    assert values["END!"] == {"documents": 1, "chunks": 2}
+
+def test_float16_vectors_are_mapped_at_aligned_offsets(tmp_path):
+    path = tmp_path / "corpus.snap"
+    _, _, vectors = write_snapshot(path, dtype="float16")
+
+    with SnapshotReader(str(path)) as reader:
+        matrix = dict(reader.blocks())["VECS"]
+        assert matrix.dtype == np.dtype("<f2")
+        assert matrix.offset % ALIGNMENT == 0
+        np.testing.assert_allclose(matrix[0], vectors[0], rtol=1e-3)
+        assert np.isnan(matrix[1]).all()
+
+def corrupt(path, tag):
+    """Flip the last payload byte of the first block with the given tag."""
+    data = bytearray(path.read_bytes())
+    start = data.index(tag)
+    length = BLOCK_HEADER.unpack_from(data, start)[3]
+    at = start + BLOCK_HEADER.size + length - 1
+    data[at] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+@pytest.mark.parametrize("tag", [b"DOCS", b"VECS", b"END!"])
+def test_corrupt_block_fails_its_checksum(tmp_path, tag):
+    path = tmp_path / "corpus.snap"
+    write_snapshot(path)
+    corrupt(path, tag)
+
+    with SnapshotReader(str(path)) as reader:
+        with pytest.raises(SnapshotError, match="Checksum mismatch"):
+            list(reader.blocks())
+
+def test_unverified_reader_skips_checksums(tmp_path):
+    path = tmp_path / "corpus.snap"
+    write_snapshot(path)
+    corrupt(path, b"VECS")
+
+    with SnapshotReader(str(path), verify=False) as reader:
+        assert [tag for tag, _ in reader.blocks()][-1] == "END!"
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = tmp_path / "corpus.snap"
+    write_snapshot(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:data.index(b"END!")])
+
+    with SnapshotReader(str(path)) as reader:
+        with pytest.raises(SnapshotError, match="truncated"):
+            list(reader.blocks())
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(SnapshotError):
+        SnapshotReader(str(path))